@@ -1,35 +1,324 @@
+"""Alpha Vantage market movers (TOP_GAINERS_LOSERS), polled within the API's call budget
+
+A MoversService refreshes the movers in a background thread, spacing calls so
+the daily quota lasts the whole day, and keeps the last snapshot in memory.
+Every query is answered from that snapshot: numeric fields are parsed once into
+typed arrays and top-K / bottom-K selections use a heap instead of re-sorting,
+so any number of dashboard requests never reach the upstream API.
+
+Usage: python alphavantage.py          (fetch once and print the movers)
+       python alphavantage.py serve [port]
+"""
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
 import requests
-from operator import itemgetter
 
+URL = 'https://www.alphavantage.co/query'
+
+# Get your own key from https://www.alphavantage.co/support/#api-key and put it in AlphaVantage_API_Key
+API_KEY_PATH = 'AlphaVantage_API_Key'
+
+# Free-tier quota; calls are spaced so it lasts the whole window
+DAILY_CALL_LIMIT = 25
+BUDGET_WINDOW = 24 * 60 * 60
+MIN_REFRESH_SECONDS = 60
+
+# Calls already made survive restarts, so a restarted service doesn't spend the quota again
+CALL_LOG_PATH = os.path.join('cache', 'alphavantage_calls.json')
+
+MOVER_LISTS = ['top_gainers', 'top_losers', 'most_actively_traded']
+RANK_FIELDS = ['price', 'change_amount', 'change_percentage', 'volume']
+
+def load_api_key(path=API_KEY_PATH):
+    """API key from the ALPHAVANTAGE_API_KEY environment variable or the key file"""
+    key = os.environ.get('ALPHAVANTAGE_API_KEY')
+    if key:
+        return key.strip()
+    with open(path) as f:
+        return f.read().strip()
+
+class CallBudget:
+    """Sliding-window count of upstream calls, persisted to a small JSON file"""
+
+    def __init__(self, limit=DAILY_CALL_LIMIT, window=BUDGET_WINDOW, path=CALL_LOG_PATH):
+        self.limit = limit
+        self.window = window
+        self.path = path
+        self._lock = threading.Lock()
+        self.calls = []
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.calls = json.load(f)
+            except (OSError, ValueError):
+                self.calls = []
+
+    def _prune(self, now):
+        self.calls = [t for t in self.calls if now - t < self.window]
+
+    def remaining(self):
+        with self._lock:
+            self._prune(time.time())
+            return self.limit - len(self.calls)
+
+    def wait_time(self):
+        """Seconds until a call is allowed (0 if one is allowed now)"""
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            if len(self.calls) < self.limit:
+                return 0.0
+            return self.calls[0] + self.window - now
+
+    def record(self):
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            self.calls.append(now)
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.calls, f)
+                os.replace(tmp_path, self.path)
+
+def _number(value):
+    try:
+        return float(str(value).rstrip('%').replace(',', ''))
+    except (TypeError, ValueError):
+        return np.nan
+
+class MoverList:
+    """One movers list with its numeric fields parsed once into arrays"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.tickers = [row.get('ticker') for row in rows]
+        self.values = {
+            'price': np.array([_number(row.get('price')) for row in rows], dtype=float),
+            'change_amount': np.array([_number(row.get('change_amount')) for row in rows], dtype=float),
+            'change_percentage': np.array([_number(row.get('change_percentage')) for row in rows], dtype=float),
+            'volume': np.array([_number(row.get('volume')) for row in rows], dtype=float),
+        }
+        # Plain lists for heapq, whose key lookups are faster on lists than on arrays
+        self._keys = {field: [v if v == v else float('-inf') for v in values.tolist()]
+                      for field, values in self.values.items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def select(self, k, by='change_amount', largest=True):
+        """Indices of the k largest (or smallest) rows by a field, best first, in O(n log k)"""
+        if by not in self._keys:
+            raise ValueError(f"Unknown field {by}; choose from {RANK_FIELDS}")
+        keys = self._keys[by]
+        if largest:
+            return heapq.nlargest(k, range(len(keys)), key=keys.__getitem__)
+        # Missing values sort last in both directions
+        keys = [v if v != float('-inf') else float('inf') for v in keys]
+        return heapq.nsmallest(k, range(len(keys)), key=keys.__getitem__)
+
+class MoversSnapshot:
+    """Parsed TOP_GAINERS_LOSERS response with memoized top-K / bottom-K queries"""
+
+    def __init__(self, data, fetched_at=None):
+        self.data = data
+        self.fetched_at = fetched_at or time.time()
+        self.last_updated = data.get('last_updated')
+        self.lists = {name: MoverList(data.get(name, [])) for name in MOVER_LISTS}
 
-# replace the "demo" apikey below with your own key from https://www.alphavantage.co/support/#api-key
-url = 'https://www.alphavantage.co/query?function=TOP_GAINERS_LOSERS&apikey=Z9HSD64X49Y6NVTU'
-r = requests.get(url)
-data = r.json()
+        # Every distinct ticker across the three lists, for rankings over all movers
+        seen = {}
+        for name in MOVER_LISTS:
+            for row in data.get(name, []):
+                seen.setdefault(row.get('ticker'), row)
+        self.lists['all'] = MoverList(list(seen.values()))
 
-print(data)
+        self._results = {}
+        self._results_lock = threading.Lock()
 
+    def query(self, list_name='all', k=10, by='change_amount', largest=True):
+        """Top (largest=True) or bottom k rows of a list by a field, as dicts with numeric fields parsed"""
+        key = (list_name, k, by, largest)
+        with self._results_lock:
+            cached = self._results.get(key)
+        if cached is not None:
+            return cached
+
+        movers = self.lists[list_name]
+        result = []
+        for i in movers.select(k, by, largest):
+            row = {'ticker': movers.tickers[i]}
+            row.update({field: float(values[i]) for field, values in movers.values.items()})
+            result.append(row)
+        with self._results_lock:
+            self._results[key] = result
+        return result
+
+    def top(self, k=10, by='change_amount', list_name='all'):
+        return self.query(list_name, k, by, largest=True)
+
+    def bottom(self, k=10, by='change_amount', list_name='all'):
+        return self.query(list_name, k, by, largest=False)
+
+def fetch_movers(api_key, timeout=30):
+    """One upstream TOP_GAINERS_LOSERS call; raises on errors and on rate-limit notices"""
+    response = requests.get(URL, params={'function': 'TOP_GAINERS_LOSERS', 'apikey': api_key}, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if not any(name in data for name in MOVER_LISTS):
+        # Rate limits and key problems come back as 200 with a "Note"/"Information"/"Error Message" field
+        message = data.get('Note') or data.get('Information') or data.get('Error Message') or str(data)[:200]
+        raise RuntimeError(f"Alpha Vantage returned no movers: {message}")
+    return data
+
+class MoversService:
+    """Background poller that keeps the latest movers snapshot in memory
+
+    Refreshes are spaced budget.window / budget.limit apart (at least
+    min_refresh seconds), and never happen while the budget is spent. Readers
+    only ever see the last good snapshot.
+    """
+
+    def __init__(self, api_key=None, budget=None, min_refresh=MIN_REFRESH_SECONDS, fetch=None):
+        self.api_key = api_key
+        self.budget = budget or CallBudget()
+        self.min_refresh = min_refresh
+        self.fetch = fetch or (lambda: fetch_movers(self.api_key or load_api_key()))
+        self.refresh_interval = max(min_refresh, self.budget.window / self.budget.limit)
+        self._snapshot = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self.errors = 0
+
+    def refresh(self):
+        """Fetch a new snapshot if the budget allows; returns True if one was stored"""
+        with self._refresh_lock:
+            if self.budget.wait_time() > 0:
+                return False
+            self.budget.record()
+            try:
+                data = self.fetch()
+            except Exception as e:
+                self.errors += 1
+                print(f"Movers refresh failed: {e}")
+                return False
+            self._snapshot = MoversSnapshot(data)
+            self._ready.set()
+            return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            # Sleep until the next scheduled refresh, or longer if the budget is spent
+            self._stop.wait(max(self.refresh_interval, self.budget.wait_time()))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self, wait=None):
+        """The last snapshot (None before the first refresh); wait seconds for the first one if given"""
+        if wait is not None:
+            self._ready.wait(wait)
+        return self._snapshot
+
+    def status(self):
+        snapshot = self._snapshot
+        return {
+            'last_updated': snapshot.last_updated if snapshot else None,
+            'fetched_at': snapshot.fetched_at if snapshot else None,
+            'calls_remaining': self.budget.remaining(),
+            'refresh_interval': self.refresh_interval,
+            'errors': self.errors,
+        }
+
+def make_handler(service):
+    class MoversHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == '/status':
+                return self._send(200, service.status())
+            if url.path != '/movers':
+                return self._send(404, {'error': 'not found'})
+
+            snapshot = service.snapshot()
+            if snapshot is None:
+                return self._send(503, {'error': 'no movers fetched yet'})
+            list_name = params.get('list', 'all')
+            by = params.get('by', 'change_amount')
+            if list_name not in snapshot.lists or by not in RANK_FIELDS:
+                return self._send(400, {'error': f"list must be one of {list(snapshot.lists)}, by one of {RANK_FIELDS}"})
+            try:
+                k = int(params.get('k', '10'))
+            except ValueError:
+                return self._send(400, {'error': 'k must be an integer'})
+            largest = params.get('order', 'top') != 'bottom'
+            return self._send(200, {
+                'last_updated': snapshot.last_updated,
+                'movers': snapshot.query(list_name, k, by, largest),
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return MoversHandler
+
+def serve(port=8001, host='127.0.0.1', service=None):
+    service = (service or MoversService()).start()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving movers on port {port}, refreshing every {service.refresh_interval / 60:.0f} min")
+    server.serve_forever()
 
 def sort_by_change_amount(data):
-    # Sort top gainers by highest change amount (descending)
-    top_gainers = sorted(data['top_gainers'], key=lambda x: float(x['change_amount']), reverse=True)
+    """Print the three movers lists ranked by change amount"""
+    snapshot = data if isinstance(data, MoversSnapshot) else MoversSnapshot(data)
+
     print("Top Gainers (Sorted by Change Amount):")
-    for gainer in top_gainers:
+    for gainer in snapshot.top(len(snapshot.lists['top_gainers']), list_name='top_gainers'):
         print(f"{gainer['ticker']}: Change Amount = {gainer['change_amount']}")
     print("\n")
 
-    # Sort top losers by highest negative change amount (ascending)
-    top_losers = sorted(data['top_losers'], key=lambda x: float(x['change_amount']))
     print("Top Losers (Sorted by Change Amount):")
-    for loser in top_losers:
+    for loser in snapshot.bottom(len(snapshot.lists['top_losers']), list_name='top_losers'):
         print(f"{loser['ticker']}: Change Amount = {loser['change_amount']}")
     print("\n")
 
-    # Sort most actively traded by highest change amount (descending)
-    most_active = sorted(data['most_actively_traded'], key=lambda x: float(x['change_amount']), reverse=True)
     print("Most Actively Traded (Sorted by Change Amount):")
-    for active in most_active:
+    for active in snapshot.top(len(snapshot.lists['most_actively_traded']), list_name='most_actively_traded'):
         print(f"{active['ticker']}: Change Amount = {active['change_amount']}")
 
-# Call the function
-sort_by_change_amount(data)
\ No newline at end of file
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else 8001)
+    else:
+        service = MoversService()
+        if service.refresh():
+            sort_by_change_amount(service.snapshot())
+        else:
+            print(f"No movers fetched ({service.budget.remaining()} calls left in the budget)")
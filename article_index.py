@@ -0,0 +1,100 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from http_cache import normalize_url
+
+def headline_hash(headline):
+    """Hash of a headline with case and whitespace normalized"""
+    normalized = re.sub(r'\s+', ' ', str(headline or '')).strip().lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+def url_hash(url):
+    """Hash of the canonical form of an article URL"""
+    return hashlib.sha1(normalize_url(str(url or '')).encode('utf-8')).hexdigest()
+
+def article_keys(article):
+    """(url hash, headline hash) of an article dict, '' for a missing link or headline
+
+    Empty keys are never looked up, so link-less articles (e.g. CNBC items scraped
+    with link="") do not all count as one URL.
+    """
+    link = str(article.get('link') or '').strip()
+    headline = str(article.get('headline') or '').strip()
+    return (url_hash(link) if link else '', headline_hash(headline) if headline else '')
+
+class ArticleIndex:
+    """Persistent index of articles that have already been ingested
+
+    An article counts as seen when either its canonical URL or its normalized
+    headline has been recorded before, so the same story reached through a
+    different tracking link is not emitted twice.
+    """
+
+    def __init__(self, path=os.path.join('cache', 'seen_articles.sqlite')):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_articles (
+                url_hash TEXT,
+                headline_hash TEXT,
+                url TEXT,
+                headline TEXT,
+                first_seen REAL,
+                PRIMARY KEY (url_hash, headline_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_headline ON seen_articles (headline_hash)")
+        self._conn.commit()
+
+    def is_seen(self, article):
+        with self._lock:
+            return self._is_seen(*article_keys(article))
+
+    def _is_seen(self, u_hash, h_hash):
+        # '' never matches, so an article missing its link is only checked by headline (and vice versa)
+        row = self._conn.execute(
+            "SELECT 1 FROM seen_articles WHERE (url_hash = ? AND url_hash != '') "
+            "OR (headline_hash = ? AND headline_hash != '') LIMIT 1",
+            (u_hash, h_hash)
+        ).fetchone()
+        return row is not None
+
+    def filter_new(self, articles):
+        """Return only the articles (dicts with 'link' and 'headline') not ingested before"""
+        new_articles = []
+        batch_urls = set()
+        batch_headlines = set()
+        with self._lock:
+            for article in articles:
+                u_hash, h_hash = article_keys(article)
+                # Also dedupe within this batch
+                if (u_hash and u_hash in batch_urls) or (h_hash and h_hash in batch_headlines):
+                    continue
+                if self._is_seen(u_hash, h_hash):
+                    continue
+                batch_urls.add(u_hash)
+                batch_headlines.add(h_hash)
+                new_articles.append(article)
+        return new_articles
+
+    def mark_seen(self, articles):
+        """Record articles as ingested"""
+        now = time.time()
+        rows = [article_keys(a) + (a.get('link'), a.get('headline'), now) for a in articles]
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO seen_articles VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,173 @@
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+# Columns every scraped article has; anything else (bodies, scores, ...) is stored as it comes
+ARTICLE_SCHEMA = pa.schema([
+    ('headline', pa.string()),
+    ('summary', pa.string()),
+    ('link', pa.string()),
+    ('published_date', pa.string()),
+    ('source', pa.string()),
+    ('scraped_date', pa.string()),
+    ('category', pa.string()),
+    ('matched_terms', pa.list_(pa.string())),
+    ('matched_tickers', pa.list_(pa.string())),
+])
+
+# Articles are laid out as <root>/date=YYYY-MM-DD/source=<source>/part-*.parquet
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string()), ('source', pa.string())]), flavor='hive')
+
+class ArticleStore:
+    """Append-only Parquet dataset of scraped articles, partitioned by scrape date and source
+
+    Reads only open the partitions matching the date and source filters, and
+    only the requested columns are decoded.
+    """
+
+    def __init__(self, root=os.path.join('data', 'articles')):
+        self.root = root
+
+    def append(self, df):
+        """Append a DataFrame of articles as new files in their date/source partitions"""
+        if df.empty:
+            return 0
+        df = df.copy()
+        df['date'] = pd.to_datetime(df['scraped_date'], errors='coerce').dt.strftime('%Y-%m-%d').fillna('unknown')
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = self._conform(table)
+        ds.write_dataset(
+            table,
+            self.root,
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        return len(df)
+
+    @staticmethod
+    def _conform(table):
+        """Cast the standard columns to their fixed types and add any that are missing"""
+        for field in ARTICLE_SCHEMA:
+            if field.name in table.column_names:
+                index = table.column_names.index(field.name)
+                table = table.set_column(index, field, table.column(field.name).cast(field.type))
+            else:
+                table = table.append_column(field, pa.nulls(len(table), field.type))
+        return table
+
+    def dataset(self):
+        """The dataset over every stored file, with a schema unified across appends"""
+        if not os.path.isdir(self.root):
+            return None
+        dataset = ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+        schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+        if not schemas:
+            return None
+        schema = pa.unify_schemas(schemas + [PARTITIONING.schema], promote_options='permissive')
+        return ds.dataset(self.root, schema=schema, format='parquet', partitioning=PARTITIONING)
+
+    def read(self, sources=None, start_date=None, end_date=None, tickers=None, columns=None):
+        """Load articles as a DataFrame
+
+        Parameters:
+        sources (list): Only these sources, e.g. ['CNBC', 'Bloomberg']
+        start_date, end_date (str): Inclusive 'YYYY-MM-DD' bounds on the scrape date
+        tickers (list): Only articles whose matched_tickers include one of these
+        columns (list): Only load these columns
+
+        Returns:
+        pandas.DataFrame: Matching articles
+        """
+        dataset = self.dataset()
+        if dataset is None:
+            return pd.DataFrame(columns=columns or ARTICLE_SCHEMA.names)
+
+        # Date and source filters only touch the matching partition directories
+        condition = None
+        if sources:
+            condition = _and(condition, ds.field('source').isin(list(sources)))
+        if start_date:
+            condition = _and(condition, ds.field('date') >= str(start_date))
+        if end_date:
+            condition = _and(condition, ds.field('date') <= str(end_date))
+
+        read_columns = None
+        if columns:
+            read_columns = list(columns)
+            if tickers and 'matched_tickers' not in read_columns:
+                read_columns.append('matched_tickers')
+        table = dataset.to_table(columns=read_columns, filter=condition)
+
+        if tickers:
+            # Keep rows where any matched ticker is in the requested set
+            wanted = pa.array([ticker.lower() for ticker in tickers])
+            flat = pc.list_flatten(table['matched_tickers'])
+            parents = pc.list_parent_indices(table['matched_tickers'])
+            rows = pc.unique(pc.filter(parents, pc.is_in(flat, value_set=wanted)))
+            table = table.take(pc.take(rows, pc.sort_indices(rows)))
+            if columns and 'matched_tickers' not in columns:
+                table = table.drop_columns(['matched_tickers'])
+
+        return table.to_pandas()
+
+    def compact(self, date):
+        """Merge the small per-run files of one day into a single file per source"""
+        dataset = self.dataset()
+        if dataset is None:
+            return
+        table = dataset.to_table(filter=ds.field('date') == str(date))
+        if table.num_rows == 0:
+            return
+        self._write_day(date, table)
+
+    def replace_day(self, date, df):
+        """Rewrite one day's partition with df, e.g. after adding columns to articles read from it"""
+        if df.empty:
+            return
+        table = pa.Table.from_pandas(df.drop(columns=['date'], errors='ignore'), preserve_index=False)
+        self._write_day(date, self._conform(table))
+
+    def _write_day(self, date, table):
+        """Replace the files of one day with table, written as a single file per source
+
+        The new files are written aside and swapped in with renames, so the day is never
+        missing from the store. Work directories start with '_', which dataset scans skip.
+        """
+        day_dir = os.path.join(self.root, f"date={date}")
+        tmp_dir = os.path.join(self.root, f"_compacting-{date}")
+        old_dir = os.path.join(self.root, f"_replaced-{date}")
+        # Leftovers of an interrupted compaction; the old files go back if the swap never finished
+        if os.path.isdir(old_dir):
+            if os.path.isdir(day_dir):
+                shutil.rmtree(old_dir)
+            else:
+                os.rename(old_dir, day_dir)
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+        if 'date' in table.column_names:
+            table = table.drop_columns(['date'])
+        ds.write_dataset(
+            table.append_column('date', pa.array([str(date)] * table.num_rows, pa.string())),
+            tmp_dir,
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template='part-compacted-{i}.parquet',
+        )
+        if os.path.isdir(day_dir):
+            os.rename(day_dir, old_dir)
+        os.rename(os.path.join(tmp_dir, f"date={date}"), day_dir)
+        shutil.rmtree(tmp_dir)
+        if os.path.isdir(old_dir):
+            shutil.rmtree(old_dir)
+
+def _and(condition, clause):
+    return clause if condition is None else condition & clause
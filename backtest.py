@@ -0,0 +1,352 @@
+"""Walk-forward backtesting of the LSTM pipeline
+
+prepare_lstm_data() makes a single 80/20 split. Here the model is trained on a
+rolling (or expanding) window of history and tested on the bars that follow
+it, fold after fold, so the metrics show how it holds up over time. The
+predictions are also traded as a long/flat strategy.
+
+Features are computed once per ticker and cached as .npy files that every
+worker memory-maps. Each fold fits its scalers on its own training rows only,
+and its windows are strided views into the shared buffer (see lstm_windows.py).
+Independent folds run in parallel processes; warm-started folds run in order
+because each one starts from the previous fold's weights.
+
+Usage: python backtest.py NVDA [look_back ...]
+"""
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from train_universe import _init_worker
+
+FEATURE_CACHE_DIR = os.path.join('cache', 'backtest')
+
+# Bars per year, for annualizing the strategy's Sharpe ratio
+PERIODS_PER_YEAR = {'1d': 252, '1wk': 52, '1mo': 12, '1h': 252 * 7}
+
+def walk_forward_splits(n_samples, train_size, test_size, step=None, expanding=False):
+    """
+    Fold boundaries over n_samples chronologically ordered windows
+
+    Parameters:
+    n_samples (int): Number of windows
+    train_size (int): Training windows per fold (the first fold's size when expanding)
+    test_size (int): Test windows per fold
+    step (int): Windows between fold starts (default: test_size, so test periods don't overlap)
+    expanding (bool): Keep every earlier window in the training set instead of a rolling window
+
+    Returns:
+    list: (train_start, train_end, test_end) per fold; test windows are [train_end, test_end)
+    """
+    step = step or test_size
+    folds = []
+    train_end = train_size
+    while train_end < n_samples:
+        train_start = 0 if expanding else train_end - train_size
+        folds.append((train_start, train_end, min(train_end + test_size, n_samples)))
+        train_end += step
+    return folds
+
+def cache_features(ticker, period='5y', interval='1d', cache_dir=FEATURE_CACHE_DIR):
+    """
+    Compute get_stock_data() features once and store them as .npy files for memory-mapping
+
+    Returns:
+    str: Directory holding features.npy, target.npy, close.npy, dates.npy and columns.json
+    """
+    from forecasting import feature_columns
+    from prediction import get_stock_data
+
+    data = get_stock_data(ticker, period, interval)
+    if data.empty:
+        raise ValueError(f"No data for {ticker}")
+    columns = feature_columns(data)
+    last = pd.Timestamp(data.index[-1]).strftime('%Y%m%d%H%M')
+    path = os.path.join(cache_dir, f"{ticker.upper()}_{interval}_{period}_{len(data)}_{last}")
+    if os.path.exists(os.path.join(path, 'columns.json')):
+        return path
+
+    tmp_path = path + '.tmp'
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, 'features.npy'), np.ascontiguousarray(data[columns].values, dtype=np.float32))
+    np.save(os.path.join(tmp_path, 'target.npy'), data['Target'].values.astype(np.float64))
+    np.save(os.path.join(tmp_path, 'close.npy'), data['Close'].values.astype(np.float64))
+    np.save(os.path.join(tmp_path, 'dates.npy'), pd.DatetimeIndex(data.index).tz_localize(None).values)
+    with open(os.path.join(tmp_path, 'columns.json'), 'w', encoding='utf-8') as f:
+        json.dump(columns, f)
+    os.replace(tmp_path, path)
+    return path
+
+def load_features(path):
+    """Memory-mapped arrays written by cache_features()"""
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+              for name in ('features', 'target', 'close', 'dates')}
+    with open(os.path.join(path, 'columns.json'), encoding='utf-8') as f:
+        arrays['columns'] = json.load(f)
+    return arrays
+
+def _fit_fold(arrays, spec, fold, model=None):
+    """Train (or continue training) a model on one fold and predict its test windows"""
+    from sklearn.preprocessing import MinMaxScaler
+    from lstm_windows import sliding_windows
+    from prediction import build_lstm_model, train_model, make_predictions, evaluate_model
+
+    look_back = spec['look_back']
+    train_start, train_end, test_end = fold
+    features, target = arrays['features'], arrays['target']
+
+    # Window i covers feature rows i..i + look_back - 1 and its label is target[i + look_back].
+    # Scalers only see rows the training windows and labels touch.
+    scaler_X = MinMaxScaler(feature_range=(0, 1))
+    scaler_y = MinMaxScaler(feature_range=(0, 1))
+    scaler_X.fit(features[train_start:train_end + look_back - 1])
+    scaler_y.fit(target[train_start + look_back:train_end + look_back].reshape(-1, 1))
+
+    # Only the rows this fold touches get scaled; the windows are views into that block
+    block = np.asarray(scaler_X.transform(features[train_start:test_end + look_back]), dtype=np.float32)
+    windows = sliding_windows(block, look_back)
+    labels = scaler_y.transform(target[train_start + look_back:test_end + look_back].reshape(-1, 1))[:, 0]
+
+    n_train = train_end - train_start
+    X_train, y_train = windows[:n_train], labels[:n_train]
+    X_test, y_test = windows[n_train:], labels[n_train:]
+
+    # Early stopping watches the end of the training window, never the test period
+    n_val = max(1, int(n_train * spec['validation_fraction']))
+    if model is None:
+        model = build_lstm_model((look_back, features.shape[1]), units=spec['units'], dropout=spec['dropout'])
+        epochs = spec['epochs']
+    else:
+        epochs = spec['warm_epochs']
+    model, history = train_model(model, X_train[:-n_val], y_train[:-n_val], X_train[-n_val:], y_train[-n_val:],
+                                 epochs=epochs, batch_size=spec['batch_size'], verbose=0)
+
+    predictions = make_predictions(model, X_test, scaler_y, verbose=0)
+    metrics = evaluate_model(y_test, predictions, scaler_y)
+    return model, predictions[:, 0], metrics, len(history.history['loss'])
+
+def _run_folds(spec, folds):
+    """Worker task: one fold, or a warm-started chain of folds, for one config"""
+    import tensorflow as tf
+
+    arrays = load_features(spec['features_path'])
+    results = []
+    model = None
+    try:
+        for number, fold in folds:
+            start = time.perf_counter()
+            model, predictions, metrics, epochs = _fit_fold(arrays, spec, fold, model if spec['warm_start'] else None)
+            results.append({
+                'config': spec['config'],
+                'fold': number,
+                'bounds': fold,
+                'predictions': predictions,
+                'metrics': {k: float(v) for k, v in metrics.items()},
+                'epochs': epochs,
+                'seconds': time.perf_counter() - start,
+            })
+    finally:
+        tf.keras.backend.clear_session()
+    return results
+
+def _default_spec(features_path, look_back=60, units=50, dropout=0.2, epochs=20, warm_epochs=5,
+                  batch_size=32, validation_fraction=0.1, warm_start=False):
+    return {
+        'features_path': features_path,
+        'look_back': look_back,
+        'units': units,
+        'dropout': dropout,
+        'epochs': epochs,
+        'warm_epochs': warm_epochs,
+        'batch_size': batch_size,
+        'validation_fraction': validation_fraction,
+        'warm_start': warm_start,
+    }
+
+def _tasks(spec, n_rows, train_size, test_size, step, expanding):
+    folds = list(enumerate(walk_forward_splits(n_rows - spec['look_back'], train_size, test_size, step, expanding)))
+    if not folds:
+        raise ValueError(f"Not enough data for one fold: {n_rows} rows, look_back {spec['look_back']}, "
+                         f"train_size {train_size}")
+    if spec['warm_start']:
+        return [(spec, folds)]
+    return [(spec, [fold]) for fold in folds]
+
+def _execute(tasks, workers, threads_per_worker):
+    """Run tasks in a spawn pool with capped TensorFlow threads, or inline for a single worker"""
+    results = []
+    def report(done, fold_results):
+        results.extend(fold_results)
+        for result in fold_results:
+            print(f"[{done}/{len(tasks)}] config {result['config']} fold {result['fold']}: "
+                  f"RMSE {result['metrics']['RMSE']:.4f} in {result['seconds']:.1f}s")
+
+    if workers == 1:
+        for done, (spec, folds) in enumerate(tasks, 1):
+            report(done, _run_folds(spec, folds))
+        return results
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+        futures = [pool.submit(_run_folds, spec, folds) for spec, folds in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            report(done, future.result())
+    return results
+
+def _max_drawdown(equity):
+    peak = np.maximum.accumulate(equity)
+    return float(np.max(1 - equity / peak)) if len(equity) else 0.0
+
+def pnl_summary(daily, interval='1d'):
+    """Total return, annualized Sharpe, max drawdown, hit rate and exposure of the long/flat strategy"""
+    returns = daily['strategy_return'].values
+    per_year = PERIODS_PER_YEAR.get(interval, 252)
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    held = daily['position'].values > 0
+    return {
+        'total_return': float(np.prod(1 + returns) - 1),
+        'buy_hold_return': float(np.prod(1 + daily['buy_hold_return'].values) - 1),
+        'sharpe': float(returns.mean() / std * np.sqrt(per_year)) if std > 0 else 0.0,
+        'max_drawdown': _max_drawdown(np.cumprod(1 + returns)),
+        'hit_rate': float((returns[held] > 0).mean()) if held.any() else 0.0,
+        'exposure': float(held.mean()) if len(held) else 0.0,
+        'trades': int(np.abs(np.diff(np.concatenate([[0], daily['position'].values]))).sum()),
+    }
+
+def _assemble(results, arrays, look_back, cost_bps):
+    """Per-fold metrics table and the stitched daily long/flat P&L of one config"""
+    close, target, dates = arrays['close'], arrays['target'], arrays['dates']
+    fold_rows, daily = [], []
+    for result in sorted(results, key=lambda r: r['fold']):
+        train_start, train_end, test_end = result['bounds']
+        samples = np.arange(train_end, test_end)
+        # The window of sample i ends on row r = i + look_back - 1 and predicts target[r + 1] = close[r + 2].
+        # The signal (prediction above the last known close) is held from close[r + 1] to close[r + 2].
+        last_row = samples + look_back - 1
+        position = (result['predictions'] > close[last_row]).astype(float)
+        next_return = target[last_row + 1] / close[last_row + 1] - 1
+
+        frame = pd.DataFrame({
+            'date': dates[last_row + 1],
+            'fold': result['fold'],
+            'close': close[last_row + 1],
+            'predicted': result['predictions'],
+            'actual': target[last_row + 1],
+            'position': position,
+            'buy_hold_return': next_return,
+        })
+        daily.append(frame)
+
+        fold_rows.append(dict(
+            fold=result['fold'],
+            train_start=pd.Timestamp(dates[train_start + look_back]),
+            train_end=pd.Timestamp(dates[train_end + look_back - 1]),
+            test_start=pd.Timestamp(dates[train_end + look_back]),
+            test_end=pd.Timestamp(dates[test_end + look_back - 1]),
+            n_train=train_end - train_start,
+            n_test=test_end - train_end,
+            epochs=result['epochs'],
+            seconds=round(result['seconds'], 1),
+            **result['metrics'],
+        ))
+
+    # Overlapping test periods (step < test_size) keep the prediction of the most recently trained fold
+    daily = pd.concat(daily).drop_duplicates('date', keep='last').sort_values('date').reset_index(drop=True)
+    turnover = np.abs(np.diff(np.concatenate([[0], daily['position'].values])))
+    daily['strategy_return'] = daily['position'] * daily['buy_hold_return'] - turnover * cost_bps / 10000
+    daily['equity'] = np.cumprod(1 + daily['strategy_return'].values)
+
+    folds = pd.DataFrame(fold_rows)
+    fold_pnl = daily.groupby('fold').agg(
+        strategy_return=('strategy_return', lambda r: np.prod(1 + r) - 1),
+        buy_hold=('buy_hold_return', lambda r: np.prod(1 + r) - 1),
+    )
+    folds = folds.join(fold_pnl, on='fold')
+    return folds, daily
+
+def walk_forward_backtest(ticker, period='5y', interval='1d', train_size=500, test_size=60, step=None,
+                          expanding=False, warm_start=False, cost_bps=0, workers=None, threads_per_worker=1,
+                          **model_options):
+    """
+    Walk-forward backtest of the LSTM model on one ticker
+
+    Parameters:
+    ticker (str): Stock ticker symbol
+    period (str): Period of historical data
+    interval (str): Interval of data
+    train_size (int): Training windows per fold (initial size when expanding)
+    test_size (int): Test windows per fold
+    step (int): Windows between fold starts (default: test_size)
+    expanding (bool): Expanding instead of rolling training window
+    warm_start (bool): Continue training the previous fold's model for warm_epochs instead of retraining
+    cost_bps (float): Trading cost per position change, in basis points
+    workers (int): Worker processes (default: CPU count // threads_per_worker; 1 runs inline)
+    threads_per_worker (int): TensorFlow intra-op threads per worker
+    **model_options: look_back, units, dropout, epochs, warm_epochs, batch_size, validation_fraction
+
+    Returns:
+    dict: 'folds' (per-fold metrics), 'daily' (predictions, positions and P&L per bar), 'summary' (P&L summary)
+    """
+    features_path = cache_features(ticker, period, interval)
+    arrays = load_features(features_path)
+    spec = dict(_default_spec(features_path, warm_start=warm_start, **model_options), config=0)
+
+    tasks = _tasks(spec, len(arrays['features']), train_size, test_size, step, expanding)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    print(f"Backtesting {ticker}: {sum(len(folds) for _, folds in tasks)} folds on {min(workers, len(tasks))} workers")
+    results = _execute(tasks, min(workers, len(tasks)), threads_per_worker)
+
+    folds, daily = _assemble(results, arrays, spec['look_back'], cost_bps)
+    return {'folds': folds, 'daily': daily, 'summary': pnl_summary(daily, interval)}
+
+def sweep(ticker, configs, period='5y', interval='1d', train_size=500, test_size=60, step=None,
+          expanding=False, warm_start=False, cost_bps=0, workers=None, threads_per_worker=1, **model_options):
+    """
+    Backtest several model configs over the same folds, with every fold of every config in one pool
+
+    Parameters:
+    configs (list): Dicts of model options to vary, e.g. [{'look_back': 30}, {'look_back': 60, 'units': 100}]
+    **model_options: Options shared by every config, overridden by the config's own
+    (other parameters as in walk_forward_backtest)
+
+    Returns:
+    pandas.DataFrame: One row per config with mean fold metrics and the P&L summary
+    """
+    features_path = cache_features(ticker, period, interval)
+    arrays = load_features(features_path)
+    n_rows = len(arrays['features'])
+
+    specs = [dict(_default_spec(features_path, warm_start=warm_start, **dict(model_options, **config)), config=i)
+             for i, config in enumerate(configs)]
+    tasks = [task for spec in specs for task in _tasks(spec, n_rows, train_size, test_size, step, expanding)]
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    print(f"Sweeping {len(configs)} configs for {ticker}: {len(tasks)} tasks on {min(workers, len(tasks))} workers")
+    results = _execute(tasks, min(workers, len(tasks)), threads_per_worker)
+
+    rows = []
+    for spec, config in zip(specs, configs):
+        folds, daily = _assemble([r for r in results if r['config'] == spec['config']], arrays,
+                                 spec['look_back'], cost_bps)
+        row = dict(config)
+        row.update(folds[['RMSE', 'MAE', 'Direction Accuracy']].mean().add_prefix('mean_'))
+        row.update(pnl_summary(daily, interval))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    ticker = sys.argv[1] if len(sys.argv) > 1 else 'NVDA'
+    look_backs = [int(v) for v in sys.argv[2:]]
+    if look_backs:
+        print(sweep(ticker, [{'look_back': v} for v in look_backs]).to_string(index=False))
+    else:
+        result = walk_forward_backtest(ticker)
+        print(result['folds'].to_string(index=False))
+        for name, value in result['summary'].items():
+            print(f"{name}: {value}")
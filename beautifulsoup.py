@@ -1,14 +1,35 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
 import pandas as pd
 from datetime import datetime
 import time
 import random
-import json
 import os
 import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from urllib.parse import urlparse, urljoin
 
+from http_cache import ResponseCache
+from debug_capture import DebugCapture
+from article_index import ArticleIndex, url_hash
+from keyword_matcher import KeywordMatcher
+from article_store import ArticleStore
+from sentiment import score_articles
+from entity_index import get_entity_index
+from near_duplicates import get_near_duplicate_index
+import metrics
+
+# httpx (with the h2 extra) is optional; it is only needed for HTTP/2 connections
+try:
+    import httpx
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
+
 # Rotating set of user agents to appear more like different browsers
 USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36',
@@ -31,9 +52,30 @@ def get_headers():
         'Referer': 'https://www.google.com/'
     }
 
+# Connection pool settings shared by every scraper and extractor
+POOL_CONNECTIONS = 10     # Number of hosts to keep a connection pool for
+POOL_MAXSIZE = 10         # Keep-alive connections kept open per host
+KEEPALIVE_EXPIRY = 30     # Seconds an idle connection is kept open (HTTP/2 client only)
+USE_HTTP2 = True          # Use HTTP/2 through httpx when it is installed
+
 def create_session():
-    """Create a session with cookies enabled for better site compatibility"""
-    session = requests.Session()
+    """Create a session with cookies enabled and a keep-alive connection pool per host"""
+    if USE_HTTP2 and httpx is not None:
+        session = httpx.Client(
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                max_keepalive_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            )
+        )
+    else:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    
     # Add cookie consent for European sites
     session.cookies.set('cookieconsent_status', 'dismiss', domain='.yahoo.com')
     session.cookies.set('cookieconsent_status', 'dismiss', domain='.bloomberg.com')
@@ -41,34 +83,313 @@ def create_session():
     session.cookies.set('cookieconsent_status', 'dismiss', domain='.cnbc.com')
     return session
 
-def fetch_page(url, max_retries=3):
-    """Fetch a page with retries and better error handling"""
-    session = create_session()
+# Long-lived session shared by all fetches so connections (and TLS handshakes) are reused
+_shared_session = None
+_shared_session_lock = threading.Lock()
+_request_counts = {}
+
+if httpx is not None:
+    REQUEST_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError)
+else:
+    REQUEST_ERRORS = (requests.exceptions.RequestException,)
+
+def get_session():
+    """Return the shared pooled session, creating it on first use"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+def configure_http_pool(pool_connections=None, pool_maxsize=None, keepalive_expiry=None, http2=None):
+    """Change the pool settings and replace the shared session with a fresh one"""
+    global POOL_CONNECTIONS, POOL_MAXSIZE, KEEPALIVE_EXPIRY, USE_HTTP2
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if keepalive_expiry is not None:
+        KEEPALIVE_EXPIRY = keepalive_expiry
+    if http2 is not None:
+        USE_HTTP2 = http2
+    close_session()
+
+def close_session():
+    """Close the shared session and its pooled connections"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+        _shared_session = None
+        _request_counts.clear()
+
+def connection_stats():
+    """Report requests, new connections and reused connections per host for the shared session"""
+    stats = {host: {'requests': count, 'new_connections': None, 'reused': None}
+             for host, count in _request_counts.items()}
+    
+    session = _shared_session
+    if isinstance(session, requests.Session):
+        # urllib3 counts how many connections each host pool had to open
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = stats.setdefault(pool.host, {'requests': 0})
+                host_stats['new_connections'] = pool.num_connections
+                host_stats['reused'] = max(pool.num_requests - pool.num_connections, 0)
+    
+    return stats
+
+class DomainThrottle:
+    """Per-domain politeness: space out requests to the same host and back off on errors.
+
+    Requests to different domains never wait on each other, so sources can be
+    scraped in parallel while each individual site still sees a polite rate.
+    """
+
+    def __init__(self, min_interval=(5, 10), backoff_base=3, max_backoff=60, domain_intervals=None):
+        self.min_interval = min_interval
+        # (low, high) spacing for domains that tolerate a faster rate than min_interval
+        self.domain_intervals = dict(domain_intervals or {})
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._domain_locks = {}
+        self._next_allowed = {}
+
+    def _domain_lock(self, domain):
+        with self._lock:
+            if domain not in self._domain_locks:
+                self._domain_locks[domain] = threading.Lock()
+            return self._domain_locks[domain]
+
+    def wait(self, url):
+        """Reserve the next free slot for the domain of url and sleep until it comes"""
+        domain = urlparse(url).netloc.lower()
+        with self._domain_lock(domain):
+            now = time.monotonic()
+            slot = max(self._next_allowed.get(domain, 0), now)
+            interval = self.domain_intervals.get(domain, self.min_interval)
+            self._next_allowed[domain] = slot + random.uniform(*interval)
+        # Sleep outside the lock so concurrent callers queue up for the following slots
+        delay = slot - now
+        if delay > 0:
+            metrics.progress(f"Waiting {delay:.1f} seconds before next request to {domain}...")
+            time.sleep(delay)
+
+    def set_interval(self, domain, interval):
+        """Space requests to one domain (low, high) seconds apart instead of min_interval; None restores it"""
+        domain = domain.lower()
+        with self._lock:
+            if interval is None:
+                self.domain_intervals.pop(domain, None)
+            else:
+                self.domain_intervals[domain] = interval
+
+    def backoff(self, url, attempt, retry_after=None):
+        """Push the next allowed request to this domain out after a failed attempt"""
+        domain = urlparse(url).netloc.lower()
+        if retry_after is None:
+            # Exponential backoff with jitter
+            retry_after = min(self.backoff_base * (2 ** attempt), self.max_backoff)
+            retry_after += random.uniform(0, self.backoff_base)
+        with self._domain_lock(domain):
+            self._next_allowed[domain] = max(self._next_allowed.get(domain, 0), time.monotonic() + retry_after)
+
+# Shared by every listing-page fetch so all scrapers respect the same per-domain limits
+domain_throttle = DomainThrottle()
+
+# Article bodies are fetched in bulk by the extractors, which space their own requests per site
+ARTICLE_INTERVAL = (1, 2)
+article_throttle = DomainThrottle(min_interval=ARTICLE_INTERVAL)
+
+# On-disk conditional-GET cache behind fetch_page
+USE_HTTP_CACHE = True
+HTTP_CACHE_PATH = os.path.join('cache', 'http_cache.sqlite')
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+_response_cache = None
+
+def get_response_cache():
+    """Return the shared response cache, or None when caching is disabled"""
+    global _response_cache
+    if not USE_HTTP_CACHE:
+        return None
+    with _shared_session_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(HTTP_CACHE_PATH, max_bytes=HTTP_CACHE_MAX_BYTES)
+        return _response_cache
+
+# Parser backend used for every page, fastest first: 'lxml' (needs lxml), 'html.parser' or 'html5lib'.
+# Falls back to the built-in html.parser when the configured backend is not installed.
+HTML_PARSER = 'lxml'
+
+def resolve_parser(name=None):
+    """Return the configured BeautifulSoup parser if it is installed, else html.parser"""
+    name = name or HTML_PARSER
+    if builder_registry.lookup(name) is None:
+        return 'html.parser'
+    return name
+
+@metrics.timed('parse_html')
+def parse_html(response):
+    """Parse a fetched page exactly once, sharing the tree across all selector fallbacks
+    
+    The tree lives only as long as this response object. Extractors strip elements from it,
+    so trees are never shared between fetches (every cached response is a new object).
+    """
+    # Already parsed for this response object
+    soup = getattr(response, 'soup', None)
+    if soup is not None:
+        return soup
+    
+    soup = BeautifulSoup(response.text, resolve_parser())
+    response.soup = soup
+    return soup
+
+def cached_listing(source, response):
+    """Listing items source extracted from an unchanged copy of this page before, or None"""
+    cache = get_response_cache()
+    articles = cache.get_listing(source, response) if cache else None
+    if articles is None:
+        return None
+    metrics.inc('listing_cache_hits', source=source)
+    metrics.progress(f"Page unchanged, reusing {len(articles)} {source} articles")
+    scraped_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for article in articles:
+        article['scraped_date'] = scraped_date
+    return articles
+
+def remember_listing(source, response, articles):
+    """Keep the items extracted from a listing page for cached_listing(); returns articles"""
+    cache = get_response_cache()
+    if cache:
+        cache.set_listing(source, response, articles)
+    return articles
+
+def find_all_selector(soup, source, tag, attrs=None):
+    """soup.find_all(tag, attrs) timed as one selector fallback of a scraper, counting the elements it matched"""
+    attrs = attrs or {}
+    if not metrics.is_enabled():
+        return soup.find_all(tag, attrs)
+    selector = tag + ''.join(f'[{key}={value}]' for key, value in attrs.items())
+    with metrics.span('selector', source=source, selector=selector):
+        found = soup.find_all(tag, attrs)
+    metrics.inc('selector_matches', len(found), source=source, selector=selector)
+    return found
+
+# Raw page captures for debugging selectors; off by default since it is pure overhead in production
+DEBUG_CAPTURE = False
+DEBUG_DIR = 'debug'
+DEBUG_MAX_FILES = 200
+DEBUG_MAX_BYTES = 50 * 1024 * 1024
+
+_debug_capture = None
+
+def capture_debug_page(name, response):
+    """Save the raw page in the background when DEBUG_CAPTURE is enabled"""
+    global _debug_capture
+    if not DEBUG_CAPTURE:
+        return
+    with _shared_session_lock:
+        if _debug_capture is None:
+            _debug_capture = DebugCapture(DEBUG_DIR, max_files=DEBUG_MAX_FILES, max_bytes=DEBUG_MAX_BYTES)
+    _debug_capture.capture(name, response)
+
+def article_capture_name(site, url):
+    """Debug capture name of an article page: its last path segment, or a URL hash when the path has none"""
+    slug = urlparse(url).path.rstrip('/').split('/')[-1]
+    return f"{site}_article_{slug or url_hash(url)[:16]}"
+
+def _retry_after_seconds(response):
+    """Parse a numeric Retry-After header, if the server sent one"""
+    value = response.headers.get('Retry-After', '')
+    return float(value) if value.isdigit() else None
+
+# Stand-in for the network, e.g. replayed recordings (see bench_scrapers.py); None fetches live pages
+_page_fetcher = None
+
+def set_page_fetcher(fetcher):
+    """Serve every fetch_page call from fetcher(url) -> response or None, bypassing the session, throttle and
+    cache; None restores live fetching. Returns the previous fetcher."""
+    global _page_fetcher
+    previous = _page_fetcher
+    _page_fetcher = fetcher
+    return previous
+
+def fetch_page(url, max_retries=3, throttle=None):
+    """Fetch a page with retries and better error handling, spaced by throttle (default: domain_throttle)"""
+    if _page_fetcher is not None:
+        return _page_fetcher(url)
+    
+    host = urlparse(url).hostname
+    with metrics.span('fetch_page', host=host) as span:
+        response = _fetch_live(url, host, max_retries, throttle or domain_throttle)
+        span.set(outcome='cache' if getattr(response, 'from_cache', False) else 'ok' if response else 'failed')
+    return response
+
+def _fetch_live(url, host, max_retries, throttle):
+    session = get_session()
+    
+    # Serve fresh cache hits straight away, without touching the network or the throttle
+    cache = get_response_cache()
+    cached = cache.get(url) if cache else None
+    if cached is not None and cache.is_fresh(cached):
+        cache.record_hit()
+        metrics.inc('http_cache_hits', host=host)
+        metrics.progress(f"Cache hit: {url}")
+        return cached
     
     for attempt in range(max_retries):
+        if attempt:
+            metrics.inc('http_retries', host=host)
         try:
-            # Add a longer delay between attempts
-            if attempt > 0:
-                time.sleep(random.uniform(3, 7))
+            # Respect the per-domain rate limit (and any backoff from the previous attempt)
+            throttle.wait(url)
             
-            print(f"Attempt {attempt+1} to fetch: {url}")
+            metrics.progress(f"Attempt {attempt+1} to fetch: {url}")
             headers = get_headers()  # Get new headers for each attempt
+            if cached is not None:
+                # Revalidate the stale copy; a 304 skips the body transfer
+                headers.update(cached.validators())
             
-            response = session.get(url, headers=headers, timeout=20)
+            with metrics.span('http_request', host=host):
+                response = session.get(url, headers=headers, timeout=20)
+            with _shared_session_lock:
+                _request_counts[host] = _request_counts.get(host, 0) + 1
+            metrics.inc('http_responses', host=host, status=response.status_code)
             
             # Print status code for debugging
-            print(f"Status code: {response.status_code}")
+            metrics.progress(f"Status code: {response.status_code}")
             
-            if response.status_code == 200:
+            if response.status_code == 304 and cached is not None:
+                metrics.inc('http_revalidated', host=host)
+                metrics.progress(f"Not modified, using cached copy: {url}")
+                return cache.refresh(cached)
+            elif response.status_code == 200:
+                metrics.inc('http_bytes', len(response.content), host=host)
+                if cache:
+                    cache.store(url, response)
+                    response.cache_key = ResponseCache.key_for(url)
+                response.from_cache = False
                 return response
             elif response.status_code in [403, 401, 429]:
-                print(f"Access denied with status {response.status_code}. The site may be blocking web scraping.")
-                time.sleep(random.uniform(5, 10))  # Longer wait for rate limiting
+                metrics.progress(f"Access denied with status {response.status_code}. "
+                                 f"The site may be blocking web scraping.")
+                # Longer wait for rate limiting
+                throttle.backoff(url, attempt + 1, _retry_after_seconds(response))
             else:
-                print(f"Failed with status code {response.status_code}, retrying...")
+                metrics.progress(f"Failed with status code {response.status_code}, retrying...")
+                throttle.backoff(url, attempt)
                 
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}")
+        except REQUEST_ERRORS as e:
+            metrics.inc('http_errors', host=host, error=type(e).__name__)
+            metrics.progress(f"Request error: {e}")
+            throttle.backoff(url, attempt)
             
     return None
 
@@ -76,43 +397,45 @@ def scrape_yahoo_finance():
     """Scrape tech stock news from Yahoo Finance"""
     # Yahoo Finance tech stocks page
     url = "https://finance.yahoo.com/topic/tech/"
-    print(f"Scraping: {url}")
+    metrics.progress(f"Scraping: {url}")
     
     response = fetch_page(url)
     if not response:
         # Try an alternative Yahoo Finance URL
         url = "https://finance.yahoo.com/news/"
-        print(f"Trying alternative: {url}")
+        metrics.progress(f"Trying alternative: {url}")
         response = fetch_page(url)
         if not response:
             return []
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    articles = cached_listing("yahoo_finance", response)
+    if articles is not None:
+        return articles
+    
+    soup = parse_html(response)
     articles = []
     
     # Save debug HTML
-    os.makedirs("debug", exist_ok=True)
-    with open("debug/yahoo_finance.html", "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page("yahoo_finance", response)
     
     # Yahoo Finance has a few different article layouts
     # Try multiple selectors to find article containers
     
     # First approach - stream items
-    stream_items = soup.find_all('div', {'class': 'Ov(h)'})
+    stream_items = find_all_selector(soup, 'yahoo_finance', 'div', {'class': 'Ov(h)'})
     
     # Second approach - common article containers
     if not stream_items:
-        stream_items = soup.find_all('li', {'class': 'js-stream-content'})
+        stream_items = find_all_selector(soup, 'yahoo_finance', 'li', {'class': 'js-stream-content'})
     
     # Third approach - fallback to any div with a headline
     if not stream_items:
-        stream_items = soup.find_all('h3')
+        stream_items = find_all_selector(soup, 'yahoo_finance', 'h3')
         if stream_items:
             # Convert h3 elements to their parent containers
             stream_items = [h3.parent.parent for h3 in stream_items if h3.parent and h3.parent.parent]
     
-    print(f"Found {len(stream_items)} potential Yahoo Finance articles")
+    metrics.progress(f"Found {len(stream_items)} potential Yahoo Finance articles")
     
     for item in stream_items:
         try:
@@ -169,31 +492,34 @@ def scrape_yahoo_finance():
             })
             
         except Exception as e:
-            print(f"Error extracting Yahoo Finance article: {e}")
+            metrics.inc('listing_item_errors', source='yahoo_finance')
+            metrics.progress(f"Error extracting Yahoo Finance article: {e}")
     
-    return articles
+    return remember_listing("yahoo_finance", response, articles)
 
 def scrape_cnbc_finance():
     """Scrape tech stock news from CNBC Finance section"""
     url = "https://www.cnbc.com/technology/"
-    print(f"Scraping: {url}")
+    metrics.progress(f"Scraping: {url}")
     
     response = fetch_page(url)
     if not response:
         # Try alternative CNBC URL
         url = "https://www.cnbc.com/investing/"
-        print(f"Trying alternative: {url}")
+        metrics.progress(f"Trying alternative: {url}")
         response = fetch_page(url)
         if not response:
             return []
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    articles = cached_listing("cnbc_finance", response)
+    if articles is not None:
+        return articles
+    
+    soup = parse_html(response)
     articles = []
     
     # Save debug HTML
-    os.makedirs("debug", exist_ok=True)
-    with open("debug/cnbc_finance.html", "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page("cnbc_finance", response)
     
     # CNBC uses various card layouts
     card_containers = []
@@ -207,11 +533,11 @@ def scrape_cnbc_finance():
     ]
     
     for tag, attrs in selectors:
-        cards = soup.find_all(tag, attrs)
+        cards = find_all_selector(soup, 'cnbc_finance', tag, attrs)
         if cards:
             card_containers.extend(cards)
     
-    print(f"Found {len(card_containers)} potential CNBC articles")
+    metrics.progress(f"Found {len(card_containers)} potential CNBC articles")
     
     for item in card_containers:
         try:
@@ -257,35 +583,38 @@ def scrape_cnbc_finance():
             })
             
         except Exception as e:
-            print(f"Error extracting CNBC article: {e}")
+            metrics.inc('listing_item_errors', source='cnbc_finance')
+            metrics.progress(f"Error extracting CNBC article: {e}")
     
-    return articles
+    return remember_listing("cnbc_finance", response, articles)
 
 def scrape_bloomberg_tech():
     """Scrape tech stock news from Bloomberg"""
     url = "https://www.bloomberg.com/technology"
-    print(f"Scraping: {url}")
+    metrics.progress(f"Scraping: {url}")
     
     response = fetch_page(url)
     if not response:
         # Try alternative Bloomberg URL
         url = "https://www.bloomberg.com/markets"
-        print(f"Trying alternative: {url}")
+        metrics.progress(f"Trying alternative: {url}")
         response = fetch_page(url)
         if not response:
             return []
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    articles = cached_listing("bloomberg", response)
+    if articles is not None:
+        return articles
+    
+    soup = parse_html(response)
     articles = []
     
     # Save debug HTML
-    os.makedirs("debug", exist_ok=True)
-    with open("debug/bloomberg.html", "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page("bloomberg", response)
     
     # Bloomberg uses various article layouts
     # Try to find story packages
-    story_packages = soup.find_all('div', {'class': 'story-package'})
+    story_packages = find_all_selector(soup, 'bloomberg', 'div', {'class': 'story-package'})
     story_list = []
     
     if story_packages:
@@ -295,9 +624,10 @@ def scrape_bloomberg_tech():
     
     # If no stories found, try more generic article selectors
     if not story_list:
-        story_list = soup.find_all('article') or soup.find_all('div', {'class': ['story-list-story', 'storyItem']})
+        story_list = (find_all_selector(soup, 'bloomberg', 'article') or
+                      find_all_selector(soup, 'bloomberg', 'div', {'class': ['story-list-story', 'storyItem']}))
     
-    print(f"Found {len(story_list)} potential Bloomberg articles")
+    metrics.progress(f"Found {len(story_list)} potential Bloomberg articles")
     
     for item in story_list:
         try:
@@ -349,40 +679,43 @@ def scrape_bloomberg_tech():
             })
             
         except Exception as e:
-            print(f"Error extracting Bloomberg article: {e}")
+            metrics.inc('listing_item_errors', source='bloomberg')
+            metrics.progress(f"Error extracting Bloomberg article: {e}")
     
-    return articles
+    return remember_listing("bloomberg", response, articles)
 
 def scrape_marketwatch_tech():
     """Scrape tech stock news from MarketWatch"""
     url = "https://www.marketwatch.com/investing/technology"
-    print(f"Scraping: {url}")
+    metrics.progress(f"Scraping: {url}")
     
     response = fetch_page(url)
     if not response:
         # Try alternative URL
         url = "https://www.marketwatch.com/latest-news"
-        print(f"Trying alternative: {url}")
+        metrics.progress(f"Trying alternative: {url}")
         response = fetch_page(url)
         if not response:
             return []
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    articles = cached_listing("marketwatch", response)
+    if articles is not None:
+        return articles
+    
+    soup = parse_html(response)
     articles = []
     
     # Save debug HTML
-    os.makedirs("debug", exist_ok=True)
-    with open("debug/marketwatch.html", "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page("marketwatch", response)
     
     # MarketWatch article containers
-    story_containers = soup.find_all('div', {'class': 'article__content'})
+    story_containers = find_all_selector(soup, 'marketwatch', 'div', {'class': 'article__content'})
     
     if not story_containers:
         # Try alternative selectors
-        story_containers = soup.find_all('div', {'class': ['story', 'story__body']})
+        story_containers = find_all_selector(soup, 'marketwatch', 'div', {'class': ['story', 'story__body']})
     
-    print(f"Found {len(story_containers)} potential MarketWatch articles")
+    metrics.progress(f"Found {len(story_containers)} potential MarketWatch articles")
     
     for item in story_containers:
         try:
@@ -439,40 +772,43 @@ def scrape_marketwatch_tech():
             })
             
         except Exception as e:
-            print(f"Error extracting MarketWatch article: {e}")
+            metrics.inc('listing_item_errors', source='marketwatch')
+            metrics.progress(f"Error extracting MarketWatch article: {e}")
     
-    return articles
+    return remember_listing("marketwatch", response, articles)
 
 def scrape_investing_com():
     """Scrape tech stock news from Investing.com"""
     url = "https://www.investing.com/news/technology"
-    print(f"Scraping: {url}")
+    metrics.progress(f"Scraping: {url}")
     
     response = fetch_page(url)
     if not response:
         # Try alternative URL
         url = "https://www.investing.com/news/stock-market-news"
-        print(f"Trying alternative: {url}")
+        metrics.progress(f"Trying alternative: {url}")
         response = fetch_page(url)
         if not response:
             return []
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    articles = cached_listing("investing_com", response)
+    if articles is not None:
+        return articles
+    
+    soup = parse_html(response)
     articles = []
     
     # Save debug HTML
-    os.makedirs("debug", exist_ok=True)
-    with open("debug/investing_com.html", "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page("investing_com", response)
     
     # Investing.com article containers
-    news_items = soup.find_all('div', {'class': 'largeTitle'})
+    news_items = find_all_selector(soup, 'investing_com', 'div', {'class': 'largeTitle'})
     
     if not news_items:
         # Try alternative selectors
-        news_items = soup.find_all('article', {'class': 'js-article-item'})
+        news_items = find_all_selector(soup, 'investing_com', 'article', {'class': 'js-article-item'})
     
-    print(f"Found {len(news_items)} potential Investing.com articles")
+    metrics.progress(f"Found {len(news_items)} potential Investing.com articles")
     
     for item in news_items:
         try:
@@ -512,75 +848,79 @@ def scrape_investing_com():
             })
             
         except Exception as e:
-            print(f"Error extracting Investing.com article: {e}")
+            metrics.inc('listing_item_errors', source='investing_com')
+            metrics.progress(f"Error extracting Investing.com article: {e}")
     
-    return articles
+    return remember_listing("investing_com", response, articles)
+
+_tech_matcher = None
+
+def get_tech_matcher():
+    """Return the keyword matcher built from tech_terms.json, compiling it on first use"""
+    global _tech_matcher
+    if _tech_matcher is None:
+        _tech_matcher = KeywordMatcher.from_config()
+    return _tech_matcher
 
 def filter_tech_stock_articles(articles):
-    """Filter articles to focus on tech stocks"""
-    tech_terms = [
-        'tech', 'technology', 'apple', 'microsoft', 'google', 'alphabet', 'amazon', 
-        'tesla', 'nvidia', 'semiconductor', 'ai', 'artificial intelligence', 'meta', 
-        'facebook', 'netflix', 'cloud', 'cybersecurity', 'software', 'hardware',
-        'chips', 'intel', 'amd', 'tsmc', 'broadcom', 'oracle', 'salesforce',
-        'aapl', 'msft', 'googl', 'goog', 'amzn', 'tsla', 'nvda', 'meta', 'nflx'
-    ]
+    """Filter articles to focus on tech stocks, recording which terms and tickers matched"""
+    if not articles:
+        print("Filtered 0 tech stock articles from 0 total articles")
+        return []
     
-    tech_stock_articles = []
+    df = pd.DataFrame(articles)
+    if 'summary' not in df.columns:
+        df['summary'] = ''
     
-    for article in articles:
-        headline = article['headline'].lower()
-        summary = article.get('summary', '').lower()
-        
-        # Check if any tech terms appear in headline or summary
-        if any(term in headline or term in summary for term in tech_terms):
-            tech_stock_articles.append(article)
+    # Match whole words in headline and summary in a single pass over the column
+    text = df['headline'].fillna('') + '\n' + df['summary'].fillna('')
+    matches = get_tech_matcher().match_series(text)
+    
+    tech_stock_articles = []
+    for article, terms, tickers in zip(articles, matches['matched_terms'], matches['matched_tickers']):
+        if terms or tickers:
+            tech_stock_articles.append(dict(article, matched_terms=terms, matched_tickers=tickers))
     
     print(f"Filtered {len(tech_stock_articles)} tech stock articles from {len(articles)} total articles")
     return tech_stock_articles
 
-def scrape_tech_stock_news():
-    """Scrape tech stock news from multiple reputable financial sources"""
-    all_articles = []
-    target_source_count = 50  # Target number of articles to collect
-    
-    # Try multiple news sources
-    sources = [
-        {"name": "Yahoo Finance", "function": scrape_yahoo_finance},
-        {"name": "MarketWatch", "function": scrape_marketwatch_tech},
-        {"name": "CNBC", "function": scrape_cnbc_finance},
-        {"name": "Bloomberg", "function": scrape_bloomberg_tech},
-        {"name": "Investing.com", "function": scrape_investing_com}
-    ]
-    
-    # Shuffle sources for randomness
-    random.shuffle(sources)
-    
-    for source in sources:
-        try:
-            print(f"\nAttempting to scrape {source['name']}...")
-            articles = source['function']()
-            
-            # Add source-specific articles
-            if articles:
-                all_articles.extend(articles)
-                print(f"Scraped {len(articles)} articles from {source['name']}")
-                
-                # If we have enough articles, we can stop
-                if len(all_articles) >= target_source_count:
-                    print(f"Reached target of {target_source_count} articles")
-                    break
-            
-            # Sleep to avoid overloading servers and getting blocked
-            delay = random.uniform(5, 10)
-            print(f"Waiting {delay:.1f} seconds before next source...")
-            time.sleep(delay)
-                
-        except Exception as e:
-            print(f"Error scraping {source['name']}: {e}")
+# Parquet dataset every run appends its articles to (see article_store.ArticleStore.read)
+ARTICLE_STORE_DIR = os.path.join('data', 'articles')
+
+# Flag copies of a story syndicated across sources, keeping one canonical article per story (see near_duplicates.py)
+COLLAPSE_NEAR_DUPLICATES = True
+
+# Score headline/summary sentiment before saving; bodies are scored once extracted (sentiment.score_articles)
+SCORE_SENTIMENT = True
+
+# Persistent record of already-ingested articles, so each run only emits new ones
+ARTICLE_INDEX_PATH = os.path.join('cache', 'seen_articles.sqlite')
+
+_article_index = None
+
+def get_article_index():
+    """Return the shared seen-article index, creating it on first use"""
+    global _article_index
+    with _shared_session_lock:
+        if _article_index is None:
+            _article_index = ArticleIndex(ARTICLE_INDEX_PATH)
+        return _article_index
+
+def ingest_articles(all_articles, incremental=True, filter_tech=True):
+    """Dedupe, filter, score and tag a list of article dicts, then save them to the article store
+    
+    Used by scrape_tech_stock_news and by other feeds such as custom_search.ingest_search_results.
+    With filter_tech=False articles are kept without the tech keyword filter.
+    """
+    # Skip articles already ingested by an earlier run
+    if incremental:
+        article_index = get_article_index()
+        scraped_count = len(all_articles)
+        all_articles = article_index.filter_new(all_articles)
+        print(f"{len(all_articles)} of {scraped_count} scraped articles are new since the last run")
     
     # Filter to focus on tech stock related articles
-    tech_stock_articles = filter_tech_stock_articles(all_articles)
+    tech_stock_articles = filter_tech_stock_articles(all_articles) if filter_tech else list(all_articles)
     
     # Convert to DataFrame for easier analysis
     df = pd.DataFrame(tech_stock_articles)
@@ -590,59 +930,133 @@ def scrape_tech_stock_news():
         df.drop_duplicates(subset=['headline'], inplace=True)
         print(f"Removed duplicates, down to {len(df)} unique articles")
     
-    # Save to CSV if we have articles
+    # Syndicated copies with reworded headlines are stored too, flagged with is_canonical False
+    if not df.empty and COLLAPSE_NEAR_DUPLICATES:
+        df = get_near_duplicate_index().assign(df).reset_index(drop=True)
+        print(f"Flagged {int((~df['is_canonical']).sum())} near-duplicates, "
+              f"{int(df['is_canonical'].sum())} distinct stories")
+    
+    # Scores come from the sentiment cache for any text scored before
+    if not df.empty and SCORE_SENTIMENT:
+        df = score_articles(df)
+    
+    # Tag the tickers each article is about and index them by ticker and day
     if not df.empty:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"tech_stock_news_{timestamp}.csv"
-        df.to_csv(filename, index=False, encoding='utf-8')
-        print(f"Saved {len(df)} articles to {filename}")
-        
-        # Also save as JSON for easier inspection
-        df.to_json(f"tech_stock_news_{timestamp}.json", orient="records", indent=4)
-        print(f"Saved JSON version to tech_stock_news_{timestamp}.json")
+        entity_index = get_entity_index()
+        df = entity_index.tag(df)
+    
+    # Append to the partitioned article store if we have articles
+    if not df.empty:
+        ArticleStore(ARTICLE_STORE_DIR).append(df)
+        # A syndicated copy would count the same story twice in the daily news features
+        entity_index.add(df[df['is_canonical']] if 'is_canonical' in df.columns else df)
+        print(f"Saved {len(df)} articles to {ARTICLE_STORE_DIR}")
+    elif incremental:
+        print("No new articles since the last run.")
     else:
         print("No articles were found from any source.")
     
+    # Record every evaluated article as seen, including the ones the tech filter dropped,
+    # so they do not count as new again on every later run
+    if incremental:
+        article_index.mark_seen(all_articles)
+    
     return df
 
-def extract_article_content(url):
-    """Extract the main text content from an article URL with site-specific handling"""
-    if not url or not url.startswith('http'):
-        return "No valid URL provided"
+def scrape_tech_stock_news(incremental=True):
+    """Scrape tech stock news from multiple reputable financial sources
+    
+    With incremental=True only articles that were not ingested by an earlier run are returned and saved.
+    """
+    all_articles = []
+    target_source_count = 50  # Target number of articles to collect
+    
+    # Try multiple news sources
+    sources = [
+        {"name": "Yahoo Finance", "function": scrape_yahoo_finance},
+        {"name": "MarketWatch", "function": scrape_marketwatch_tech},
+        {"name": "CNBC", "function": scrape_cnbc_finance},
+        {"name": "Bloomberg", "function": scrape_bloomberg_tech},
+        {"name": "Investing.com", "function": scrape_investing_com}
+    ]
+    
+    # Shuffle sources for randomness
+    random.shuffle(sources)
+    
+    # Scrape all sources in parallel; politeness is enforced per domain by fetch_page
+    print(f"\nScraping {len(sources)} sources in parallel...")
+    executor = ThreadPoolExecutor(max_workers=len(sources))
+    futures = {executor.submit(source['function']): source for source in sources}
+    
+    try:
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                articles = future.result()
+                
+                # Add source-specific articles
+                if articles:
+                    all_articles.extend(articles)
+                    print(f"Scraped {len(articles)} articles from {source['name']}")
+                    
+                    # If we have enough articles, we can stop
+                    if len(all_articles) >= target_source_count:
+                        print(f"Reached target of {target_source_count} articles")
+                        break
+                    
+            except Exception as e:
+                print(f"Error scraping {source['name']}: {e}")
+    finally:
+        # Don't wait for sources still in flight once we have enough articles
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return ingest_articles(all_articles, incremental)
+
+def _no_article_body(source, url, reason):
+    """Count an article that yielded no text; extractors return None as its body"""
+    metrics.inc('article_failures', source=source, reason=reason)
+    metrics.progress(f"No content extracted from {url} ({reason})")
+    return None
+
+@metrics.timed()
+def extract_article_content(url, throttle=None):
+    """Extract the main text content from an article URL with site-specific handling
+    
+    Returns None when the page could not be fetched or holds no article text.
+    Requests are spaced by throttle (default: article_throttle).
+    """
+    if not isinstance(url, str) or not url.startswith('http'):
+        return _no_article_body('unknown', url, 'invalid_url')
         
-    print(f"\nExtracting content from: {url}")
+    metrics.progress(f"\nExtracting content from: {url}")
     
     domain = urlparse(url).netloc.lower()
     
-    # Create a debug directory if it doesn't exist
-    os.makedirs("debug", exist_ok=True)
-    
     # Use different extraction techniques based on domain
     if 'yahoo.com' in domain:
-        return extract_yahoo_article(url)
+        return extract_yahoo_article(url, throttle)
     elif 'cnbc.com' in domain:
-        return extract_cnbc_article(url)
+        return extract_cnbc_article(url, throttle)
     elif 'marketwatch.com' in domain:
-        return extract_marketwatch_article(url)
+        return extract_marketwatch_article(url, throttle)
     elif 'bloomberg.com' in domain:
-        return extract_bloomberg_article(url)
+        return extract_bloomberg_article(url, throttle)
     elif 'investing.com' in domain:
-        return extract_investing_article(url)
+        return extract_investing_article(url, throttle)
     else:
-        return extract_generic_article(url)
+        return extract_generic_article(url, throttle)
 
-def extract_yahoo_article(url):
+@metrics.timed()
+def extract_yahoo_article(url, throttle=None):
     """Extract article content from Yahoo Finance"""
-    response = fetch_page(url)
+    response = fetch_page(url, throttle=throttle or article_throttle)
     if not response:
-        return "Failed to fetch Yahoo article"
+        return _no_article_body('yahoo', url, 'fetch_failed')
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = parse_html(response)
     
     # Save for debugging
-    filename = f"debug/yahoo_article_{urlparse(url).path.split('/')[-1]}.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page(article_capture_name('yahoo', url), response)
     
     # Remove unwanted elements
     for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer']):
@@ -661,23 +1075,22 @@ def extract_yahoo_article(url):
         
         # Clean up the text
         article_text = clean_article_text(article_text)
-        print(f"Extracted {len(article_text)} characters from Yahoo article")
+        metrics.progress(f"Extracted {len(article_text)} characters from Yahoo article")
         return article_text
     else:
-        return "Could not find article content on Yahoo Finance"
+        return _no_article_body('yahoo', url, 'no_content')
 
-def extract_cnbc_article(url):
+@metrics.timed()
+def extract_cnbc_article(url, throttle=None):
     """Extract article content from CNBC"""
-    response = fetch_page(url)
+    response = fetch_page(url, throttle=throttle or article_throttle)
     if not response:
-        return "Failed to fetch CNBC article"
+        return _no_article_body('cnbc', url, 'fetch_failed')
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = parse_html(response)
     
     # Save for debugging
-    filename = f"debug/cnbc_article_{urlparse(url).path.split('/')[-1]}.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page(article_capture_name('cnbc', url), response)
     
     # Remove unwanted elements
     for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside']):
@@ -706,28 +1119,27 @@ def extract_cnbc_article(url):
         
         # Clean up the text
         article_text = clean_article_text(article_text)
-        print(f"Extracted {len(article_text)} characters from CNBC article")
+        metrics.progress(f"Extracted {len(article_text)} characters from CNBC article")
         return article_text
     else:
-        return "Could not find article content on CNBC"
+        return _no_article_body('cnbc', url, 'no_content')
 
-def extract_bloomberg_article(url):
+@metrics.timed()
+def extract_bloomberg_article(url, throttle=None):
     """Extract article content from Bloomberg"""
-    response = fetch_page(url)
+    response = fetch_page(url, throttle=throttle or article_throttle)
     if not response:
-        return "Failed to fetch Bloomberg article - may be paywalled"
+        return _no_article_body('bloomberg', url, 'fetch_failed')
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = parse_html(response)
     
     # Save for debugging
-    filename = f"debug/bloomberg_article_{urlparse(url).path.split('/')[-1]}.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page(article_capture_name('bloomberg', url), response)
     
     # Bloomberg often has paywalls, check for that
     paywall = soup.find('div', {'class': ['paywall', 'fence-body']})
     if paywall:
-        return "This Bloomberg article is behind a paywall"
+        return _no_article_body('bloomberg', url, 'paywalled')
     
     # Remove unwanted elements
     for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer']):
@@ -746,23 +1158,192 @@ def extract_bloomberg_article(url):
         
         # Clean up the text
         article_text = clean_article_text(article_text)
-        print(f"Extracted {len(article_text)} characters from Bloomberg article")
+        metrics.progress(f"Extracted {len(article_text)} characters from Bloomberg article")
         return article_text
     else:
-        return "Could not find article content on Bloomberg"
+        return _no_article_body('bloomberg', url, 'no_content')
 
-def extract_marketwatch_article(url):
+@metrics.timed()
+def extract_marketwatch_article(url, throttle=None):
     """Extract article content from MarketWatch"""
-    response = fetch_page(url)
+    response = fetch_page(url, throttle=throttle or article_throttle)
+    if not response:
+        return _no_article_body('marketwatch', url, 'fetch_failed')
+    
+    soup = parse_html(response)
+    
+    # Save for debugging
+    capture_debug_page(article_capture_name('marketwatch', url), response)
+    
+    # Remove unwanted elements
+    for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+        element.decompose()
+    
+    # MarketWatch article container
+    article_container = soup.find('div', {'class': 'article__body'})
+    
+    if not article_container:
+        # Try alternative containers
+        article_container = soup.find('div', {'id': 'js-article__body'}) or soup.find('div', {'class': 'paywall'})
+    
+    if article_container:
+        paragraphs = article_container.find_all('p')
+        article_text = '\n\n'.join([p.get_text().strip() for p in paragraphs])
+        
+        # Clean up the text
+        article_text = clean_article_text(article_text)
+        metrics.progress(f"Extracted {len(article_text)} characters from MarketWatch article")
+        return article_text
+    else:
+        return _no_article_body('marketwatch', url, 'no_content')
+
+@metrics.timed()
+def extract_investing_article(url, throttle=None):
+    """Extract article content from Investing.com"""
+    response = fetch_page(url, throttle=throttle or article_throttle)
+    if not response:
+        return _no_article_body('investing', url, 'fetch_failed')
+    
+    soup = parse_html(response)
+    
+    # Save for debugging
+    capture_debug_page(article_capture_name('investing', url), response)
+    
+    # Remove unwanted elements
+    for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+        element.decompose()
+    
+    # Investing.com article container
+    article_container = soup.find('div', {'class': 'articlePage'})
+    
+    if not article_container:
+        # Try alternative containers
+        article_container = soup.find('div', {'id': 'article'}) or soup.find('div', {'class': 'WYSIWYG'})
+    
+    if article_container:
+        paragraphs = article_container.find_all('p')
+        article_text = '\n\n'.join([p.get_text().strip() for p in paragraphs])
+        
+        # Clean up the text
+        article_text = clean_article_text(article_text)
+        metrics.progress(f"Extracted {len(article_text)} characters from Investing.com article")
+        return article_text
+    else:
+        return _no_article_body('investing', url, 'no_content')
+
+@metrics.timed()
+def extract_generic_article(url, throttle=None):
+    """Extract article content from any other site using common article markup"""
+    response = fetch_page(url, throttle=throttle or article_throttle)
     if not response:
-        return "Failed to fetch MarketWatch article"
+        return _no_article_body('generic', url, 'fetch_failed')
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = parse_html(response)
     
     # Save for debugging
-    filename = f"debug/marketwatch_article_{urlparse(url).path.split('/')[-1]}.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(soup.prettify())
+    capture_debug_page(article_capture_name('generic', url), response)
     
     # Remove unwanted elements
-    for element in soup.find_all(['script', 'style', '
\ No newline at end of file
+    for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+        element.decompose()
+    
+    # Prefer semantic article markup, then fall back to the whole body
+    article_container = soup.find('article') or soup.find('main') or soup.body
+    
+    if article_container:
+        paragraphs = article_container.find_all('p')
+        article_text = '\n\n'.join([p.get_text().strip() for p in paragraphs])
+        
+        # Clean up the text
+        article_text = clean_article_text(article_text)
+        metrics.progress(f"Extracted {len(article_text)} characters from article")
+        return article_text
+    else:
+        return _no_article_body('generic', url, 'no_content')
+
+def clean_article_text(text):
+    """Normalize whitespace and drop boilerplate lines from extracted article text"""
+    boilerplate = ['advertisement', 'sign up for', 'subscribe to', 'read more:', 'click here']
+    
+    paragraphs = []
+    for paragraph in text.split('\n\n'):
+        paragraph = re.sub(r'\s+', ' ', paragraph).strip()
+        if not paragraph:
+            continue
+        # Skip short promotional lines
+        if len(paragraph) < 200 and any(term in paragraph.lower() for term in boilerplate):
+            continue
+        paragraphs.append(paragraph)
+    
+    return '\n\n'.join(paragraphs)
+
+def iter_article_contents(df, max_workers=8, max_per_domain=2, cancel_event=None, progress=True, throttle=None):
+    """Extract article bodies for every link in a headline DataFrame, yielding (index, body) as each finishes
+    
+    At most max_per_domain articles from the same site are in flight at once, with request starts
+    spaced by throttle (default: article_throttle, not the slower listing-page domain_throttle).
+    body is None for articles that yielded no text. Set cancel_event to stop early: articles that
+    have not started are dropped and the generator returns once running ones finish.
+    """
+    # Queue the links per domain so one slow site never holds up the others
+    pending = {}
+    for index, url in df['link'].items():
+        domain = urlparse(url).netloc.lower() if isinstance(url, str) else ''
+        pending.setdefault(domain, deque()).append((index, url))
+    
+    total = len(df)
+    done = 0
+    in_flight = {}
+    running = {domain: 0 for domain in pending}
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_ready():
+            for domain, queue in pending.items():
+                while queue and running[domain] < max_per_domain and len(in_flight) < max_workers:
+                    index, url = queue.popleft()
+                    future = executor.submit(extract_article_content, url, throttle)
+                    in_flight[future] = (index, url, domain)
+                    running[domain] += 1
+        
+        submit_ready()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, url, domain = in_flight.pop(future)
+                running[domain] -= 1
+                try:
+                    body = future.result()
+                except Exception as e:
+                    metrics.inc('article_failures', source=domain, reason=type(e).__name__)
+                    metrics.progress(f"Error extracting {url}: {e}")
+                    body = None
+                done += 1
+                if progress:
+                    metrics.progress(f"Extracted {done}/{total} articles")
+                yield index, body
+            
+            if cancel_event is not None and cancel_event.is_set() and pending:
+                print(f"Extraction cancelled after {done}/{total} articles")
+                pending.clear()
+            submit_ready()
+
+def extract_article_contents(df, max_workers=8, max_per_domain=2, cancel_event=None, progress=True,
+                             canonical_only=True, throttle=None):
+    """Return a copy of the headline DataFrame with a 'body' column holding each article's text
+    
+    With canonical_only, rows marked as near-duplicates (is_canonical False) are not fetched and keep an empty body.
+    Articles that yielded no text get None as well.
+    """
+    df = df.copy()
+    df['body'] = None
+    todo = df
+    if canonical_only and 'is_canonical' in df.columns:
+        todo = df[df['is_canonical'].fillna(True).astype(bool)]
+    for index, body in iter_article_contents(todo, max_workers, max_per_domain, cancel_event, progress, throttle):
+        df.at[index, 'body'] = body
+    return df
+
+if __name__ == "__main__":
+    news_df = scrape_tech_stock_news()
+    if not news_df.empty:
+        print(news_df[['source', 'headline']].head(20).to_string(index=False))
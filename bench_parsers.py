@@ -0,0 +1,90 @@
+"""Compare HTML parser backends on pages saved by the scrapers (debug/ by default)
+
+Usage: python bench_parsers.py [page_dir] [repeats]
+"""
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+
+from debug_capture import load_capture
+
+def bs4_backend(feature):
+    """Full BeautifulSoup tree with the given tree builder, as used by the scrapers"""
+    def parse(html):
+        return BeautifulSoup(html, feature)
+    return parse
+
+def available_backends():
+    """Parser backends that are installed in this environment"""
+    backends = {}
+    for feature in ['html.parser', 'lxml', 'html5lib']:
+        if builder_registry.lookup(feature) is not None:
+            backends[f"bs4+{feature}"] = bs4_backend(feature)
+
+    # Raw parsers without the BeautifulSoup tree, for reference
+    try:
+        import lxml.html
+        backends['lxml.html'] = lxml.html.fromstring
+    except ImportError:
+        pass
+    try:
+        from selectolax.parser import HTMLParser
+        backends['selectolax'] = HTMLParser
+    except ImportError:
+        pass
+
+    return backends
+
+def time_call(func, arg, repeats):
+    """Best-of-N wall time for func(arg), in milliseconds"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run_benchmark(page_dir='debug', repeats=5):
+    """Time every available backend on every saved page and print a summary table"""
+    paths = sorted(glob.glob(os.path.join(page_dir, '*.html')) + glob.glob(os.path.join(page_dir, '*.html.gz')))
+    if not paths:
+        print(f"No saved pages found in {page_dir}/")
+        return {}
+
+    pages = {}
+    for path in paths:
+        if path.endswith('.gz'):
+            content, _ = load_capture(path)
+            pages[os.path.basename(path)] = content.decode('utf-8', errors='replace')
+        else:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages[os.path.basename(path)] = f.read()
+    total_mb = sum(len(html.encode('utf-8')) for html in pages.values()) / 1e6
+    print(f"Benchmarking {len(pages)} pages ({total_mb:.1f} MB), best of {repeats} runs")
+
+    backends = available_backends()
+    results = {}
+    for name, parse in backends.items():
+        total_ms = sum(time_call(parse, html, repeats) for html in pages.values())
+        results[name] = total_ms
+
+    # Cost of the old prettify() debug dump, for comparison with the parse itself
+    soups = [BeautifulSoup(html, 'html.parser') for html in pages.values()]
+    prettify_ms = sum(time_call(lambda soup: soup.prettify(), soup, repeats) for soup in soups)
+
+    print(f"\n{'Backend':<20}{'Total ms':>12}{'MB/s':>10}")
+    for name, total_ms in sorted(results.items(), key=lambda item: item[1]):
+        print(f"{name:<20}{total_ms:>12.1f}{total_mb / (total_ms / 1000):>10.1f}")
+    print(f"{'prettify()':<20}{prettify_ms:>12.1f}")
+
+    results['prettify'] = prettify_ms
+    return results
+
+if __name__ == "__main__":
+    page_dir = sys.argv[1] if len(sys.argv) > 1 else 'debug'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run_benchmark(page_dir, repeats)
@@ -0,0 +1,307 @@
+"""Replay recorded pages through the scrapers and article extractors, offline
+
+Pages saved by DebugCapture (debug/*.html.gz with their .json metadata) are
+served to beautifulsoup.fetch_page by an injected fetcher, so the scrape_* and
+extract_*_article functions run exactly as in production minus the network,
+throttle and HTTP cache. For every source it reports pages/sec, parse and
+extraction time per page, items found and peak memory, plus the throughput of
+concurrent extraction over all recorded articles. Results are compared with a
+baseline saved from an earlier run; the exit status is 1 when a metric got
+worse by more than the threshold, so the script can gate CI.
+
+Usage: python bench_scrapers.py [page_dir] [--repeats N] [--workers N] [--latency S]
+                                [--baseline PATH] [--save-baseline] [--threshold 0.2]
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+import beautifulsoup
+from debug_capture import load_capture
+from http_cache import normalize_url
+
+# Capture names the listing scrapers save their page under
+LISTING_SCRAPERS = {
+    'yahoo_finance': 'scrape_yahoo_finance',
+    'cnbc_finance': 'scrape_cnbc_finance',
+    'bloomberg': 'scrape_bloomberg_tech',
+    'marketwatch': 'scrape_marketwatch_tech',
+    'investing_com': 'scrape_investing_com',
+}
+
+# A listing source is a single page, so it is scraped this many times per run to get stable timings
+LISTING_ROUNDS = 20
+
+# Relative change that counts as a regression, and absolute changes too small to matter
+DEFAULT_THRESHOLD = 0.2
+NOISE_FLOOR = {'parse_ms': 0.5, 'extract_ms': 0.5, 'peak_mb': 1.0}
+
+class ReplayResponse:
+    """A recorded page that looks enough like a requests.Response for the scrapers"""
+
+    def __init__(self, url, content, status_code=200):
+        self.url = url
+        self.status_code = status_code
+        self.headers = {}
+        self.content = content
+        self.encoding = 'utf-8'
+        self.from_cache = False
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+class ReplayFetcher:
+    """fetch_page stand-in serving recorded pages by URL, with optional simulated latency
+
+    default is served for any URL without a recording, which lets a listing
+    scraper find its page whatever URL it asks for first.
+    """
+
+    def __init__(self, pages, default=None, latency=0.0):
+        self.pages = {normalize_url(url): content for url, content in pages.items()}
+        self.default = default
+        self.latency = latency
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.pages.get(normalize_url(url), self.default)
+        if content is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return ReplayResponse(url, content)
+
+class ParseClock:
+    """Total time spent in beautifulsoup.parse_html while installed"""
+
+    def __init__(self):
+        self.total = 0.0
+        self._lock = threading.Lock()
+        self._original = None
+
+    def __enter__(self):
+        self._original = beautifulsoup.parse_html
+        original = self._original
+
+        def parse_html(response):
+            start = time.perf_counter()
+            try:
+                return original(response)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.total += elapsed
+
+        beautifulsoup.parse_html = parse_html
+        return self
+
+    def __exit__(self, *exc):
+        beautifulsoup.parse_html = self._original
+
+    def reset(self):
+        with self._lock:
+            self.total = 0.0
+
+def source_of(name):
+    """Benchmark source a capture belongs to: a listing scraper, '<site>_article', or None"""
+    if name in LISTING_SCRAPERS:
+        return name
+    match = re.match(r'(.+?)_article_', name)
+    return f"{match.group(1)}_article" if match else None
+
+def load_corpus(page_dir='debug'):
+    """Recorded pages grouped by source: {source: [(url, content), ...]}"""
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(page_dir, '*.html.gz'))):
+        name = os.path.basename(path)[:-len('.html.gz')]
+        source = source_of(name)
+        if source is None:
+            continue
+        content, meta = load_capture(path)
+        url = meta.get('url')
+        if not url and source not in LISTING_SCRAPERS:
+            print(f"Skipping {name}: no URL in its metadata")
+            continue
+        corpus.setdefault(source, []).append((url, content))
+    return corpus
+
+@contextlib.contextmanager
+def replay(fetcher):
+    """Route fetch_page through fetcher with the HTTP cache off, and silence the scrapers' progress output"""
+    previous_fetcher = beautifulsoup.set_page_fetcher(fetcher)
+    previous_cache = beautifulsoup.USE_HTTP_CACHE
+    beautifulsoup.USE_HTTP_CACHE = False
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        beautifulsoup.USE_HTTP_CACHE = previous_cache
+        beautifulsoup.set_page_fetcher(previous_fetcher)
+
+def _measure(run, pages, repeats, concurrent=False):
+    """Best-of-repeats timings of run() -> items found, then one extra run for peak memory
+
+    With concurrent, parse time is summed over threads, so it is reported per page
+    but extraction time (wall minus parse) is not.
+    """
+    best = None
+    with ParseClock() as clock:
+        for _ in range(repeats):
+            clock.reset()
+            start = time.perf_counter()
+            items = run()
+            wall = time.perf_counter() - start
+            if best is None or wall < best[0]:
+                best = (wall, clock.total, items)
+
+    # Separate pass: tracing allocations slows everything down and would skew the timings
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    wall, parse, items = best
+    return {
+        'pages': pages,
+        'items': items,
+        'pages_per_sec': pages / wall if wall > 0 else float('inf'),
+        'parse_ms': parse / pages * 1000,
+        'extract_ms': None if concurrent else max(wall - parse, 0.0) / pages * 1000,
+        'peak_mb': peak / 1e6,
+    }
+
+def bench_listing(source, content, repeats, latency=0.0):
+    scrape = getattr(beautifulsoup, LISTING_SCRAPERS[source])
+
+    def run():
+        # Items found in one pass; the other rounds only add timing samples
+        return [len(scrape()) for _ in range(LISTING_ROUNDS)][0]
+
+    with replay(ReplayFetcher({}, default=content, latency=latency)):
+        return _measure(run, LISTING_ROUNDS, repeats)
+
+def bench_articles(pages, repeats, latency=0.0):
+    def run():
+        # extract_* return None for pages they found no article text in
+        bodies = [beautifulsoup.extract_article_content(url) for url, _ in pages]
+        return sum(1 for body in bodies if body)
+
+    with replay(ReplayFetcher(dict(pages), latency=latency)):
+        return _measure(run, len(pages), repeats)
+
+def bench_concurrent(pages, workers, repeats, latency=0.0):
+    """Every recorded article through iter_article_contents, as the scraper extracts them"""
+    df = pd.DataFrame({'link': [url for url, _ in pages]})
+
+    def run():
+        bodies = [body for _, body in beautifulsoup.iter_article_contents(
+            df, max_workers=workers, max_per_domain=workers, progress=False)]
+        return sum(1 for body in bodies if body)
+
+    with replay(ReplayFetcher(dict(pages), latency=latency)):
+        return _measure(run, len(pages), repeats, concurrent=True)
+
+def run_benchmark(page_dir='debug', repeats=5, workers=8, latency=0.0):
+    """Benchmark every source with recorded pages and print a summary table"""
+    corpus = load_corpus(page_dir)
+    if not corpus:
+        print(f"No recorded pages found in {page_dir}/ (enable beautifulsoup.DEBUG_CAPTURE to record some)")
+        return {}
+    print(f"Replaying {sum(len(p) for p in corpus.values())} pages from {page_dir}/, best of {repeats} runs, "
+          f"parser {beautifulsoup.resolve_parser()}")
+
+    results = {}
+    for source, pages in sorted(corpus.items()):
+        if source in LISTING_SCRAPERS:
+            results[source] = bench_listing(source, pages[-1][1], repeats, latency)
+        else:
+            results[source] = bench_articles(pages, repeats, latency)
+
+    articles = [page for source, pages in corpus.items() if source not in LISTING_SCRAPERS for page in pages]
+    if articles:
+        results[f"articles x{workers} workers"] = bench_concurrent(articles, workers, repeats, latency)
+
+    print(f"\n{'Source':<28}{'Pages':>6}{'Items':>7}{'Pages/s':>10}{'Parse ms':>10}{'Extract ms':>12}{'Peak MB':>9}")
+    for source, r in results.items():
+        extract = f"{r['extract_ms']:>12.2f}" if r['extract_ms'] is not None else f"{'-':>12}"
+        print(f"{source:<28}{r['pages']:>6}{r['items']:>7}{r['pages_per_sec']:>10.1f}"
+              f"{r['parse_ms']:>10.2f}{extract}{r['peak_mb']:>9.1f}")
+    return results
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Messages for every metric that got worse than the baseline by more than threshold"""
+    regressions = []
+    for source, current in results.items():
+        base = baseline.get(source)
+        if base is None:
+            continue
+        if current['items'] < base['items']:
+            regressions.append(f"{source}: found {current['items']} items, baseline {base['items']}")
+        if current['pages_per_sec'] < base['pages_per_sec'] * (1 - threshold):
+            regressions.append(f"{source}: {current['pages_per_sec']:.1f} pages/s, "
+                               f"baseline {base['pages_per_sec']:.1f}")
+        for metric, floor in NOISE_FLOOR.items():
+            if current[metric] is None or base.get(metric) is None:
+                continue
+            if current[metric] > base[metric] * (1 + threshold) and current[metric] - base[metric] > floor:
+                regressions.append(f"{source}: {metric} {current[metric]:.2f}, baseline {base[metric]:.2f}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline scraper and extractor benchmark on recorded pages")
+    parser.add_argument('page_dir', nargs='?', default='debug')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=8, help="threads for the concurrent extraction run")
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated seconds of network time per page")
+    parser.add_argument('--baseline', help="baseline JSON (default: <page_dir>/bench_baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown or memory growth that fails the run")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.page_dir, args.repeats, args.workers, args.latency)
+    if not results:
+        return 0
+
+    # Numbers are only comparable between runs with the same settings and parser
+    settings = {'workers': args.workers, 'latency': args.latency, 'parser': beautifulsoup.resolve_parser()}
+    baseline_path = args.baseline or os.path.join(args.page_dir, 'bench_baseline.json')
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump({'settings': settings, 'results': results}, f, indent=2)
+        print(f"\nSaved baseline to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline['settings'] != settings:
+        print(f"\nWarning: baseline was recorded with {baseline['settings']}, this run used {settings}")
+    regressions = find_regressions(results, baseline['results'], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} against {baseline_path}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {baseline_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+"""Google Custom Search client for batches of queries
+
+Queries are searched concurrently, several result pages each (start=1, 11, 21, ...),
+without going over the daily query quota. Every response is cached on disk keyed
+by query, page and date window, so a query already run for the same window is
+never paid for twice. Links are deduped across queries, and results can be
+streamed straight into the article ingestion pipeline (beautifulsoup.ingest_articles).
+
+Usage: python custom_search.py QUERY [QUERY ...]
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta
+from urllib.parse import urlparse
+
+import requests
+
+from article_index import url_hash
+import metrics
+
+SEARCH_URL = 'https://www.googleapis.com/customsearch/v1'
+API_KEY_PATH = 'API_key.txt'
+SEARCH_ENGINE_ID_PATH = 'SEARCH_ENGINE_ID'
+SEARCH_CACHE_PATH = os.path.join('cache', 'custom_search.sqlite')
+
+# Free tier: 100 queries a day; each result page is one query
+DAILY_QUERY_LIMIT = 100
+QUOTA_WINDOW = 24 * 60 * 60
+
+# The API returns at most 10 results per page and 100 per query
+RESULTS_PER_PAGE = 10
+MAX_PAGES = 10
+
+MAX_WORKERS = 8
+MAX_RETRIES = 3
+
+# Date window searched when none is given
+DEFAULT_WINDOW_DAYS = 7
+
+def load_credentials(api_key_path=API_KEY_PATH, engine_id_path=SEARCH_ENGINE_ID_PATH):
+    """(api_key, engine_id) from GOOGLE_API_KEY / GOOGLE_CSE_ID or the key files"""
+    api_key = os.environ.get('GOOGLE_API_KEY')
+    engine_id = os.environ.get('GOOGLE_CSE_ID')
+    if not api_key:
+        with open(api_key_path) as f:
+            api_key = f.read()
+    if not engine_id:
+        with open(engine_id_path) as f:
+            engine_id = f.read()
+    return api_key.strip(), engine_id.strip()
+
+def date_window(start_date=None, end_date=None):
+    """('YYYYMMDD', 'YYYYMMDD') window ending today and starting DEFAULT_WINDOW_DAYS earlier unless given"""
+    end = date.fromisoformat(str(end_date)) if end_date else date.today()
+    start = date.fromisoformat(str(start_date)) if start_date else end - timedelta(days=DEFAULT_WINDOW_DAYS)
+    return start.strftime('%Y%m%d'), end.strftime('%Y%m%d')
+
+def normalize_query(query):
+    return ' '.join(str(query).split()).lower()
+
+class SearchCache:
+    """Cached search responses and a log of billed queries, in one SQLite file"""
+
+    def __init__(self, path=SEARCH_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                query TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                page_start INTEGER,
+                response TEXT,
+                fetched_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS calls (
+                called_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_calls_time ON calls (called_at);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def key_for(query, window, start):
+        raw = json.dumps([normalize_query(query), window[0], window[1], start])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, query, window, start):
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?",
+                                     (self.key_for(query, window, start),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, query, window, start, response):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.key_for(query, window, start), normalize_query(query), window[0], window[1], start,
+                 json.dumps(response), time.time())
+            )
+            self._conn.commit()
+
+    def reserve_call(self, limit, window=QUOTA_WINDOW):
+        """Record a billed query if fewer than limit were made in the window; returns its id or None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM calls WHERE called_at < ?", (now - window,))
+            used = self._conn.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+            if used >= limit:
+                self._conn.commit()
+                return None
+            call_id = self._conn.execute("INSERT INTO calls VALUES (?)", (now,)).lastrowid
+            self._conn.commit()
+            return call_id
+
+    def release_call(self, call_id):
+        """Give back a reserved query that was not billed (rate limited or never sent)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM calls WHERE rowid = ?", (call_id,))
+            self._conn.commit()
+
+    def calls_used(self, window=QUOTA_WINDOW):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM calls WHERE called_at >= ?",
+                                      (time.time() - window,)).fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache():
+    """Return the shared search cache, creating it on first use"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache(SEARCH_CACHE_PATH)
+        return _search_cache
+
+class QuotaExceeded(Exception):
+    pass
+
+class CustomSearchClient:
+    """Concurrent, cached Custom Search requests within a daily query quota"""
+
+    def __init__(self, api_key=None, engine_id=None, cache=None, daily_limit=DAILY_QUERY_LIMIT,
+                 max_workers=MAX_WORKERS, session=None):
+        if api_key is None or engine_id is None:
+            loaded_key, loaded_id = load_credentials()
+            api_key = api_key or loaded_key
+            engine_id = engine_id or loaded_id
+        self.api_key = api_key
+        self.engine_id = engine_id
+        self.cache = cache if cache is not None else get_search_cache()
+        self.daily_limit = daily_limit
+        self.max_workers = max_workers
+        self.session = session or requests.Session()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'over_quota': 0, 'errors': 0, 'duplicates': 0}
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def fetch_page(self, query, window, start=1):
+        """
+        One page of results, from the cache or the API
+
+        Parameters:
+        query (str): Search query
+        window (tuple): ('YYYYMMDD', 'YYYYMMDD') date window, see date_window()
+        start (int): 1-based index of the first result (1, 11, 21, ...)
+
+        Returns:
+        dict: The API response (items may be missing when there are no results)
+        """
+        cached = self.cache.get(query, window, start)
+        if cached is not None:
+            self._count('cache_hits')
+            return cached
+
+        params = {
+            'key': self.api_key,
+            'cx': self.engine_id,
+            'q': query,
+            'start': start,
+            'num': RESULTS_PER_PAGE,
+            # Restricts results to the window; dateRestrict only takes relative periods like d7
+            'sort': f'date:r:{window[0]}:{window[1]}',
+        }
+        for attempt in range(MAX_RETRIES):
+            call_id = self.cache.reserve_call(self.daily_limit)
+            if call_id is None:
+                self._count('over_quota')
+                raise QuotaExceeded(f"Daily limit of {self.daily_limit} search queries reached")
+            try:
+                response = self.session.get(SEARCH_URL, params=params, timeout=20)
+            except requests.exceptions.RequestException as e:
+                # A failed connection never reached the API; a read timeout may still have been billed
+                if isinstance(e, requests.exceptions.ConnectionError):
+                    self.cache.release_call(call_id)
+                metrics.progress(f"Search request error for {query!r}: {e}")
+                time.sleep(2 ** attempt)
+                continue
+            self._count('requests')
+
+            if response.status_code == 200:
+                data = response.json()
+                self.cache.put(query, window, start, data)
+                return data
+            if response.status_code == 429 or response.status_code >= 500:
+                # Rate-limited and failed requests are not billed
+                self.cache.release_call(call_id)
+                time.sleep(2 ** attempt)
+                continue
+            self._count('errors')
+            raise RuntimeError(f"Search failed for {query!r} with status {response.status_code}: {response.text[:200]}")
+
+        self._count('errors')
+        raise RuntimeError(f"Search failed for {query!r} after {MAX_RETRIES} attempts")
+
+    def iter_search(self, queries, pages=1, start_date=None, end_date=None):
+        """
+        Search every query, yielding (query, item) for each new link as pages complete
+
+        Page 1 of every query is fetched concurrently; further pages are only requested
+        while the previous page reported more results. Links already yielded for another
+        query (or page) are skipped. Once the quota runs out the remaining pages are skipped.
+        """
+        window = date_window(start_date, end_date)
+        pages = max(1, min(pages, MAX_PAGES))
+        queries = list(dict.fromkeys(q for q in queries if q and str(q).strip()))
+        seen = set()
+        quota_left = True
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {executor.submit(self.fetch_page, q, window, 1): (q, 1) for q in queries}
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    query, page = in_flight.pop(future)
+                    try:
+                        data = future.result()
+                    except QuotaExceeded as e:
+                        if quota_left:
+                            print(e)
+                        quota_left = False
+                        continue
+                    except Exception as e:
+                        print(e)
+                        continue
+
+                    for item in data.get('items', []):
+                        key = url_hash(item.get('link'))
+                        if key in seen:
+                            self._count('duplicates')
+                            continue
+                        seen.add(key)
+                        yield query, item
+
+                    if page < pages and quota_left and 'nextPage' in data.get('queries', {}):
+                        start = page * RESULTS_PER_PAGE + 1
+                        in_flight[executor.submit(self.fetch_page, query, window, start)] = (query, page + 1)
+
+    def search(self, queries, pages=1, start_date=None, end_date=None):
+        """All deduped results of a batch of queries as a list of (query, item)"""
+        return list(self.iter_search(queries, pages, start_date, end_date))
+
+def _published_date(item):
+    """Publication time from the page metadata Google returns, if any"""
+    for tags in item.get('pagemap', {}).get('metatags', []):
+        for name in ('article:published_time', 'og:article:published_time', 'datepublished', 'pubdate'):
+            if tags.get(name):
+                return tags[name]
+    return "Unknown"
+
+def search_result_article(query, item):
+    """Article dict in the scrapers' format for one search result"""
+    return {
+        'headline': item.get('title', ''),
+        'summary': ' '.join((item.get('snippet') or '').split()),
+        'link': item.get('link'),
+        'published_date': _published_date(item),
+        'source': item.get('displayLink') or urlparse(item.get('link') or '').netloc,
+        'scraped_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'category': 'search',
+        'query': query,
+    }
+
+def ingest_search_results(queries, pages=1, start_date=None, end_date=None, batch_size=50,
+                          incremental=True, filter_tech=True, client=None):
+    """
+    Search a batch of queries and feed the results into the article pipeline as they arrive
+
+    Results are ingested in batches of batch_size articles while the remaining
+    searches are still running.
+
+    Returns:
+    pandas.DataFrame: Every article saved
+    """
+    import pandas as pd
+    from beautifulsoup import ingest_articles
+
+    client = client or CustomSearchClient()
+    saved = []
+    batch = []
+    for query, item in client.iter_search(queries, pages, start_date, end_date):
+        batch.append(search_result_article(query, item))
+        if len(batch) >= batch_size:
+            saved.append(ingest_articles(batch, incremental, filter_tech))
+            batch = []
+    if batch:
+        saved.append(ingest_articles(batch, incremental, filter_tech))
+
+    print(f"Search stats: {client.stats}, {client.cache.calls_used()} of {client.daily_limit} daily queries used")
+    saved = [df for df in saved if not df.empty]
+    return pd.concat(saved, ignore_index=True) if saved else pd.DataFrame()
+
+if __name__ == "__main__":
+    search_client = CustomSearchClient()
+    for search_query, result in search_client.iter_search(sys.argv[1:]):
+        print(f"[{search_query}] {result['link']}")
+    print(search_client.stats)
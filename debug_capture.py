@@ -0,0 +1,112 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+class DebugCapture:
+    """Save raw fetched pages to disk for debugging, off the scraping hot path
+
+    Pages are stored exactly as received (not re-serialized), gzip-compressed,
+    next to a small JSON file with the URL and status code. Writes happen on a
+    background thread; if the queue is full the capture is dropped rather than
+    slowing down the scrape. The oldest captures are deleted once the directory
+    holds more than max_files captures or more than max_bytes on disk.
+    """
+
+    def __init__(self, directory='debug', max_files=200, max_bytes=50 * 1024 * 1024, queue_size=100):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._captures = None
+        self._thread = threading.Thread(target=self._run, name='debug-capture', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def capture(self, name, response):
+        """Queue the raw body of response to be saved as <name>.html.gz"""
+        # A page served from the HTTP cache is only written if it has no capture yet
+        # (e.g. it was first fetched before capturing was switched on)
+        only_if_missing = getattr(response, 'from_cache', False)
+        meta = {
+            'url': str(response.url),
+            'status_code': response.status_code,
+            'captured_at': time.time(),
+        }
+        try:
+            self._queue.put_nowait((safe_filename(name), response.content, meta, only_if_missing))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued capture has been written"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            name, content, meta, only_if_missing = self._queue.get()
+            try:
+                self._write(name, content, meta, only_if_missing)
+            except OSError as e:
+                print(f"Could not save debug capture {name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name, content, meta, only_if_missing=False):
+        if self._captures is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._captures = self._scan()
+
+        path = os.path.join(self.directory, f"{name}.html.gz")
+        if only_if_missing and os.path.exists(path):
+            return
+        with gzip.open(path, 'wb', compresslevel=6) as f:
+            f.write(content)
+        with open(os.path.join(self.directory, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        # A re-captured page replaces its previous entry
+        self._captures = [c for c in self._captures if c[0] != name]
+        self._captures.append((name, os.path.getsize(path)))
+        self._enforce_retention()
+
+    def _scan(self):
+        """Existing captures in the directory, oldest first"""
+        captures = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.html.gz'):
+                path = os.path.join(self.directory, filename)
+                captures.append((os.path.getmtime(path), filename[:-len('.html.gz')], os.path.getsize(path)))
+        return [(name, size) for _, name, size in sorted(captures)]
+
+    def _enforce_retention(self):
+        total = sum(size for _, size in self._captures)
+        while self._captures and (len(self._captures) > self.max_files or total > self.max_bytes):
+            name, size = self._captures.pop(0)
+            total -= size
+            for suffix in ('.html.gz', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
+
+def safe_filename(name):
+    """Turn an arbitrary page name into a safe file name"""
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('._')
+    return name[:150] or 'page'
+
+def load_capture(path):
+    """Read a saved capture back as (html_bytes, meta)"""
+    with gzip.open(path, 'rb') as f:
+        content = f.read()
+    meta_path = path[:-len('.html.gz')] + '.json'
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+    return content, meta
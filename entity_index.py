@@ -0,0 +1,235 @@
+"""Link articles to the tickers they are about, and index them by ticker and day
+
+EntityMatcher finds company names and aliases (capitalised as in entities.json,
+or all upper case), cashtags ($NVDA, any symbol) and bare upper-case symbols
+from entities.json (NVDA) in one scan per pattern. EntityIndex keeps an inverted index from (ticker, date)
+to article ids along with each article's sentiment, so per-ticker daily news
+counts and sentiment can be joined into the price feature frame.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from article_index import article_keys, headline_hash
+from keyword_matcher import _trie_pattern
+
+ENTITIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'entities.json')
+ENTITY_INDEX_PATH = os.path.join('cache', 'entity_index.sqlite')
+
+# Symbols that are also everyday words; they only count as a cashtag or through a company name
+AMBIGUOUS_SYMBOLS = {'NOW', 'ARM', 'MU', 'SHOP', 'COIN', 'SPOT', 'SNOW', 'IT', 'ON', 'A', 'ALL', 'CAT'}
+
+# Daily news columns daily_features() adds to a price frame
+NEWS_COLUMNS = ['news_count', 'news_polarity', 'news_subjectivity']
+
+CASHTAG_PATTERN = re.compile(r'(?<![\w$])\$([A-Za-z]{1,5}(?:\.[A-Za-z])?)(?![\w])')
+
+class EntityMatcher:
+    """Map company names, aliases, cashtags and symbols in text to ticker symbols"""
+
+    def __init__(self, entities):
+        self.entities = {ticker.upper(): list(names) for ticker, names in entities.items()}
+        # Names match as written (or shouted in all caps), so "apple pie" or "the meta debate" is not a mention
+        self.aliases = {}
+        for ticker, names in self.entities.items():
+            for name in names:
+                self.aliases[name] = ticker
+                self.aliases[name.upper()] = ticker
+
+        names = sorted(self.aliases)
+        self.name_pattern = re.compile(r'(?<!\w)(' + _trie_pattern(names) + r')(?!\w)') if names else None
+        symbols = sorted(t for t in self.entities if t not in AMBIGUOUS_SYMBOLS)
+        # Bare symbols must be upper case, so "Intel now" does not become NOW
+        self.symbol_pattern = re.compile(r'(?<![\w$])(' + _trie_pattern(symbols) + r')(?![\w])') \
+            if symbols else None
+
+    @classmethod
+    def from_config(cls, path=ENTITIES_PATH):
+        """Load a JSON object mapping ticker -> list of company names and aliases"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def tag(self, text):
+        """Sorted ticker symbols mentioned in a string"""
+        text = text or ''
+        tickers = {symbol.upper() for symbol in CASHTAG_PATTERN.findall(text)}
+        if self.name_pattern is not None:
+            tickers.update(self.aliases[name] for name in self.name_pattern.findall(text))
+        if self.symbol_pattern is not None:
+            tickers.update(self.symbol_pattern.findall(text))
+        return sorted(tickers)
+
+    def tag_series(self, texts):
+        """Tag a whole pandas Series of strings, returning a Series of ticker lists"""
+        return texts.fillna('').map(self.tag)
+
+def article_texts(df):
+    """Headline, summary and body (when present) of each article joined into one string"""
+    text = df['headline'].fillna('') if 'headline' in df.columns else pd.Series('', index=df.index)
+    for column in ['summary', 'body']:
+        if column in df.columns:
+            text = text + '\n' + df[column].where(df[column].map(lambda v: isinstance(v, str)), '')
+    return text
+
+def article_dates(df):
+    """Day each article belongs to: its scrape date, as the article store partitions it"""
+    if 'date' in df.columns:
+        return df['date'].astype(str)
+    return pd.to_datetime(df['scraped_date'], errors='coerce').dt.strftime('%Y-%m-%d').fillna('unknown')
+
+def article_id(article):
+    """Id of an article dict: its url hash, or a hash of source and headline when it has no link"""
+    link_key, _ = article_keys(article)
+    if link_key:
+        return link_key
+    return headline_hash(f"{article.get('source') or ''} {article.get('headline') or ''}")
+
+class EntityIndex:
+    """Inverted index (ticker, date) -> article ids, with each article's sentiment
+
+    Article ids are the url hash the seen-article index uses, or a hash of the
+    source and headline for articles without a link (see article_id()).
+    """
+
+    def __init__(self, path=ENTITY_INDEX_PATH, matcher=None):
+        self.path = path
+        self.matcher = matcher or EntityMatcher.from_config()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS mentions (
+                ticker TEXT,
+                date TEXT,
+                article_id TEXT,
+                source TEXT,
+                polarity REAL,
+                subjectivity REAL,
+                indexed_at REAL,
+                PRIMARY KEY (ticker, date, article_id)
+            )
+        """)
+        self._conn.commit()
+
+    def tag(self, df):
+        """Copy of an article DataFrame with a 'tickers' column of the symbols each article mentions"""
+        df = df.copy()
+        df['tickers'] = self.matcher.tag_series(article_texts(df)) if not df.empty else []
+        return df
+
+    def add(self, df):
+        """Index articles by the tickers they mention (tagging them first if needed); returns the mention count"""
+        if df.empty:
+            return 0
+        if 'tickers' not in df.columns:
+            df = self.tag(df)
+        now = time.time()
+        dates = article_dates(df)
+        rows = []
+        for i, (index, article) in enumerate(df.iterrows()):
+            polarity = article.get('polarity')
+            subjectivity = article.get('subjectivity')
+            for ticker in article['tickers']:
+                rows.append((
+                    ticker, dates.iloc[i], article_id(article), article.get('source'),
+                    None if pd.isna(polarity) else float(polarity),
+                    None if pd.isna(subjectivity) else float(subjectivity),
+                    now,
+                ))
+        with self._lock:
+            # A re-indexed article (e.g. after its body was scored) replaces its earlier scores
+            self._conn.executemany("INSERT OR REPLACE INTO mentions VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def articles(self, ticker, date):
+        """Ids of the articles mentioning ticker on date ('YYYY-MM-DD')"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT article_id FROM mentions WHERE ticker = ? AND date = ?",
+                (ticker.upper(), str(date))
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def daily_aggregates(self, tickers=None, start_date=None, end_date=None):
+        """
+        News count and mean sentiment per ticker and day
+
+        Returns:
+        pandas.DataFrame: Indexed by (ticker, date) with news_count, news_polarity, news_subjectivity
+        """
+        query = ("SELECT ticker, date, COUNT(*), AVG(polarity), AVG(subjectivity) FROM mentions "
+                 "WHERE date != 'unknown'")
+        params = []
+        if tickers:
+            tickers = [t.upper() for t in tickers]
+            query += f" AND ticker IN ({','.join('?' * len(tickers))})"
+            params.extend(tickers)
+        if start_date:
+            query += " AND date >= ?"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND date <= ?"
+            params.append(str(end_date))
+        query += " GROUP BY ticker, date"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        frame = pd.DataFrame(rows, columns=['ticker', 'date'] + NEWS_COLUMNS)
+        return frame.set_index(['ticker', 'date']).sort_index()
+
+    def daily_features(self, data, ticker):
+        """
+        Join the ticker's daily news aggregates onto a price frame indexed by bar timestamp
+
+        Days without news get a count of 0 and neutral (0) sentiment.
+
+        Returns:
+        pandas.DataFrame: Copy of data with the NEWS_COLUMNS added
+        """
+        data = data.copy()
+        days = pd.DatetimeIndex(data.index).strftime('%Y-%m-%d')
+        aggregates = self.daily_aggregates([ticker], days.min(), days.max()) if len(days) else None
+        if aggregates is None or aggregates.empty:
+            for column in NEWS_COLUMNS:
+                data[column] = 0.0
+            return data
+
+        # Hash lookup per bar on the day key
+        by_day = aggregates.droplevel('ticker')
+        joined = by_day.reindex(days)
+        data['news_count'] = joined['news_count'].fillna(0).to_numpy(dtype=float)
+        data['news_polarity'] = joined['news_polarity'].fillna(0).to_numpy(dtype=float)
+        data['news_subjectivity'] = joined['news_subjectivity'].fillna(0).to_numpy(dtype=float)
+        return data
+
+    def rebuild(self, store):
+        """Re-index every article in an ArticleStore, e.g. after entities.json changes"""
+        df = store.read()
+        with self._lock:
+            self._conn.execute("DELETE FROM mentions")
+            self._conn.commit()
+        return self.add(self.tag(df))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM mentions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_entity_index = None
+_entity_index_lock = threading.Lock()
+
+def get_entity_index():
+    """Return the shared entity index, creating it on first use"""
+    global _entity_index
+    with _entity_index_lock:
+        if _entity_index is None:
+            _entity_index = EntityIndex(ENTITY_INDEX_PATH)
+        return _entity_index
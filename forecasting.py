@@ -0,0 +1,144 @@
+"""Batched recursive and direct multi-horizon forecasting for the LSTM models
+
+forecast_future() used to call model.predict() once per day ahead for a single
+ticker and rebuild the input window with np.vstack every step. Here all
+windows are rolled forward together: one compiled model call per step for the
+whole batch, writing each prediction into a preallocated buffer.
+"""
+import weakref
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from metrics import span
+
+# Non-feature columns dropped before scaling, as in forecast_future()
+NON_FEATURE_COLUMNS = ['Dividends', 'Stock Splits', 'Target']
+
+_compiled_models = weakref.WeakKeyDictionary()
+
+def compiled_predict(model):
+    """A tf.function calling the model directly, cached per model
+
+    Calling the model avoids the per-call setup of model.predict(), which
+    dominates when each call only sees a handful of windows.
+    """
+    predict = _compiled_models.get(model)
+    if predict is None:
+        import tensorflow as tf
+        # Only a weak reference in the closure: the cached function must not keep its key (the model) alive
+        model_ref = weakref.ref(model)
+        predict = tf.function(lambda x: model_ref()(x, training=False), reduce_retracing=True)
+        _compiled_models[model] = predict
+    return predict
+
+def _run(model, x, predict_fn):
+    predict_fn = predict_fn or compiled_predict(model)
+    with span('model_call'):
+        return np.asarray(predict_fn(x)).reshape(len(x), -1)
+
+def feature_columns(data):
+    return [col for col in data.columns if col not in NON_FEATURE_COLUMNS]
+
+def last_window(data, scaler_X, look_back):
+    """Scaled input window of the last look_back rows of a get_stock_data() frame"""
+    features = data[feature_columns(data)]
+    return scaler_X.transform(features.tail(look_back).values)
+
+def roll_forward(model, windows, close_idx, days_ahead, predict_fn=None):
+    """Recursive forecast for a batch of windows in one model call per step
+
+    Parameters:
+    model: Trained LSTM model taking (batch, look_back, n_features)
+    windows (numpy.ndarray): Scaled input windows, shape (B, look_back, n_features)
+    close_idx (int or array): Index of the 'Close' feature, per window or shared
+    days_ahead (int): Number of steps to forecast
+    predict_fn (callable): Optional replacement for the compiled model call (e.g. a stub in tests)
+
+    Returns:
+    numpy.ndarray: Scaled predictions, shape (B, days_ahead)
+    """
+    windows = np.asarray(windows, dtype=np.float32)
+    batch, look_back, n_features = windows.shape
+
+    # Room for the history plus every predicted step; each step's input is a slice of it.
+    # Predicted rows only carry the predicted close, all other features stay zero.
+    buffer = np.zeros((batch, look_back + days_ahead, n_features), dtype=np.float32)
+    buffer[:, :look_back] = windows
+    rows = np.arange(batch)
+    close_idx = np.broadcast_to(close_idx, (batch,))
+
+    forecast = np.empty((batch, days_ahead), dtype=np.float32)
+    for step in range(days_ahead):
+        pred = _run(model, buffer[:, step:step + look_back], predict_fn)[:, 0]
+        forecast[:, step] = pred
+        buffer[rows, look_back + step, close_idx] = pred
+    return forecast
+
+def forecast_many(model, datas, scalers, look_back, days_ahead=5, predict_fn=None):
+    """Forecast several tickers that share one model in a single batch
+
+    Parameters:
+    model: Trained LSTM model
+    datas (dict): ticker -> DataFrame from get_stock_data()
+    scalers (dict): ticker -> (scaler_X, scaler_y) fitted for that ticker
+    look_back (int): Number of previous time steps used as input features
+    days_ahead (int): Number of days to forecast ahead
+
+    Returns:
+    dict: ticker -> numpy.ndarray of forecasted prices, shape (days_ahead, 1)
+    """
+    tickers = list(datas)
+    if not tickers:
+        return {}
+    windows = np.stack([last_window(datas[t], scalers[t][0], look_back) for t in tickers])
+    close_idx = [_close_index(datas[t]) for t in tickers]
+
+    scaled = roll_forward(model, windows, close_idx, days_ahead, predict_fn)
+    return {
+        ticker: scalers[ticker][1].inverse_transform(scaled[i].reshape(-1, 1))
+        for i, ticker in enumerate(tickers)
+    }
+
+def _close_index(data):
+    try:
+        return feature_columns(data).index('Close')
+    except ValueError:
+        # If 'Close' is not found, use the first column as a fallback
+        return 0
+
+def build_multi_horizon_model(input_shape, horizons):
+    """LSTM like build_lstm_model() but with one output per day ahead, so a forecast is a single pass"""
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
+
+    model = Sequential([
+        Input(shape=input_shape),
+        LSTM(units=50, return_sequences=True),
+        Dropout(0.2),
+        LSTM(units=50, return_sequences=False),
+        Dropout(0.2),
+        Dense(units=25),
+        Dense(units=horizons),
+    ])
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+def multi_horizon_targets(scaled_target, look_back, horizons):
+    """Targets for the direct model, shape (N, horizons), aligned with sliding_windows(features, look_back)[:N]
+
+    Row i holds the targets of the horizons rows following window i, so windows
+    too close to the end to have every horizon are left out (N = T - look_back - horizons + 1).
+    """
+    target = np.asarray(scaled_target, dtype=np.float32).reshape(-1)
+    return sliding_window_view(target[look_back:], horizons)
+
+def forecast_direct(model, windows, scaler_y=None, predict_fn=None):
+    """All horizons of a multi-horizon model for a batch of windows in one call
+
+    Returns scaled predictions of shape (B, horizons), or prices when scaler_y is given.
+    """
+    scaled = _run(model, np.asarray(windows, dtype=np.float32), predict_fn)
+    if scaler_y is None:
+        return scaled
+    return scaler_y.inverse_transform(scaled.reshape(-1, 1)).reshape(scaled.shape)
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+# Query parameters that only track the visitor and never change the page content
+TRACKING_PARAMS = ('utm_', 'guccounter', 'guce_', 'ncid', 'fbclid', 'gclid')
+
+# How long (seconds) a cached page is served without asking the server again
+DEFAULT_TTL = 300
+DOMAIN_TTL = {
+    'finance.yahoo.com': 300,
+    'www.cnbc.com': 300,
+    'www.bloomberg.com': 600,
+    'www.marketwatch.com': 300,
+    'www.investing.com': 300,
+}
+
+def normalize_url(url):
+    """Normalize a URL so trivially different spellings share one cache entry"""
+    parts = urlparse(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    # Drop default ports
+    if parts.port and not (scheme == 'http' and parts.port == 80) and not (scheme == 'https' and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    return urlunparse((scheme, host, parts.path or '/', '', urlencode(sorted(query)), ''))
+
+class CachedResponse:
+    """A stored page that looks enough like a requests.Response for the scrapers"""
+
+    def __init__(self, url, status_code, headers, content, encoding, stored_at, revalidated=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+        self.stored_at = stored_at
+        self.from_cache = True
+        self.revalidated = revalidated
+        self.cache_key = ResponseCache.key_for(url)
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def validators(self):
+        """Headers for a conditional GET against the stored copy"""
+        headers = {}
+        if self.headers.get('ETag'):
+            headers['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+class ResponseCache:
+    """On-disk HTTP response cache with ETag/Last-Modified revalidation and LRU eviction
+
+    Entries live in a single SQLite file. Each entry is fresh for the TTL of its
+    domain; after that it is revalidated with a conditional GET. When the cache
+    grows past max_bytes the least recently used entries are evicted.
+
+    Listing items the scrapers extracted from a page are also kept in memory
+    under its cache key and a digest of its content, so a page served from the
+    cache or revalidated with a 304 is not parsed again.
+    """
+
+    def __init__(self, path='http_cache.sqlite', max_bytes=200 * 1024 * 1024,
+                 default_ttl=DEFAULT_TTL, domain_ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.domain_ttl = dict(DOMAIN_TTL if domain_ttl is None else domain_ttl)
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (source, cache key) -> (content digest, extracted items)
+        self._listings = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                status_code INTEGER,
+                headers TEXT,
+                content BLOB,
+                encoding TEXT,
+                size INTEGER,
+                stored_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def ttl_for(self, url):
+        host = (urlparse(url).hostname or '').lower()
+        return self.domain_ttl.get(host, self.default_ttl)
+
+    def get(self, url):
+        """Return the stored response for url (fresh or stale), or None"""
+        key = self.key_for(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status_code, headers, content, encoding, stored_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        stored_url, status_code, headers, content, encoding, stored_at = row
+        return CachedResponse(stored_url, status_code, json.loads(headers), content, encoding, stored_at)
+
+    def is_fresh(self, cached):
+        return time.time() - cached.stored_at < self.ttl_for(cached.url)
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def store(self, url, response):
+        """Store a 200 response with its validators, evicting old entries if over budget"""
+        key = self.key_for(url)
+        content = response.content
+        headers = {name: response.headers[name] for name in ('ETag', 'Last-Modified', 'Content-Type')
+                   if response.headers.get(name)}
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, response.status_code, json.dumps(headers), content,
+                 response.encoding, len(content), now, now)
+            )
+            self._conn.commit()
+            self._evict()
+
+    def refresh(self, cached):
+        """Mark a stored response as revalidated after a 304 Not Modified"""
+        key = cached.cache_key
+        now = time.time()
+        with self._lock:
+            self.revalidations += 1
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+        cached.stored_at = now
+        cached.revalidated = True
+        return cached
+
+    @staticmethod
+    def _listing_key(source, response):
+        key = getattr(response, 'cache_key', None)
+        if key is None:
+            return None, None
+        return (source, key), hashlib.sha1(response.content).hexdigest()
+
+    def get_listing(self, source, response):
+        """Items source extracted from this page before, if its content has not changed since"""
+        key, digest = self._listing_key(source, response)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._listings.get(key)
+        if entry is None or entry[0] != digest:
+            return None
+        return [dict(item) for item in entry[1]]
+
+    def set_listing(self, source, response, items):
+        """Remember the items source extracted from a page, replacing those of an older copy"""
+        key, digest = self._listing_key(source, response)
+        if key is None:
+            return
+        with self._lock:
+            self._listings[key] = (digest, [dict(item) for item in items])
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+        self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'misses': self.misses,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._listings.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
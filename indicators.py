@@ -0,0 +1,284 @@
+"""Technical indicators used as LSTM features, computed with NumPy over one or many tickers
+
+Every kernel accepts arrays shaped (T,) or (T, N) -- T bars for N tickers -- and
+reproduces the pandas expressions get_stock_data() used to build (rolling
+means/std with full windows, ewm(adjust=False), pct_change, ...). IndicatorEngine
+additionally keeps the rolling state so new bars can be added one at a time
+without recomputing the history.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Numba is optional; it only speeds up the sequential EMA recursion
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Indicator columns in the order get_stock_data() adds them
+INDICATOR_COLUMNS = [
+    'MA20', 'MA50', 'RSI', 'EMA12', 'EMA26', 'MACD', 'Signal', 'ROC',
+    '20STD', 'Upper', 'Lower', 'ATR', 'Volume_ROC', 'Volume_MA20', 'Momentum'
+]
+
+# Longest look-back any indicator needs
+MAX_WINDOW = 50
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=float)
+    return x.reshape(-1, 1) if x.ndim == 1 else x
+
+def rolling_mean(x, window):
+    """Rolling mean over axis 0, NaN until the window is full (pandas rolling(window).mean())"""
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window, axis=0).mean(axis=-1)
+    return out
+
+def rolling_std(x, window):
+    """Rolling sample standard deviation over axis 0 (pandas rolling(window).std())"""
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window, axis=0).std(axis=-1, ddof=1)
+    return out
+
+def shift(x, periods):
+    """Shift down by periods along axis 0, filling with NaN"""
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+def pct_change(x, periods):
+    x = _as_2d(x)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x / shift(x, periods) - 1
+
+@njit(cache=True)
+def _ewm_kernel(x, alpha, out):
+    # pandas' adjust=False recursion: a column starts at its first non-NaN value,
+    # NaN bars repeat the previous average, and the weight of the old average
+    # keeps decaying over the gap so the next value counts for more
+    for j in range(x.shape[1]):
+        weighted = np.nan
+        old_wt = 1.0
+        for t in range(x.shape[0]):
+            cur = x[t, j]
+            if weighted == weighted:
+                old_wt *= 1 - alpha
+                if cur == cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                    old_wt = 1.0
+            elif cur == cur:
+                weighted = cur
+            out[t, j] = weighted
+
+def ewm_mean(x, span):
+    """Exponential moving average along axis 0 (pandas ewm(span=span, adjust=False).mean())"""
+    x = _as_2d(x)
+    out = np.empty_like(x)
+    if len(x):
+        _ewm_kernel(x, 2.0 / (span + 1), out)
+    return out
+
+def _bars_since_valid(x):
+    """Bars since the last non-NaN value of each column (0 if the last bar has one)"""
+    x = _as_2d(x)
+    valid = ~np.isnan(x[::-1])
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), 0)
+
+def _ewm_step(weighted, gap, cur, span):
+    """Advance ewm_mean by one bar; gap counts the NaN bars since the last value"""
+    alpha = 2.0 / (span + 1)
+    old_wt = (1 - alpha) ** (gap + 1)
+    has_value = ~np.isnan(cur)
+    with np.errstate(invalid='ignore'):
+        stepped = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+    weighted = np.where(np.isnan(weighted), cur, np.where(has_value, stepped, weighted))
+    return weighted, np.where(has_value, 0, gap + 1)
+
+def true_range(high, low, close):
+    """Largest of high-low, |high-prev close| and |low-prev close|, ignoring the missing first prev close"""
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev_close = shift(close, 1)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+def rsi_from_averages(avg_gain, avg_loss):
+    rs = avg_gain / np.maximum(avg_loss, 0.001)
+    return 100 - (100 / (1 + rs))
+
+def compute_indicators(close, high=None, low=None, volume=None):
+    """Compute every indicator for one or many tickers at once
+
+    Parameters:
+    close (numpy.ndarray): Closing prices, shape (T,) or (T, N)
+    high, low (numpy.ndarray): Optional highs and lows; ATR falls back to a 14-bar close std without them
+    volume (numpy.ndarray): Optional volumes; volume features are 0 without them
+
+    Returns:
+    dict: Indicator name -> array shaped like close (always 2-D)
+    """
+    close = _as_2d(close)
+    out = {}
+    out['MA20'] = rolling_mean(close, 20)
+    out['MA50'] = rolling_mean(close, 50)
+
+    delta = close - shift(close, 1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    out['RSI'] = rsi_from_averages(rolling_mean(gain, 14), rolling_mean(loss, 14))
+
+    out['EMA12'] = ewm_mean(close, 12)
+    out['EMA26'] = ewm_mean(close, 26)
+    out['MACD'] = out['EMA12'] - out['EMA26']
+    out['Signal'] = ewm_mean(out['MACD'], 9)
+
+    out['ROC'] = pct_change(close, 10) * 100
+
+    out['20STD'] = rolling_std(close, 20)
+    out['Upper'] = out['MA20'] + out['20STD'] * 2
+    out['Lower'] = out['MA20'] - out['20STD'] * 2
+
+    if high is not None and low is not None:
+        out['ATR'] = rolling_mean(true_range(high, low, close), 14)
+    else:
+        out['ATR'] = rolling_std(close, 14)
+
+    if volume is not None:
+        volume = _as_2d(volume)
+        out['Volume_ROC'] = pct_change(volume, 1) * 100
+        out['Volume_MA20'] = rolling_mean(volume, 20)
+    else:
+        out['Volume_ROC'] = np.zeros(close.shape)
+        out['Volume_MA20'] = np.zeros(close.shape)
+
+    out['Momentum'] = close - shift(close, 10)
+    return out
+
+def add_indicators(df):
+    """Add the indicator columns to an OHLCV DataFrame, in the order get_stock_data() expects"""
+    # Ensure 'High' and 'Low' columns exist
+    if 'High' not in df.columns and 'high' in df.columns:
+        df['High'] = df['high']
+    if 'Low' not in df.columns and 'low' in df.columns:
+        df['Low'] = df['low']
+    has_range = 'High' in df.columns and 'Low' in df.columns
+    has_volume = 'Volume' in df.columns
+
+    values = compute_indicators(
+        df['Close'].to_numpy(dtype=float),
+        df['High'].to_numpy(dtype=float) if has_range else None,
+        df['Low'].to_numpy(dtype=float) if has_range else None,
+        df['Volume'].to_numpy(dtype=float) if has_volume else None,
+    )
+    for name in INDICATOR_COLUMNS:
+        if name == 'Volume_ROC' and not has_volume:
+            # Create dummy volume features to maintain consistency
+            df['Volume'] = 0
+        df[name] = values[name][:, 0]
+    return df
+
+class IndicatorEngine:
+    """Incremental indicator state for N tickers
+
+    fit() computes the full history once and keeps only the last MAX_WINDOW bars
+    plus the EMA values; update() then advances every indicator by one bar at a
+    cost that does not depend on how long the history is.
+    """
+
+    def __init__(self, use_range=True, use_volume=True):
+        self.use_range = use_range
+        self.use_volume = use_volume
+        self.close = None
+
+    def fit(self, close, high=None, low=None, volume=None):
+        """Compute indicators for a block of history and prime the rolling state from its tail"""
+        close = _as_2d(close)
+        high = _as_2d(high) if self.use_range and high is not None else None
+        low = _as_2d(low) if self.use_range and low is not None else None
+        volume = _as_2d(volume) if self.use_volume and volume is not None else None
+        self.use_range = high is not None and low is not None
+        self.use_volume = volume is not None
+
+        values = compute_indicators(close, high, low, volume)
+
+        self.close = close[-(MAX_WINDOW + 1):].copy()
+        self.tr = true_range(high, low, close)[-14:].copy() if self.use_range else None
+        self.volume = volume[-21:].copy() if self.use_volume else None
+        self.ema12 = values['EMA12'][-1].copy()
+        self.ema26 = values['EMA26'][-1].copy()
+        self.signal = values['Signal'][-1].copy()
+        self.close_gap = _bars_since_valid(close)
+        self.macd_gap = _bars_since_valid(values['MACD'])
+        return values
+
+    @staticmethod
+    def _push(buffer, row, keep):
+        return np.vstack([buffer, row[None, :]])[-keep:]
+
+    def update(self, close, high=None, low=None, volume=None):
+        """Add one bar per ticker (arrays shaped (N,)) and return each indicator for that bar"""
+        if self.close is None:
+            raise RuntimeError("Call fit() with some history before update()")
+        close = np.atleast_1d(np.asarray(close, dtype=float))
+        prev_close = self.close[-1]
+        self.close = self._push(self.close, close, MAX_WINDOW + 1)
+        closes = self.close
+
+        def window_mean(buffer, window):
+            return buffer[-window:].mean(axis=0) if len(buffer) >= window else np.full(close.shape, np.nan)
+
+        out = {}
+        out['MA20'] = window_mean(closes, 20)
+        out['MA50'] = window_mean(closes, 50)
+
+        deltas = np.diff(closes[-15:], axis=0)
+        if len(deltas) >= 14:
+            avg_gain = np.where(deltas > 0, deltas, 0.0).mean(axis=0)
+            avg_loss = np.where(deltas < 0, -deltas, 0.0).mean(axis=0)
+            out['RSI'] = rsi_from_averages(avg_gain, avg_loss)
+        else:
+            out['RSI'] = np.full(close.shape, np.nan)
+
+        self.ema12, _ = _ewm_step(self.ema12, self.close_gap, close, 12)
+        self.ema26, self.close_gap = _ewm_step(self.ema26, self.close_gap, close, 26)
+        out['EMA12'] = self.ema12
+        out['EMA26'] = self.ema26
+        out['MACD'] = self.ema12 - self.ema26
+        self.signal, self.macd_gap = _ewm_step(self.signal, self.macd_gap, out['MACD'], 9)
+        out['Signal'] = self.signal
+
+        past = closes[-11] if len(closes) >= 11 else np.full(close.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['ROC'] = (close / past - 1) * 100
+
+        out['20STD'] = closes[-20:].std(axis=0, ddof=1) if len(closes) >= 20 else np.full(close.shape, np.nan)
+        out['Upper'] = out['MA20'] + out['20STD'] * 2
+        out['Lower'] = out['MA20'] - out['20STD'] * 2
+
+        if self.use_range:
+            high = np.atleast_1d(np.asarray(high, dtype=float))
+            low = np.atleast_1d(np.asarray(low, dtype=float))
+            tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+            self.tr = self._push(self.tr, tr, 14)
+            out['ATR'] = window_mean(self.tr, 14)
+        else:
+            out['ATR'] = closes[-14:].std(axis=0, ddof=1) if len(closes) >= 14 else np.full(close.shape, np.nan)
+
+        if self.use_volume:
+            volume = np.atleast_1d(np.asarray(volume, dtype=float))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out['Volume_ROC'] = (volume / self.volume[-1] - 1) * 100
+            self.volume = self._push(self.volume, volume, 21)
+            out['Volume_MA20'] = window_mean(self.volume, 20)
+        else:
+            out['Volume_ROC'] = np.zeros(close.shape)
+            out['Volume_MA20'] = np.zeros(close.shape)
+
+        out['Momentum'] = close - past
+        return out
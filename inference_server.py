@@ -0,0 +1,190 @@
+"""Warm forecast service over the model registry
+
+Loads the latest version of every registered model once at startup and serves
+  GET /forecast?ticker=NVDA&days=3
+  GET /models
+Concurrent requests for the same model are micro-batched into a single model
+call, and each ticker's recent features are cached for a short time so a
+forecast does not pay for a price download.
+
+Usage: python inference_server.py [port]
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from forecasting import roll_forward
+from model_registry import ModelRegistry
+from prediction import get_stock_data, forecast_dates
+from entity_index import NEWS_COLUMNS
+
+# Forecasts roll the model forward one day at a time; longer horizons are refused
+MAX_FORECAST_DAYS = 30
+
+class MicroBatcher:
+    """Collect forecast requests for one model and run them as one batch
+
+    The first request waits at most max_wait seconds for others to join, and a
+    batch never grows past max_batch windows.
+    """
+
+    def __init__(self, model, max_batch=64, max_wait=0.005, predict_fn=None):
+        self.model = model
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, window, close_idx, days_ahead):
+        """Queue one scaled window; the Future resolves to its scaled predictions, shape (days_ahead,)"""
+        future = Future()
+        self._queue.put((window, close_idx, days_ahead, future))
+        return future
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            windows = np.stack([item[0] for item in items])
+            close_idx = [item[1] for item in items]
+            days = max(item[2] for item in items)
+            try:
+                scaled = roll_forward(self.model, windows, close_idx, days, self.predict_fn)
+            except Exception as e:
+                for item in items:
+                    item[3].set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(items)
+            for i, item in enumerate(items):
+                item[3].set_result(scaled[i, :item[2]])
+
+class ForecastService:
+    """Registry models kept in memory, with micro-batched forecasts and cached features"""
+
+    def __init__(self, registry=None, feature_period='1y', feature_ttl=60, max_batch=64, max_wait=0.005):
+        self.registry = registry or ModelRegistry()
+        self.feature_period = feature_period
+        self.feature_ttl = feature_ttl
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.entries = {}
+        self.batchers = {}
+        self._features = {}
+        self._features_lock = threading.Lock()
+
+    def load_all(self):
+        """Load the latest version of every registered model"""
+        for name in self.registry.names():
+            entry = self.registry.load(name)
+            batcher = MicroBatcher(entry['model'], self.max_batch, self.max_wait)
+            for ticker in entry['tickers']:
+                self.entries[ticker] = entry
+                self.batchers[ticker] = batcher
+            print(f"Loaded {name} {entry['version']} for {', '.join(entry['tickers'])}")
+        return self
+
+    def features(self, ticker, news=False, interval='1d'):
+        """Recent feature frame for ticker at the model's bar interval, refreshed at most every feature_ttl seconds"""
+        key = (ticker, news, interval)
+        with self._features_lock:
+            cached = self._features.get(key)
+        if cached and time.monotonic() - cached[0] < self.feature_ttl:
+            return cached[1]
+        data = get_stock_data(ticker, self.feature_period, interval, news=news)
+        with self._features_lock:
+            self._features[key] = (time.monotonic(), data)
+        return data
+
+    def forecast(self, ticker, days_ahead=3):
+        ticker = ticker.upper()
+        entry = self.entries.get(ticker)
+        if entry is None:
+            raise KeyError(ticker)
+
+        columns = entry['feature_columns']
+        data = self.features(ticker, news=any(column in NEWS_COLUMNS for column in columns),
+                             interval=entry.get('interval', '1d'))
+        window = entry['scaler_X'].transform(data[columns].tail(entry['look_back']).values)
+        close_idx = columns.index('Close') if 'Close' in columns else 0
+
+        scaled = self.batchers[ticker].submit(window, close_idx, days_ahead).result(timeout=30)
+        prices = entry['scaler_y'].inverse_transform(scaled.reshape(-1, 1))[:, 0]
+        dates = forecast_dates(data.index[-1], days_ahead)
+        return {
+            'ticker': ticker,
+            'model_version': entry['version'],
+            'last_close': float(data['Close'].iloc[-1]),
+            'forecast': [{'date': d.strftime('%Y-%m-%d'), 'price': float(p)} for d, p in zip(dates, prices)],
+        }
+
+    def models(self):
+        return {ticker: {'version': e['version'], 'look_back': e['look_back'], 'metrics': e['metrics']}
+                for ticker, e in self.entries.items()}
+
+def make_handler(service):
+    class ForecastHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == '/models':
+                return self._send(200, service.models())
+            if url.path != '/forecast':
+                return self._send(404, {'error': 'not found'})
+            if 'ticker' not in params:
+                return self._send(400, {'error': 'missing ticker'})
+            try:
+                days = int(params.get('days', ['3'])[0])
+            except ValueError:
+                return self._send(400, {'error': 'days must be an integer'})
+            if not 1 <= days <= MAX_FORECAST_DAYS:
+                return self._send(400, {'error': f"days must be between 1 and {MAX_FORECAST_DAYS}"})
+            ticker = params['ticker'][0].upper()
+            if ticker not in service.entries:
+                return self._send(404, {'error': f"no model for {ticker}"})
+            try:
+                return self._send(200, service.forecast(ticker, days))
+            except Exception as e:
+                return self._send(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ForecastHandler
+
+def serve(port=8000, host='127.0.0.1', service=None):
+    service = service or ForecastService().load_all()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving forecasts on port {port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
@@ -0,0 +1,70 @@
+import json
+import os
+import re
+
+import pandas as pd
+
+# Term list used by filter_tech_stock_articles
+TECH_TERMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tech_terms.json')
+
+def _trie_pattern(words):
+    """Build a regex alternation from a prefix trie, so thousands of words match without backtracking over each one"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def to_pattern(node):
+        end = '' in node
+        branches = [re.escape(char) + to_pattern(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        if len(branches) == 1 and not end:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if end else pattern
+
+    return to_pattern(trie)
+
+class KeywordMatcher:
+    """Whole-word, case-insensitive matcher for a list of terms and ticker symbols
+
+    All terms are compiled into a single regex, so matching costs one scan of
+    the text no matter how long the watchlist grows. Tickers may also appear as
+    cashtags (e.g. $NVDA).
+    """
+
+    def __init__(self, terms=(), tickers=()):
+        self.terms = {term.lower() for term in terms}
+        self.tickers = {ticker.lower() for ticker in tickers}
+        words = sorted(self.terms | self.tickers)
+        if words:
+            self.pattern = re.compile(r'(?<![\w$])\$?(' + _trie_pattern(words) + r')(?!\w)', re.IGNORECASE)
+        else:
+            # Never matches
+            self.pattern = re.compile(r'(?!x)x')
+
+    @classmethod
+    def from_config(cls, path=TECH_TERMS_PATH):
+        """Load terms and tickers from a JSON file with "terms" and "tickers" lists"""
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('terms', []), config.get('tickers', []))
+
+    def find(self, text):
+        """Return (matched_terms, matched_tickers) found in a single string"""
+        found = {match.lower() for match in self.pattern.findall(text or '')}
+        return sorted(found & self.terms), sorted(found & self.tickers)
+
+    def match_series(self, texts):
+        """Match a whole pandas Series of strings at once
+
+        Returns a DataFrame with 'matched_terms' and 'matched_tickers' list columns, aligned with texts.
+        """
+        found = texts.fillna('').str.lower().str.findall(self.pattern).map(set)
+        return pd.DataFrame({
+            'matched_terms': found.map(lambda words: sorted(words & self.terms)),
+            'matched_tickers': found.map(lambda words: sorted(words & self.tickers)),
+        }, index=texts.index)
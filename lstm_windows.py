@@ -0,0 +1,139 @@
+"""Sliding-window LSTM inputs without materializing every window
+
+A (T, F) feature buffer has T - look_back windows of shape (look_back, F).
+Stacking them into one array costs look_back times the memory of the buffer;
+here the windows are strided views into the buffer, and only one batch at a
+time is ever copied when feeding the model.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def sliding_windows(features, look_back):
+    """Read-only view of shape (T - look_back, look_back, F) where window i is features[i:i + look_back]
+
+    Window i is the input for predicting row i + look_back, matching the
+    X[i - look_back] = features[i - look_back:i] loop prepare_lstm_data used to run.
+    """
+    features = np.asarray(features)
+    if len(features) <= look_back:
+        return np.empty((0, look_back, features.shape[1]), dtype=features.dtype)
+    # sliding_window_view puts the window axis last: (T - look_back + 1, F, look_back)
+    windows = sliding_window_view(features, look_back, axis=0).transpose(0, 2, 1)
+    return windows[:-1]
+
+def window_batches(X, y=None, batch_size=32, shuffle=False, seed=None):
+    """Yield (X_batch, y_batch) copies of one batch at a time from (possibly strided) window arrays"""
+    order = np.arange(len(X))
+    if shuffle:
+        np.random.default_rng(seed).shuffle(order)
+    for start in range(0, len(order), batch_size):
+        index = order[start:start + batch_size]
+        if not shuffle:
+            # Contiguous slices copy straight from the view
+            index = slice(index[0], index[-1] + 1)
+        X_batch = np.ascontiguousarray(X[index], dtype=np.float32)
+        if y is None:
+            yield X_batch
+        else:
+            yield X_batch, np.asarray(y[index], dtype=np.float32)
+
+def to_tf_dataset(X, y=None, batch_size=32, shuffle=False):
+    """Wrap window arrays in a tf.data pipeline that builds batches lazily from the views
+
+    Shuffling re-draws the batch order on every epoch.
+    """
+    import tensorflow as tf
+
+    x_spec = tf.TensorSpec(shape=(None,) + tuple(X.shape[1:]), dtype=tf.float32)
+    if y is None:
+        signature = x_spec
+    else:
+        signature = (x_spec, tf.TensorSpec(shape=(None,), dtype=tf.float32))
+
+    dataset = tf.data.Dataset.from_generator(
+        lambda: window_batches(X, y, batch_size, shuffle),
+        output_signature=signature
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+class WindowedDataset:
+    """Windows over many series concatenated in one contiguous buffer
+
+    series is a list of (features, targets) pairs, e.g. one per ticker. Windows
+    never cross from one series into the next.
+    """
+
+    def __init__(self, series, look_back, dtype=np.float32):
+        self.look_back = look_back
+        self.features = np.ascontiguousarray(np.concatenate([f for f, _ in series]), dtype=dtype)
+        self.targets = np.concatenate([np.asarray(t).reshape(-1) for _, t in series]).astype(dtype)
+        self.lengths = [len(f) for f, _ in series]
+
+        # Row offsets where each series starts in the shared buffer
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)[:-1]]).astype(int)
+
+        # Target rows whose full look-back window stays inside their own series
+        self.rows = np.concatenate([
+            np.arange(offset + look_back, offset + length)
+            for offset, length in zip(self.offsets, self.lengths)
+        ]).astype(int) if series else np.empty(0, dtype=int)
+
+        self._windows = sliding_windows(self.features, look_back)
+
+    def _subset(self, rows):
+        subset = object.__new__(WindowedDataset)
+        subset.__dict__.update(self.__dict__)
+        subset.rows = rows
+        return subset
+
+    def __len__(self):
+        return len(self.rows)
+
+    def series_rows(self):
+        """Target rows of each series, in order"""
+        bounds = np.searchsorted(self.rows, np.append(self.offsets, len(self.features)))
+        return [self.rows[bounds[i]:bounds[i + 1]] for i in range(len(self.offsets))]
+
+    def train_test_split(self, train_fraction=0.8):
+        """Chronological split of every series, so test windows always come after training ones"""
+        train, test = [], []
+        for rows in self.series_rows():
+            cut = int(len(rows) * train_fraction)
+            train.append(rows[:cut])
+            test.append(rows[cut:])
+        return self._subset(np.concatenate(train)), self._subset(np.concatenate(test))
+
+    @property
+    def X(self):
+        """Windows as an array: a zero-copy view when the rows are contiguous, else a gathered copy"""
+        window_index = self.rows - self.look_back
+        if len(window_index) and np.all(np.diff(window_index) == 1):
+            return self._windows[window_index[0]:window_index[-1] + 1]
+        return self._windows[window_index]
+
+    @property
+    def y(self):
+        return self.targets[self.rows]
+
+    def batches(self, batch_size=32, shuffle=False, seed=None):
+        """Yield (X_batch, y_batch) for every window, one batch copied at a time"""
+        order = np.arange(len(self.rows))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            rows = self.rows[order[start:start + batch_size]]
+            yield self._windows[rows - self.look_back].astype(np.float32), self.targets[rows]
+
+    def as_tf_dataset(self, batch_size=32, shuffle=False):
+        """tf.data pipeline over batches() for model.fit / model.predict"""
+        import tensorflow as tf
+
+        signature = (
+            tf.TensorSpec(shape=(None, self.look_back, self.features.shape[1]), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+        )
+        dataset = tf.data.Dataset.from_generator(
+            lambda: self.batches(batch_size, shuffle),
+            output_signature=signature
+        )
+        return dataset.prefetch(tf.data.AUTOTUNE)
@@ -1,22 +1,10 @@
-import requests
-from datetime import date
-
-API_KEY = open('API_key.txt').read()
-SEARCH_ENGINE_ID = open('SEARCH_ENGINE_ID').read()
+from custom_search import CustomSearchClient
 
 search_query = input("Enter search query: ")
 
-url = 'https://www.googleapis.com/customsearch/v1'
-params = {
-    'key': API_KEY,
-    'cx': SEARCH_ENGINE_ID,
-    'q': search_query,
-    'dateRestrict': '2025-02-10:' + str(date.today().strftime("%Y-%m-%d")),
-}
-
-response = requests.get(url, params=params)
-results = response.json()['items']
+client = CustomSearchClient()
+results = [item for query, item in client.iter_search([search_query], start_date='2025-02-10')]
 print(results)
 
 for item in results:
-    print(item['link'])
\ No newline at end of file
+    print(item['link'])
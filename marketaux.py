@@ -1,22 +1,8 @@
-import yfinance as yf
-import requests
-from bs4 import BeautifulSoup
+from news_harvester import harvest_watchlist
 
-news = yf.Search("AAPL", news_count=3)
+news = harvest_watchlist(["AAPL"], news_count=3, save=False)
 
-
-
-
-links = [d['link'] for d in news.news]
-#print(links)
-
-url = links[0]
-response = requests.get(url)
-
-soup = BeautifulSoup(response.text, 'html.parser')
-
-paragraphs = soup.find_all('p')
-
-for paragraph in paragraphs:
-    print(paragraph.text)
-    print()
\ No newline at end of file
+for article in news.itertuples():
+    print(article.headline)
+    print(article.body)
+    print()
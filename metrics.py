@@ -0,0 +1,251 @@
+"""Timing spans, counters and histograms for the scrapers and the prediction pipeline
+
+Off by default. While disabled, span() hands back one shared no-op context
+manager, @timed calls straight through and inc() returns at once, so the
+instrumented code pays a flag check per call. enable() starts collecting;
+metrics are then exported as Prometheus text (prometheus_text(),
+write_prometheus() or serve() on /metrics) and, with a jsonl_path, every
+finished span is also appended to a JSONL file as one event.
+
+Every span is a bucket in the span_seconds histogram labelled with its name;
+counters are exported as <name>_total.
+
+Usage:
+    import metrics
+    metrics.enable(jsonl_path='metrics.jsonl')
+    ... run the scraper or pipeline ...
+    metrics.write_prometheus('metrics.prom')
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'investifai_'
+
+# Histogram bucket bounds in seconds: page fetches and parses up to model training
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+
+# Per-request progress lines (fetch attempts, status codes, extraction sizes, per-request errors);
+# with it off, per-request errors only show up in the counters
+PRINT_PROGRESS = True
+
+# Buffered JSONL events are written once this many have queued up (and at exit)
+JSONL_FLUSH_EVERY = 200
+
+_enabled = False
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_jsonl_path = None
+_jsonl_buffer = []
+
+def progress(message):
+    """Print a progress line unless PRINT_PROGRESS is off"""
+    if PRINT_PROGRESS:
+        print(message)
+
+def is_enabled():
+    return _enabled
+
+def enable(jsonl_path=None):
+    """Start collecting metrics, also appending every finished span to jsonl_path if given"""
+    global _enabled, _jsonl_path
+    with _lock:
+        _jsonl_path = jsonl_path
+    _enabled = True
+
+def disable():
+    """Stop collecting; what was collected so far can still be exported"""
+    global _enabled
+    _enabled = False
+    flush()
+
+def reset():
+    """Drop every collected metric"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _jsonl_buffer.clear()
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def observe(name, seconds, **labels):
+    """Record one duration in the span_seconds histogram under span=name"""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[0][i] += 1
+                break
+        histogram[1] += seconds
+        histogram[2] += 1
+        if _jsonl_path:
+            _jsonl_buffer.append({'ts': time.time(), 'span': name, 'seconds': seconds, 'labels': labels})
+            if len(_jsonl_buffer) >= JSONL_FLUSH_EVERY:
+                _write_jsonl()
+
+def inc(name, value=1, **labels):
+    """Add value to the counter name"""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+class Span:
+    """Times a block and records it on exit; set() adds labels known only inside the block"""
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def set(self, **labels):
+        self.labels.update(labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.labels['error'] = exc_type.__name__
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+class _NullSpan:
+    def set(self, **labels):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def span(name, **labels):
+    """Context manager timing a block as span name (a shared no-op while disabled)"""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, labels)
+
+def timed(name=None):
+    """Decorator timing every call of a function as a span (the function's name by default)"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _write_jsonl():
+    # Called with _lock held
+    if not _jsonl_buffer or not _jsonl_path:
+        return
+    with open(_jsonl_path, 'a', encoding='utf-8') as f:
+        for event in _jsonl_buffer:
+            f.write(json.dumps(event, default=str) + '\n')
+    _jsonl_buffer.clear()
+
+def flush():
+    """Write any buffered JSONL events"""
+    with _lock:
+        _write_jsonl()
+
+atexit.register(flush)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+def prometheus_text():
+    """Every metric in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {key: (list(h[0]), h[1], h[2]) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    if histograms:
+        family = f'{PREFIX}span_seconds'
+        lines.append(f'# HELP {family} Duration of instrumented spans')
+        lines.append(f'# TYPE {family} histogram')
+        for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+            labels = (('span', name),) + labels
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'{family}_bucket{_label_text(labels, [("le", repr(float(bound)))])} {cumulative}')
+            lines.append(f'{family}_bucket{_label_text(labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{family}_sum{_label_text(labels)} {total}')
+            lines.append(f'{family}_count{_label_text(labels)} {count}')
+
+    for name in sorted({name for name, _ in counters}):
+        family = f'{PREFIX}{name}_total'
+        lines.append(f'# TYPE {family} counter')
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f'{family}{_label_text(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(path):
+    """Write prometheus_text() to a file, e.g. for node_exporter's textfile collector"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+def summary():
+    """{span name: {'count', 'mean', 'total'}} over all label sets, for quick printing"""
+    totals = {}
+    with _lock:
+        for (name, _), (_, total, count) in _histograms.items():
+            entry = totals.setdefault(name, {'count': 0, 'total': 0.0})
+            entry['count'] += count
+            entry['total'] += total
+    for entry in totals.values():
+        entry['mean'] = entry['total'] / entry['count'] if entry['count'] else 0.0
+    return totals
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port=9108, host='127.0.0.1'):
+    """Serve /metrics for a Prometheus scraper from a background thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,97 @@
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+from datetime import datetime
+
+class ModelRegistry:
+    """Versioned store of trained models with the scalers they were fitted with
+
+    Layout: <root>/<name>/v0001/{model.keras, scalers.pkl, meta.json}. The
+    scalers must travel with the model, since a forecast is only meaningful
+    when inputs are scaled exactly as they were during training.
+    """
+
+    def __init__(self, root='models'):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _model_dir(self, name):
+        return os.path.join(self.root, name.upper())
+
+    def versions(self, name):
+        """Saved versions of a model, oldest first"""
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(v for v in os.listdir(model_dir) if re.fullmatch(r'v\d+', v))
+
+    def latest_version(self, name):
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def names(self):
+        """Names of every model with at least one saved version"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self.versions(name))
+
+    def save(self, name, model, scaler_X, scaler_y, look_back, feature_columns, tickers=None, metrics=None,
+             interval='1d'):
+        """Save a trained model as the next version of name and return the version string"""
+        with self._lock:
+            versions = self.versions(name)
+            number = int(versions[-1][1:]) + 1 if versions else 1
+            version = f"v{number:04d}"
+            version_dir = os.path.join(self._model_dir(name), version)
+            tmp_dir = version_dir + '.tmp'
+            os.makedirs(tmp_dir, exist_ok=True)
+
+            model.save(os.path.join(tmp_dir, 'model.keras'))
+            with open(os.path.join(tmp_dir, 'scalers.pkl'), 'wb') as f:
+                pickle.dump({'scaler_X': scaler_X, 'scaler_y': scaler_y}, f)
+            meta = {
+                'name': name.upper(),
+                'version': version,
+                'tickers': [t.upper() for t in (tickers or [name])],
+                'look_back': look_back,
+                'feature_columns': list(feature_columns),
+                'interval': interval,
+                'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+
+            # Only a complete directory ever appears under its version name
+            os.rename(tmp_dir, version_dir)
+        return version
+
+    def load_meta(self, name, version=None):
+        version = version or self.latest_version(name)
+        if version is None:
+            raise FileNotFoundError(f"No saved model named {name} in {self.root}")
+        with open(os.path.join(self._model_dir(name), version, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, name, version=None):
+        """Load a model version (latest by default)
+
+        Returns:
+        dict: 'model', 'scaler_X', 'scaler_y' and the saved metadata ('version', 'look_back', ...)
+        """
+        import tensorflow as tf
+
+        meta = self.load_meta(name, version)
+        version_dir = os.path.join(self._model_dir(name), meta['version'])
+        model = tf.keras.models.load_model(os.path.join(version_dir, 'model.keras'))
+        with open(os.path.join(version_dir, 'scalers.pkl'), 'rb') as f:
+            scalers = pickle.load(f)
+        return dict(meta, model=model, **scalers)
+
+    def prune(self, name, keep=3):
+        """Delete all but the newest keep versions of a model"""
+        for version in self.versions(name)[:-keep]:
+            shutil.rmtree(os.path.join(self._model_dir(name), version))
@@ -0,0 +1,310 @@
+"""Near-duplicate detection for syndicated stories (MinHash + LSH)
+
+The same story often shows up on several sites with a slightly different
+headline. Each article's headline, summary and the start of its body are
+reduced to a set of normalized words (stopwords dropped, interchangeable
+headline words merged, every word cut to a short stem) and a MinHash signature.
+The signature is cut into bands and every band is hashed into a bucket stored
+in SQLite, so finding
+earlier versions of a story only looks at articles sharing a bucket instead
+of comparing against the whole history. Candidates whose estimated Jaccard
+similarity reaches the threshold join that story's cluster. Headlines also get a
+signature of their own, so a copy scraped without its summary still matches.
+The first article of a cluster is its canonical representative.
+
+Similar wording alone is not enough: two articles only join the same cluster
+when their headlines name the same tickers (entity_index.EntityMatcher) and do
+not report prices moving in opposite directions, so "Apple shares rise after
+earnings beat" and "Microsoft shares rise after earnings beat" stay apart.
+Thresholds were tuned on hand-labelled pairs (tests/near_duplicate_pairs.json).
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from article_index import url_hash
+from entity_index import EntityMatcher
+
+NEAR_DUPLICATES_PATH = os.path.join('cache', 'near_duplicates.sqlite')
+
+# 32 bands of 4 rows: pairs with Jaccard similarity above ~0.42 usually share a bucket
+NUM_PERM = 128
+BANDS = 32
+
+# Estimated Jaccard similarity at which two articles count as the same story
+THRESHOLD = 0.6
+
+# Headlines are also compared on their own, so a copy without a summary still matches the full version
+HEADLINE_THRESHOLD = 0.6
+
+# Words are cut to this many characters, a crude stemmer (jumps/jump, estimates/estimated)
+STEM_CHARS = 4
+
+# Words that say nothing about which story it is
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'after', 'by', 'for', 'from', 'in', 'is', 'it', 'its',
+    'of', 'on', 'over', 'new', 's', 'that', 'the', 'to', 'was', 'will', 'with',
+])
+
+# Interchangeable headline wording, mapped onto one spelling before stemming
+SYNONYMS = {
+    'stock': 'shares', 'stocks': 'shares', 'share': 'shares',
+    'tops': 'beats', 'top': 'beat', 'topped': 'beat',
+    'lifts': 'raises', 'lift': 'raise', 'lifted': 'raised',
+    'outlook': 'forecast', 'guidance': 'forecast',
+}
+
+# Headline words for a price move; stories moving opposite ways are never the same story
+UP_WORDS = frozenset([
+    'rise', 'rises', 'rose', 'rising', 'jump', 'jumps', 'jumped', 'gain', 'gains', 'gained',
+    'rally', 'rallies', 'rallied', 'surge', 'surges', 'surged', 'soar', 'soars', 'soared',
+    'climb', 'climbs', 'climbed', 'higher', 'up',
+])
+DOWN_WORDS = frozenset([
+    'fall', 'falls', 'fell', 'falling', 'drop', 'drops', 'dropped', 'slide', 'slides', 'slid',
+    'slump', 'slumps', 'slumped', 'sink', 'sinks', 'sank', 'plunge', 'plunges', 'plunged',
+    'tumble', 'tumbles', 'tumbled', 'decline', 'declines', 'declined', 'lower', 'down',
+])
+
+# Bump when the signature recipe or the table layout changes: articles indexed under another version are dropped
+SIGNATURE_VERSION = 3
+
+# Only the start of a body is used; syndicated copies diverge in boilerplate further down
+MAX_BODY_CHARS = 1000
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def normalize(text):
+    """Lowercase words with punctuation stripped"""
+    return ' '.join(re.findall(r'[a-z0-9]+', str(text or '').lower()))
+
+def article_text(article):
+    """Text a story is compared on: headline, summary and the start of the body"""
+    parts = [article.get('headline'), article.get('summary')]
+    body = article.get('body')
+    if isinstance(body, str):
+        parts.append(body[:MAX_BODY_CHARS])
+    return normalize(' '.join(p for p in parts if isinstance(p, str)))
+
+def words(text):
+    """Stemmed words of normalized text with stopwords dropped and synonyms merged"""
+    return [SYNONYMS.get(word, word)[:STEM_CHARS] for word in text.split() if word not in STOPWORDS]
+
+def direction(text):
+    """'up', 'down' or '' for the price move a normalized headline reports ('' for none or both)"""
+    tokens = set(text.split())
+    up, down = bool(tokens & UP_WORDS), bool(tokens & DOWN_WORDS)
+    return 'up' if up and not down else 'down' if down and not up else ''
+
+def shingles(text):
+    """32-bit hashes of the distinct words of normalized text"""
+    grams = set(words(text)) or {text}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+class MinHasher:
+    """MinHash signatures from num_perm universal hash functions applied to all shingles at once"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, np.iinfo(np.int64).max, num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, np.iinfo(np.int64).max, num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, shingle_hashes):
+        # (a * x + b) mod p, truncated to 32 bits; uint64 overflow wraps as in other MinHash implementations
+        with np.errstate(over='ignore'):
+            hashed = (self.a[:, None] * shingle_hashes[None, :] + self.b[:, None]) % _MERSENNE_PRIME
+        return (hashed & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return float(np.mean(sig_a == sig_b))
+
+class NearDuplicateIndex:
+    """Persistent MinHash-LSH index of every article seen, grouped into story clusters"""
+
+    def __init__(self, path=NEAR_DUPLICATES_PATH, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD,
+                 headline_threshold=HEADLINE_THRESHOLD, matcher=None):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.headline_threshold = headline_threshold
+        self.matcher = matcher or EntityMatcher.from_config()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SIGNATURE_VERSION:
+            # Signatures from another recipe are not comparable with new ones
+            self._conn.executescript("DROP TABLE IF EXISTS articles; DROP TABLE IF EXISTS buckets;")
+            self._conn.execute(f"PRAGMA user_version = {SIGNATURE_VERSION}")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                article_id TEXT PRIMARY KEY,
+                cluster_id TEXT,
+                signature BLOB,
+                headline_signature BLOB,
+                headline TEXT,
+                tickers TEXT,
+                direction TEXT,
+                link TEXT,
+                source TEXT,
+                first_seen REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_cluster ON articles (cluster_id);
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER,
+                article_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_buckets_bucket ON buckets (bucket);
+        """)
+        self._conn.commit()
+
+    def _buckets(self, signature, salt=0):
+        """One 63-bit key per band, with the band number (and salt) mixed in so bands never collide with each other"""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(bytes([salt, band]) + rows, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, 'big') >> 1)
+        return keys
+
+    def _best_match(self, signature, headline_signature, keys, tickers, move):
+        """(cluster_id, similarity) of the most similar stored article sharing a bucket, if above a threshold
+
+        Only articles whose headline names the same tickers and no opposite price move are considered.
+        """
+        placeholders = ','.join('?' * len(keys))
+        candidates = self._conn.execute(
+            f"SELECT a.cluster_id, a.signature, a.headline_signature, a.tickers, a.direction FROM articles a "
+            f"WHERE a.article_id IN (SELECT DISTINCT article_id FROM buckets WHERE bucket IN ({placeholders}))",
+            keys
+        ).fetchall()
+        best = (None, 0.0)
+        for cluster_id, blob, headline_blob, other_tickers, other_move in candidates:
+            if other_tickers != tickers or (move and other_move and move != other_move):
+                continue
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            headline_score = similarity(headline_signature, np.frombuffer(headline_blob, dtype=np.uint32))
+            if score >= self.threshold and score > best[1]:
+                best = (cluster_id, score)
+            if headline_score >= self.headline_threshold and headline_score > best[1]:
+                best = (cluster_id, headline_score)
+        return best
+
+    def assign(self, df, persist=True):
+        """
+        Cluster a DataFrame of articles against each other and every article indexed before
+
+        Articles with more text are placed first, so a new cluster's canonical item is its
+        most complete version; a cluster seen in an earlier run keeps its canonical item.
+
+        Parameters:
+        df (pandas.DataFrame): Articles with 'headline', 'link' and optionally 'summary'/'body'
+        persist (bool): Record the articles in the index (False only checks them)
+
+        Returns:
+        pandas.DataFrame: Copy of df with 'article_id', 'cluster_id', 'is_canonical' and 'similarity'
+        """
+        df = df.copy()
+        if df.empty:
+            for column in ['article_id', 'cluster_id', 'is_canonical', 'similarity']:
+                df[column] = []
+            return df
+
+        records = df.to_dict('records')
+        texts = [article_text(article) for article in records]
+        order = sorted(range(len(records)), key=lambda i: -len(texts[i]))
+
+        article_ids = [url_hash(article.get('link') or article.get('headline')) for article in records]
+        cluster_ids = [None] * len(records)
+        similarities = [0.0] * len(records)
+        now = time.time()
+
+        with self._lock:
+            try:
+                for i in order:
+                    known = self._conn.execute(
+                        "SELECT cluster_id FROM articles WHERE article_id = ?", (article_ids[i],)
+                    ).fetchone()
+                    if known:
+                        # Same link seen before: it stays in its cluster
+                        cluster_ids[i], similarities[i] = known[0], 1.0
+                        continue
+
+                    headline = records[i].get('headline')
+                    headline = headline if isinstance(headline, str) else ''
+                    tickers = ','.join(self.matcher.tag(headline))
+                    move = direction(normalize(headline))
+                    signature = self.hasher.signature(shingles(texts[i]))
+                    headline_signature = self.hasher.signature(shingles(normalize(headline)))
+                    keys = self._buckets(signature) + self._buckets(headline_signature, salt=1)
+                    cluster_id, score = self._best_match(signature, headline_signature, keys, tickers, move)
+                    cluster_ids[i] = cluster_id or article_ids[i]
+                    similarities[i] = score
+
+                    # Written inside the transaction, so later articles of this batch find it too
+                    article = records[i]
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (article_ids[i], cluster_ids[i], signature.tobytes(), headline_signature.tobytes(),
+                         article.get('headline'), tickers, move, article.get('link'), article.get('source'), now)
+                    )
+                    self._conn.executemany("INSERT INTO buckets VALUES (?, ?)",
+                                           [(key, article_ids[i]) for key in keys])
+            finally:
+                if persist:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+
+        df['article_id'] = article_ids
+        df['cluster_id'] = cluster_ids
+        df['is_canonical'] = [a == c for a, c in zip(article_ids, cluster_ids)]
+        df['similarity'] = similarities
+        return df
+
+    def members(self, cluster_id):
+        """Every indexed version of a story: (article_id, headline, link, source), canonical first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT article_id, headline, link, source FROM articles WHERE cluster_id = ? "
+                "ORDER BY article_id != cluster_id, first_seen",
+                (cluster_id,)
+            ).fetchall()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_near_duplicate_index = None
+_near_duplicate_index_lock = threading.Lock()
+
+def get_near_duplicate_index():
+    """Return the shared near-duplicate index, creating it on first use"""
+    global _near_duplicate_index
+    with _near_duplicate_index_lock:
+        if _near_duplicate_index is None:
+            _near_duplicate_index = NearDuplicateIndex(NEAR_DUPLICATES_PATH)
+        return _near_duplicate_index
+
+def collapse(df, index=None, persist=True):
+    """Canonical articles of df only, with their cluster columns; duplicates are only recorded in the index"""
+    if index is None:
+        index = get_near_duplicate_index()
+    assigned = index.assign(df, persist=persist)
+    return assigned[assigned['is_canonical']].copy()
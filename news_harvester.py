@@ -0,0 +1,237 @@
+"""News for a whole watchlist from yfinance Search
+
+Every ticker's yf.Search news is requested concurrently, and responses are
+cached on disk for SEARCH_TTL seconds. Links are merged across tickers, with
+each article recording the watchlist tickers whose search returned it
+(source_tickers). Only links the seen-article index has not ingested before go
+to the body extractor, which limits requests per site and overall. The result
+can be saved through the same pipeline as the scraped articles.
+
+Usage: python news_harvester.py AAPL MSFT NVDA ...   (or a file of tickers with -f)
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from article_index import url_hash
+
+NEWS_SEARCH_CACHE_PATH = os.path.join('cache', 'news_search.sqlite')
+
+# Search responses younger than this are reused instead of asking Yahoo again
+SEARCH_TTL = 15 * 60
+
+NEWS_COUNT = 10
+SEARCH_WORKERS = 16
+SEARCH_RETRIES = 3
+
+# Body fetching: requests in flight overall and per site
+BODY_WORKERS = 16
+BODY_PER_DOMAIN = 8
+
+# Yahoo hosts almost every link yf.Search returns, so it gets a tighter spacing than the extractors' default;
+# applied to this harvest's own throttle only, never to the shared one
+BODY_DOMAIN_INTERVALS = {'finance.yahoo.com': (0.2, 0.5)}
+
+def search_news(ticker, news_count=NEWS_COUNT):
+    """News items yf.Search returns for a ticker"""
+    import yfinance as yf
+    return yf.Search(ticker, news_count=news_count).news
+
+class NewsSearchCache:
+    """yf.Search news per (ticker, news_count), reused while younger than ttl"""
+
+    def __init__(self, path=NEWS_SEARCH_CACHE_PATH, ttl=SEARCH_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                ticker TEXT,
+                news_count INTEGER,
+                news TEXT,
+                fetched_at REAL,
+                PRIMARY KEY (ticker, news_count)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, ticker, news_count):
+        """Cached news for ticker if still fresh, else None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT news, fetched_at FROM searches WHERE ticker = ? AND news_count = ?",
+                (ticker, news_count)
+            ).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, ticker, news_count, news):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+                               (ticker, news_count, json.dumps(news), time.time()))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_news_search_cache = None
+_news_search_cache_lock = threading.Lock()
+
+def get_news_search_cache():
+    """Return the shared news search cache, creating it on first use"""
+    global _news_search_cache
+    with _news_search_cache_lock:
+        if _news_search_cache is None:
+            _news_search_cache = NewsSearchCache(NEWS_SEARCH_CACHE_PATH)
+        return _news_search_cache
+
+def _search_one(ticker, news_count, cache, search):
+    cached = cache.get(ticker, news_count) if cache is not False else None
+    if cached is not None:
+        return cached, True
+    for attempt in range(SEARCH_RETRIES):
+        try:
+            news = search(ticker, news_count) or []
+            break
+        except Exception as e:
+            if attempt == SEARCH_RETRIES - 1:
+                raise
+            print(f"Search for {ticker} failed ({e}), retrying...")
+            time.sleep(2 ** attempt)
+    if cache is not False:
+        cache.put(ticker, news_count, news)
+    return news, False
+
+def search_watchlist(tickers, news_count=NEWS_COUNT, workers=SEARCH_WORKERS, cache=None, search=None):
+    """
+    Run yf.Search for every ticker concurrently and merge the news by link
+
+    Parameters:
+    tickers (list): Watchlist symbols
+    news_count (int): News items requested per ticker
+    workers (int): Concurrent searches
+    cache (NewsSearchCache): Search cache (default: the shared one; False disables caching)
+    search (callable): search(ticker, news_count) -> list of news dicts (default: search_news)
+
+    Returns:
+    list: One article dict per distinct link, with the source_tickers that returned it
+    """
+    if cache is None:
+        cache = get_news_search_cache()
+    search = search or search_news
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+
+    merged = {}
+    cache_hits = 0
+    failed = []
+    scraped_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers) or 1))) as executor:
+        futures = {executor.submit(_search_one, t, news_count, cache, search): t for t in tickers}
+        results = {}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                results[ticker], hit = future.result()
+                cache_hits += hit
+            except Exception as e:
+                print(f"Search for {ticker} failed: {e}")
+                failed.append(ticker)
+
+    # Merge in watchlist order so the result does not depend on which search finished first
+    for ticker in tickers:
+        for item in results.get(ticker, []):
+            link = item.get('link')
+            if not link:
+                continue
+            key = url_hash(link)
+            article = merged.get(key)
+            if article is None:
+                published = item.get('providerPublishTime')
+                article = merged[key] = {
+                    'headline': item.get('title', ''),
+                    'summary': item.get('summary', ''),
+                    'link': link,
+                    'published_date': datetime.fromtimestamp(published).strftime("%Y-%m-%d %H:%M:%S")
+                    if published else "Unknown",
+                    'source': item.get('publisher', 'Yahoo Finance'),
+                    'scraped_date': scraped_date,
+                    'category': 'watchlist',
+                    'source_tickers': [],
+                    'related_tickers': list(item.get('relatedTickers') or []),
+                }
+            if ticker not in article['source_tickers']:
+                article['source_tickers'].append(ticker)
+
+    print(f"Searched {len(tickers)} tickers ({cache_hits} cached, {len(failed)} failed): "
+          f"{len(merged)} distinct links")
+    return list(merged.values())
+
+def harvest_watchlist(tickers, news_count=NEWS_COUNT, fetch_bodies=True, save=True, incremental=True,
+                      search_workers=SEARCH_WORKERS, body_workers=BODY_WORKERS, max_per_domain=BODY_PER_DOMAIN,
+                      cache=None, search=None):
+    """
+    Harvest news for a watchlist: concurrent searches, unseen links only, bodies fetched in bounded parallel
+
+    Parameters:
+    tickers (list): Watchlist symbols
+    fetch_bodies (bool): Extract each unseen article's body text
+    save (bool): Save through beautifulsoup.ingest_articles (dedup, sentiment, entity tags, store)
+    incremental (bool): Skip links already ingested by an earlier run
+
+    Returns:
+    pandas.DataFrame: The harvested articles (the saved ones when save=True)
+    """
+    import beautifulsoup
+
+    articles = search_watchlist(tickers, news_count, search_workers, cache, search)
+    if incremental:
+        found = len(articles)
+        articles = beautifulsoup.get_article_index().filter_new(articles)
+        print(f"{len(articles)} of {found} links are new since the last run")
+    if not articles:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(articles)
+    if fetch_bodies:
+        if beautifulsoup.COLLAPSE_NEAR_DUPLICATES:
+            # Flag syndicated copies without recording them, so only one body per story is fetched;
+            # ingest_articles assigns the clusters for good
+            df = beautifulsoup.get_near_duplicate_index().assign(df, persist=False)
+        throttle = beautifulsoup.DomainThrottle(min_interval=beautifulsoup.ARTICLE_INTERVAL,
+                                                domain_intervals=BODY_DOMAIN_INTERVALS)
+        start = time.time()
+        df = beautifulsoup.extract_article_contents(df, max_workers=body_workers, max_per_domain=max_per_domain,
+                                                    progress=False, throttle=throttle)
+        print(f"Fetched {len(df)} article bodies in {time.time() - start:.1f}s")
+
+    if save:
+        # Already limited to the watchlist, so the tech keyword filter does not apply
+        return beautifulsoup.ingest_articles(df.to_dict('records'), incremental, filter_tech=False)
+    return df
+
+def read_watchlist(path):
+    """Tickers from a text file, one per line or comma separated"""
+    with open(path) as f:
+        return [t.strip() for line in f for t in line.split(',') if t.strip() and not t.startswith('#')]
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    watchlist = read_watchlist(args[1]) if args[:1] == ['-f'] else (args or ['AAPL'])
+    harvested = harvest_watchlist(watchlist)
+    if not harvested.empty:
+        print(harvested[['source', 'headline', 'source_tickers']].head(20).to_string(index=False))
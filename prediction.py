@@ -0,0 +1,415 @@
+import numpy as np
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import LSTM, Dense, Dropout
+from tensorflow.keras.callbacks import EarlyStopping
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.metrics import mean_squared_error, mean_absolute_error
+import matplotlib.pyplot as plt
+from datetime import timedelta
+
+from price_store import get_price_store
+from indicators import add_indicators
+from lstm_windows import sliding_windows, to_tf_dataset
+from forecasting import forecast_many, feature_columns
+from model_registry import ModelRegistry
+from entity_index import get_entity_index, NEWS_COLUMNS
+from metrics import progress, span, timed
+
+# Function to download and prepare stock data
+@timed()
+def get_stock_data(ticker, period='5y', interval='1d', news=False):
+    """
+    Download stock data using yfinance
+    
+    Parameters:
+    ticker (str): Stock ticker symbol
+    period (str): Period to download ('1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max')
+    interval (str): Data interval ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo')
+    news (bool): Add daily news count and sentiment for the ticker from the entity index
+    
+    Returns:
+    pandas.DataFrame: Processed stock data
+    """
+    
+    # Served from the local price store, which only downloads bars it doesn't have yet
+    df = get_price_store().get_history(ticker, period=period, interval=interval)
+    
+    # Check if 'Close' column exists, if not try 'close' or create it from 'Adj Close'
+    if 'Close' not in df.columns:
+        if 'close' in df.columns:
+            df['Close'] = df['close']
+        elif 'Adj Close' in df.columns:
+            df['Close'] = df['Adj Close']
+        else:
+            # If there's no close column at all, we'll use the last available price column
+            price_cols = [col for col in df.columns if col in ['open', 'Open', 'high', 'High', 'low', 'Low']]
+            if price_cols:
+                df['Close'] = df[price_cols[0]]
+            else:
+                raise ValueError("Could not find a suitable price column in the data.")
+    
+    # Handle missing values safely
+    df = df.ffill()  # Forward fill instead of using fillna(method='ffill')
+    
+    # Add technical indicators (MA, RSI, MACD, ROC, Bollinger bands, ATR, volume features, momentum)
+    # computed with NumPy kernels; see indicators.py for the definitions
+    df = add_indicators(df)
+    
+    # Daily news volume and sentiment of articles mentioning the ticker (see entity_index.py)
+    if news:
+        df = get_entity_index().daily_features(df, ticker)
+    
+    # Drop NaN values
+    df = df.dropna()
+    
+    # Prepare target variable (next day's closing price)
+    df['Target'] = df['Close'].shift(-1)
+    df = df.dropna()
+    
+    return df
+
+# Function to prepare data for LSTM
+def prepare_lstm_data(data, target_col='Target', look_back=60):
+    """
+    Prepare data for LSTM model
+    
+    Parameters:
+    data (pandas.DataFrame): Input data
+    target_col (str): Target column name
+    look_back (int): Number of previous time steps to use as input features
+    
+    Returns:
+    tuple: (X_train, y_train, X_test, y_test, scaler_X, scaler_y)
+    X_train and X_test are read-only strided views into one feature buffer, not copies
+    """
+    # Identify non-feature columns safely
+    drop_cols = [col for col in ['Dividends', 'Stock Splits', 'target_col'] if col in data.columns]
+    drop_cols.append(target_col)  # Add the actual target column
+    
+    # Separate features and target
+    features = data.drop(drop_cols, axis=1, errors='ignore')
+    target = data[target_col].values.reshape(-1, 1)
+    
+    # Scale the data
+    scaler_X = MinMaxScaler(feature_range=(0, 1))
+    scaler_y = MinMaxScaler(feature_range=(0, 1))
+    
+    scaled_features = scaler_X.fit_transform(features)
+    scaled_target = scaler_y.fit_transform(target)
+    
+    # Create sequences for LSTM as windows over one contiguous buffer (no per-window copies)
+    scaled_features = np.ascontiguousarray(scaled_features, dtype=np.float32)
+    X = sliding_windows(scaled_features, look_back)
+    y = scaled_target[look_back:, 0]
+    
+    # Split the data into training and testing sets (80% train, 20% test)
+    train_size = int(len(X) * 0.8)
+    X_train, X_test = X[:train_size], X[train_size:]
+    y_train, y_test = y[:train_size], y[train_size:]
+    
+    return X_train, y_train, X_test, y_test, scaler_X, scaler_y
+
+# Function to build LSTM model
+def build_lstm_model(input_shape, units=50, dropout=0.2):
+    """
+    Build an LSTM model for time series prediction
+    
+    Parameters:
+    input_shape (tuple): Shape of input data (look_back, n_features)
+    units (int): Units in each LSTM layer
+    dropout (float): Dropout rate after each LSTM layer
+    
+    Returns:
+    tensorflow.keras.models.Sequential: Compiled LSTM model
+    """
+    model = Sequential()
+    
+    # First LSTM layer with return sequences
+    model.add(LSTM(units=units, return_sequences=True, input_shape=input_shape))
+    model.add(Dropout(dropout))
+    
+    # Second LSTM layer
+    model.add(LSTM(units=units, return_sequences=False))
+    model.add(Dropout(dropout))
+    
+    # Dense layers
+    model.add(Dense(units=25))
+    model.add(Dense(units=1))
+    
+    # Compile the model
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    
+    return model
+
+# Function to train the model
+@timed()
+def train_model(model, X_train, y_train, X_test, y_test, epochs=50, batch_size=32, verbose=1):
+    """
+    Train the LSTM model
+    
+    Parameters:
+    model (tensorflow.keras.models.Sequential): LSTM model
+    X_train, y_train, X_test, y_test: Training and testing data
+    epochs (int): Number of epochs
+    batch_size (int): Batch size
+    verbose (int): Keras progress output (0 = silent)
+    
+    Returns:
+    tensorflow.keras.models.Sequential: Trained model
+    """
+    # Early stopping to prevent overfitting
+    early_stop = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
+    
+    # Train the model, feeding batches lazily from the window views
+    history = model.fit(
+        to_tf_dataset(X_train, y_train, batch_size=batch_size, shuffle=True),
+        epochs=epochs,
+        validation_data=to_tf_dataset(X_test, y_test, batch_size=batch_size),
+        callbacks=[early_stop],
+        verbose=verbose
+    )
+    
+    return model, history
+
+# Function to make predictions
+def make_predictions(model, X_test, scaler_y, verbose='auto'):
+    """
+    Make predictions using the trained model
+    
+    Parameters:
+    model (tensorflow.keras.models.Sequential): Trained LSTM model
+    X_test: Test data
+    scaler_y: Scaler for target variable
+    verbose: Keras progress output (0 = silent)
+    
+    Returns:
+    numpy.ndarray: Predicted values
+    """
+    # Make predictions
+    with span('model_predict'):
+        predictions = model.predict(to_tf_dataset(X_test, batch_size=256), verbose=verbose)
+    
+    # Inverse transform the predictions
+    predictions = scaler_y.inverse_transform(predictions.reshape(-1, 1))
+    
+    return predictions
+
+# Function to evaluate the model
+def evaluate_model(y_test, predictions, scaler_y):
+    """
+    Evaluate the model performance
+    
+    Parameters:
+    y_test: Actual test values
+    predictions: Predicted values
+    scaler_y: Scaler for target variable
+    
+    Returns:
+    dict: Dictionary of evaluation metrics
+    """
+    # Inverse transform the actual values
+    y_test_inv = scaler_y.inverse_transform(y_test.reshape(-1, 1))
+    
+    # Calculate metrics
+    mse = mean_squared_error(y_test_inv, predictions)
+    rmse = np.sqrt(mse)
+    mae = mean_absolute_error(y_test_inv, predictions)
+    
+    # Percentage deviation
+    deviation = np.abs(y_test_inv - predictions) / y_test_inv * 100
+    mean_deviation = np.mean(deviation)
+    
+    # Direction accuracy (up/down)
+    direction_actual = np.diff(y_test_inv.flatten())
+    direction_pred = np.diff(predictions.flatten())
+    direction_accuracy = np.mean((direction_actual > 0) == (direction_pred > 0)) * 100
+    
+    return {
+        'MSE': mse,
+        'RMSE': rmse,
+        'MAE': mae,
+        'Mean Percentage Deviation': mean_deviation,
+        'Direction Accuracy': direction_accuracy
+    }
+
+# Function to plot results
+def plot_predictions(y_test, predictions, scaler_y, ticker):
+    """
+    Plot actual vs predicted values
+    
+    Parameters:
+    y_test: Actual test values
+    predictions: Predicted values
+    scaler_y: Scaler for target variable
+    ticker: Stock ticker symbol
+    """
+    # Inverse transform the actual values
+    y_test_inv = scaler_y.inverse_transform(y_test.reshape(-1, 1))
+    
+    plt.figure(figsize=(12, 6))
+    plt.plot(y_test_inv, label='Actual Prices')
+    plt.plot(predictions, label='Predicted Prices')
+    plt.title(f'{ticker} Stock Price Prediction')
+    plt.xlabel('Time')
+    plt.ylabel('Price')
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+# Function to forecast future prices
+def forecast_future(model, data, scaler_X, scaler_y, look_back, days_ahead=5):
+    """
+    Forecast future stock prices
+    
+    Parameters:
+    model (tensorflow.keras.models.Sequential): Trained LSTM model
+    data (pandas.DataFrame): Input data
+    scaler_X: Scaler for features
+    scaler_y: Scaler for target variable
+    look_back (int): Number of previous time steps used as input features
+    days_ahead (int): Number of days to forecast ahead
+    
+    Returns:
+    numpy.ndarray: Forecasted prices
+    """
+    # Roll the window forward with one compiled model call per day (see forecasting.py).
+    # Predicted days only carry the predicted close price since we don't have the other features.
+    return forecast_many(model, {'ticker': data}, {'ticker': (scaler_X, scaler_y)}, look_back, days_ahead)['ticker']
+
+# Main function to run the entire pipeline
+def stock_prediction_pipeline(ticker, period='2y', interval='1d', look_back=60, forecast_days=3,
+                              register=True, registry=None, epochs=50, plot=True, verbose=1, news=False):
+    """
+    Run the entire stock prediction pipeline
+    
+    Parameters:
+    ticker (str): Stock ticker symbol
+    period (str): Period of historical data
+    interval (str): Interval of data
+    look_back (int): Number of previous time steps to use
+    forecast_days (int): Number of days to forecast ahead
+    register (bool): Save the trained model and its scalers to the model registry
+    registry (ModelRegistry): Registry to save to (default: models/)
+    epochs (int): Maximum number of training epochs
+    plot (bool): Show the actual vs predicted plot (plt.show() blocks, so batch runs pass False)
+    verbose (int): Keras progress output (0 = silent)
+    news (bool): Use daily news count and sentiment as extra features
+    
+    Returns:
+    dict: Dictionary containing model, evaluation metrics, and forecast
+    """
+    progress(f"Starting prediction pipeline for {ticker}...")
+    
+    # Get data
+    progress("Downloading and preparing stock data...")
+    data = get_stock_data(ticker, period, interval, news=news)
+    progress(f"Downloaded {len(data)} data points")
+    
+    # Prepare data
+    progress("Preparing LSTM data...")
+    X_train, y_train, X_test, y_test, scaler_X, scaler_y = prepare_lstm_data(data, look_back=look_back)
+    progress(f"Training data shape: {X_train.shape}, Testing data shape: {X_test.shape}")
+    
+    # Build and train model
+    progress("Building and training LSTM model...")
+    input_shape = (X_train.shape[1], X_train.shape[2])
+    model = build_lstm_model(input_shape)
+    model, history = train_model(model, X_train, y_train, X_test, y_test, epochs=epochs, verbose=verbose)
+    
+    # Make predictions
+    progress("Making predictions...")
+    predictions = make_predictions(model, X_test, scaler_y)
+    
+    # Evaluate model
+    progress("Evaluating model performance...")
+    metrics = evaluate_model(y_test, predictions, scaler_y)
+    for metric, value in metrics.items():
+        print(f"{metric}: {value}")
+    
+    # Plot results
+    if plot:
+        plot_predictions(y_test, predictions, scaler_y, ticker)
+    
+    # Forecast future prices
+    progress(f"Forecasting prices for next {forecast_days} days...")
+    forecast = forecast_future(model, data, scaler_X, scaler_y, look_back, forecast_days)
+    
+    # Get the last closing price
+    last_price = data['Close'].iloc[-1]
+    
+    # Calculate the date range for the forecast
+    date_range = forecast_dates(data.index[-1], forecast_days)
+    
+    # Display forecast
+    print_forecast(date_range, forecast, last_price)
+    
+    # Save the model with its scalers so later forecasts don't need to retrain
+    model_version = None
+    if register:
+        registry = registry or ModelRegistry()
+        model_version = registry.save(ticker, model, scaler_X, scaler_y, look_back, feature_columns(data),
+                                      metrics=metrics, interval=interval)
+        print(f"Registered {ticker} model {model_version}")
+    
+    return {
+        'model': model,
+        'metrics': metrics,
+        'forecast': forecast,
+        'forecast_dates': date_range,
+        'data': data,
+        'last_price': last_price,
+        'model_version': model_version
+    }
+
+# Function to forecast with an already trained model
+def forecast_from_registry(ticker, forecast_days=3, period='1y', interval=None, registry=None):
+    """
+    Forecast future prices with the latest registered model for a ticker, without retraining
+    
+    Parameters:
+    ticker (str): Stock ticker symbol
+    forecast_days (int): Number of days to forecast ahead
+    period (str): Period of recent history to build features from (must cover look_back plus indicator warm-up)
+    interval (str): Interval of data (default: the interval the model was trained on)
+    registry (ModelRegistry): Registry to load from (default: models/)
+    
+    Returns:
+    dict: Dictionary containing forecast, forecast dates, last price and model version
+    """
+    registry = registry or ModelRegistry()
+    entry = registry.load(ticker)
+    interval = interval or entry.get('interval', '1d')
+    # Rebuild the news features if the model was trained with them
+    news = any(column in NEWS_COLUMNS for column in entry['feature_columns'])
+    data = get_stock_data(ticker, period, interval, news=news)
+    
+    forecast = forecast_future(entry['model'], data, entry['scaler_X'], entry['scaler_y'],
+                               entry['look_back'], forecast_days)
+    last_price = data['Close'].iloc[-1]
+    date_range = forecast_dates(data.index[-1], forecast_days)
+    print_forecast(date_range, forecast, last_price)
+    
+    return {
+        'forecast': forecast,
+        'forecast_dates': date_range,
+        'last_price': last_price,
+        'model_version': entry['version']
+    }
+
+def forecast_dates(last_date, forecast_days):
+    """Dates of the forecast days after last_date, skipping weekends"""
+    date_range = []
+    next_date = last_date
+    for i in range(forecast_days):
+        # Step from the previous forecast day so a weekend never maps two forecasts onto the same Monday
+        next_date = next_date + timedelta(days=1)
+        while next_date.weekday() > 4:  # Skip Saturday (5) and Sunday (6)
+            next_date = next_date + timedelta(days=1)
+        date_range.append(next_date)
+    return date_range
+
+def print_forecast(date_range, forecast, last_price):
+    print("\nForecasted Prices:")
+    for i, (date, price) in enumerate(zip(date_range, forecast)):
+        change = (price[0] - last_price) / last_price * 100 if i == 0 else (price[0] - forecast[i-1][0]) / forecast[i-1][0] * 100
+        print(f"{date.strftime('%Y-%m-%d')}: ${price[0]:.2f} (Change: {change:.2f}%)")
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Relative tolerance when checking that re-downloaded bars still match the stored ones
+ADJUSTMENT_TOLERANCE = 1e-4
+
+# yfinance period strings, a count and a unit ('60d', '2wk', '3mo', '10y'), as offsets back from today
+PERIOD_PATTERN = re.compile(r'^(\d+)(d|wk|mo|y)$')
+PERIOD_UNITS = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+
+class YFinanceProvider:
+    """Price provider backed by yfinance (the default)"""
+
+    def history(self, ticker, interval='1d', start=None, end=None, period=None):
+        import yfinance as yf
+        stock = yf.Ticker(ticker)
+        if start is not None:
+            return stock.history(start=start, end=end, interval=interval, auto_adjust=True)
+        return stock.history(period=period or 'max', interval=interval, auto_adjust=True)
+
+class StaticProvider:
+    """Price provider serving fixed DataFrames, for tests and offline replays
+
+    frames maps ticker -> OHLCV DataFrame indexed by timestamp.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = []
+
+    def history(self, ticker, interval='1d', start=None, end=None, period=None):
+        self.calls.append((ticker, interval, start, end, period))
+        df = self.frames.get(ticker, pd.DataFrame())
+        if df.empty:
+            return df
+        if start is not None:
+            df = df[df.index >= _as_index_time(start, df.index)]
+        if end is not None:
+            df = df[df.index < _as_index_time(end, df.index)]
+        return df.copy()
+
+def _as_index_time(value, index):
+    """Convert a date to a Timestamp comparable with a (possibly tz-aware) index"""
+    value = pd.Timestamp(value)
+    if index.tz is not None and value.tz is None:
+        value = value.tz_localize(index.tz)
+    elif index.tz is None and value.tz is not None:
+        value = value.tz_localize(None)
+    return value
+
+class PriceStore:
+    """Local OHLCV cache per ticker and interval that only downloads the missing tail
+
+    Bars are kept in <root>/<interval>/<TICKER>.parquet. On each request the
+    store only downloads bars from the end of what it holds, overlapping the
+    last stored bars. If an overlapping bar no longer matches, or the new bars
+    contain a split or dividend, the adjusted history has changed and the
+    ticker is downloaded again in full.
+
+    A <TICKER>.json file next to the bars records whether they reach back to
+    the provider's first bar, so a 'max' request after a shorter one knows to
+    download the full history.
+    """
+
+    def __init__(self, root=os.path.join('data', 'prices'), provider=None, offline=False):
+        self.root = root
+        self.provider = provider or YFinanceProvider()
+        self.offline = offline
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker.upper()}.parquet")
+
+    def _meta_path(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker.upper()}.json")
+
+    def _from_first_bar(self, ticker, interval):
+        """True when the stored bars start at the provider's first bar"""
+        try:
+            with open(self._meta_path(ticker, interval), encoding='utf-8') as f:
+                return bool(json.load(f).get('from_first_bar'))
+        except (OSError, ValueError):
+            return False
+
+    def _lock(self, ticker, interval):
+        with self._locks_lock:
+            return self._locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+    def load(self, ticker, interval='1d'):
+        """Stored bars for a ticker, or an empty DataFrame"""
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_parquet(path)
+
+    def _save(self, ticker, interval, df, from_first_bar=None):
+        """Write the bars; from_first_bar=None keeps what is recorded for the stored history"""
+        path = self._path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        if from_first_bar is not None:
+            meta_path = self._meta_path(ticker, interval)
+            with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'from_first_bar': from_first_bar}, f)
+            os.replace(meta_path + '.tmp', meta_path)
+
+    def get_history(self, ticker, period='5y', interval='1d', start=None, end=None):
+        """Bars for ticker over a yfinance-style period (or start/end dates), served from the local store
+
+        Parameters:
+        ticker (str): Stock ticker symbol
+        period (str): Period to return ('1mo', '1y', '5y', 'ytd', 'max', ...); ignored when start is given
+        interval (str): Bar interval ('1m', '5m', '1h', '1d', ...)
+        start, end (str or datetime): Optional explicit date range, end exclusive
+
+        Returns:
+        pandas.DataFrame: OHLCV bars indexed by timestamp
+        """
+        with self._lock(ticker, interval):
+            stored = self.load(ticker, interval)
+            if not self.offline:
+                stored = self._update(ticker, interval, stored, period, start)
+
+        if stored.empty:
+            return stored
+        window_start = start if start is not None else _period_start(period, stored.index)
+        if window_start is not None:
+            stored = stored[stored.index >= _as_index_time(window_start, stored.index)]
+        if end is not None:
+            stored = stored[stored.index < _as_index_time(end, stored.index)]
+        return stored.copy()
+
+    def _update(self, ticker, interval, stored, period, start):
+        wanted_start = start if start is not None else _period_start(period, stored.index if not stored.empty else None)
+
+        from_first_bar = not stored.empty and self._from_first_bar(ticker, interval)
+        if stored.empty:
+            reaches_back = False
+        elif from_first_bar:
+            reaches_back = True
+        elif wanted_start is None:
+            # 'max' after a shorter period: the stored bars may not start at the first one
+            reaches_back = False
+        else:
+            reaches_back = stored.index[0] <= _as_index_time(wanted_start, stored.index) + pd.Timedelta(days=5)
+
+        # Nothing stored yet, or not far enough back: download the whole window
+        if not reaches_back:
+            return self._full_download(ticker, interval, period, start)
+
+        # Download from the second-to-last stored bar; the overlap lets us detect re-adjustment
+        overlap_start = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+        tail = self.provider.history(ticker, interval=interval, start=overlap_start)
+        if tail.empty:
+            return stored
+
+        if self._adjusted_since(stored, tail):
+            print(f"{ticker}: split or dividend adjusted history, downloading it again")
+            if from_first_bar:
+                return self._full_download(ticker, interval, 'max', None)
+            # Keep at least as much history as was stored before
+            refetch_start = stored.index[0]
+            if wanted_start is not None:
+                refetch_start = min(refetch_start, _as_index_time(wanted_start, stored.index))
+            return self._full_download(ticker, interval, period, refetch_start)
+
+        new_bars = tail[tail.index > stored.index[-1]]
+        # The last stored bar may have been incomplete (e.g. downloaded intraday), so take the fresh copy
+        merged = pd.concat([stored.iloc[:-1], tail[tail.index >= stored.index[-1]]])
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        if len(new_bars) or not merged.iloc[-1:].equals(stored.iloc[-1:]):
+            self._save(ticker, interval, merged)
+            print(f"{ticker}: stored {len(new_bars)} new {interval} bars")
+        return merged
+
+    def _full_download(self, ticker, interval, period, start):
+        if start is not None:
+            df = self.provider.history(ticker, interval=interval, start=start)
+        else:
+            df = self.provider.history(ticker, interval=interval, period=period)
+        if not df.empty:
+            wanted_start = start if start is not None else _period_start(period, df.index)
+            # A 'max' download starts at the first bar, and so does one that came back
+            # shorter than asked for because the ticker has no older bars
+            from_first_bar = wanted_start is None or (
+                df.index[0] > _as_index_time(wanted_start, df.index) + pd.Timedelta(days=5))
+            self._save(ticker, interval, df, from_first_bar)
+            print(f"{ticker}: stored {len(df)} {interval} bars")
+        return df
+
+    @staticmethod
+    def _adjusted_since(stored, tail):
+        """True when the downloaded bars show that the stored adjusted prices are stale"""
+        new_bars = tail[tail.index > stored.index[-1]]
+        for column in ('Dividends', 'Stock Splits'):
+            if column in new_bars.columns and (new_bars[column] != 0).any():
+                return True
+        overlap = tail.index.intersection(stored.index)
+        if len(overlap) == 0 or 'Close' not in tail.columns:
+            return False
+        # Compare the bar before the last stored one when available; the last may still be forming
+        check = overlap[:-1] if len(overlap) > 1 else overlap
+        old = stored.loc[check, 'Close'].to_numpy(dtype=float)
+        new = tail.loc[check, 'Close'].to_numpy(dtype=float)
+        return not np.allclose(old, new, rtol=ADJUSTMENT_TOLERANCE)
+
+    def invalidate(self, ticker, interval='1d'):
+        """Drop the stored bars for a ticker so the next request downloads them again"""
+        for path in (self._path(ticker, interval), self._meta_path(ticker, interval)):
+            if os.path.exists(path):
+                os.remove(path)
+
+def _period_start(period, index=None):
+    """Start timestamp for a yfinance period string, or None for 'max'"""
+    if period in (None, 'max'):
+        return None
+    now = pd.Timestamp.now(tz=index.tz if index is not None else None).normalize()
+    if period == 'ytd':
+        return now.replace(month=1, day=1)
+    match = PERIOD_PATTERN.match(str(period))
+    if match is None:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = match.groups()
+    return now - pd.DateOffset(**{PERIOD_UNITS[unit]: int(count)})
+
+_default_store = None
+
+def get_price_store():
+    """Shared price store used by get_stock_data"""
+    global _default_store
+    if _default_store is None:
+        _default_store = PriceStore()
+    return _default_store
+
+def set_price_store(store):
+    """Replace the shared store, e.g. with one using a StaticProvider in tests"""
+    global _default_store
+    _default_store = store
@@ -0,0 +1,243 @@
+"""Sentiment scoring of scraped articles in bulk
+
+Headlines, summaries and bodies of a whole batch of articles are scored in one
+job. Each distinct text is scored once, texts scored before come from a SQLite
+cache keyed by content hash and scorer, and the remaining texts are split into
+chunks scored in parallel processes. Scores are added to the DataFrame as
+<field>_polarity / <field>_subjectivity plus overall polarity / subjectivity
+columns, which the article store keeps like any other column.
+
+Usage: python sentiment.py [YYYY-MM-DD]   (scores that day's stored articles)
+"""
+import hashlib
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SENTIMENT_CACHE_PATH = os.path.join('cache', 'sentiment.sqlite')
+
+# Article fields scored, in order of preference for the overall score
+SCORED_FIELDS = ['body', 'summary', 'headline']
+
+# Fewer texts than this are scored in-process; starting workers would cost more than it saves
+MIN_PARALLEL_TEXTS = 1000
+
+class TextBlobScorer:
+    """Pattern-lexicon polarity (-1..1) and subjectivity (0..1) from TextBlob, the scorer webscraped.ipynb uses"""
+
+    name = 'textblob'
+
+    def score_batch(self, texts):
+        from textblob import TextBlob
+        scores = []
+        for text in texts:
+            sentiment = TextBlob(text).sentiment
+            scores.append((sentiment.polarity, sentiment.subjectivity))
+        return scores
+
+class VaderScorer:
+    """VADER compound polarity (-1..1), tuned for short social/news text; it has no subjectivity score"""
+
+    name = 'vader'
+
+    def score_batch(self, texts):
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        analyzer = SentimentIntensityAnalyzer()
+        return [(analyzer.polarity_scores(text)['compound'], float('nan')) for text in texts]
+
+SCORERS = {'textblob': TextBlobScorer, 'vader': VaderScorer}
+
+def get_scorer(scorer=None):
+    """A scorer instance from a name in SCORERS, an instance (anything with name and score_batch), or the default"""
+    if scorer is None:
+        return TextBlobScorer()
+    if isinstance(scorer, str):
+        return SCORERS[scorer]()
+    return scorer
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', str(text)).strip()
+
+def content_hash(text):
+    """Hash of a text with whitespace normalized, the cache key for its scores"""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+class SentimentCache:
+    """Persistent scores per (content hash, scorer)"""
+
+    def __init__(self, path=SENTIMENT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                content_hash TEXT,
+                scorer TEXT,
+                polarity REAL,
+                subjectivity REAL,
+                PRIMARY KEY (content_hash, scorer)
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, hashes, scorer):
+        """Cached (polarity, subjectivity) for every hash that has been scored by scorer"""
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            # Stay under SQLite's limit on bound parameters
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT content_hash, polarity, subjectivity FROM scores "
+                    f"WHERE scorer = ? AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [scorer] + chunk
+                ).fetchall()
+                for content_hash, polarity, subjectivity in rows:
+                    found[content_hash] = (polarity, subjectivity if subjectivity is not None else float('nan'))
+        return found
+
+    def put_many(self, scores, scorer):
+        """Store scores, a dict of hash -> (polarity, subjectivity)"""
+        rows = [(h, scorer, float(p), None if np.isnan(s) else float(s)) for h, (p, s) in scores.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_sentiment_cache = None
+_sentiment_cache_lock = threading.Lock()
+
+def get_sentiment_cache():
+    """Return the shared sentiment cache, creating it on first use"""
+    global _sentiment_cache
+    with _sentiment_cache_lock:
+        if _sentiment_cache is None:
+            _sentiment_cache = SentimentCache(SENTIMENT_CACHE_PATH)
+        return _sentiment_cache
+
+def _score_chunk(scorer, texts):
+    return scorer.score_batch(texts)
+
+def score_texts(texts, scorer=None, cache=None, workers=None, chunk_size=100):
+    """
+    Score many texts, reusing cached scores and scoring the rest in parallel
+
+    Parameters:
+    texts (list): Texts to score; None or blank texts get NaN
+    scorer: Scorer name, instance or None for TextBlob
+    cache (SentimentCache): Score cache (default: the shared one; False disables caching)
+    workers (int): Worker processes for uncached texts (default: CPU count)
+    chunk_size (int): Texts per worker task
+
+    Returns:
+    tuple: (polarity, subjectivity) numpy arrays aligned with texts
+    """
+    scorer = get_scorer(scorer)
+    if cache is None:
+        cache = get_sentiment_cache()
+
+    # Score each distinct text once
+    hashes = [content_hash(t) if t is not None and normalize_text(t) else None for t in texts]
+    unique = {}
+    for text, h in zip(texts, hashes):
+        if h is not None and h not in unique:
+            unique[h] = normalize_text(text)
+
+    scores = cache.get_many(unique, scorer.name) if cache is not False else {}
+    missing = [h for h in unique if h not in scores]
+
+    if missing:
+        batch = [unique[h] for h in missing]
+        chunks = [batch[i:i + chunk_size] for i in range(0, len(batch), chunk_size)]
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        if len(batch) < MIN_PARALLEL_TEXTS or workers == 1:
+            results = scorer.score_batch(batch)
+        else:
+            # spawn: the scraper may still have threads running, which fork does not handle safely
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                results = [score for chunk in pool.map(_score_chunk, [scorer] * len(chunks), chunks)
+                           for score in chunk]
+        new_scores = dict(zip(missing, results))
+        if cache is not False:
+            cache.put_many(new_scores, scorer.name)
+        scores.update(new_scores)
+
+    polarity = np.array([scores[h][0] if h is not None else np.nan for h in hashes], dtype=float)
+    subjectivity = np.array([scores[h][1] if h is not None else np.nan for h in hashes], dtype=float)
+    return polarity, subjectivity
+
+def score_articles(df, fields=None, scorer=None, cache=None, workers=None):
+    """
+    Add sentiment columns to a DataFrame of articles
+
+    Every field present (body, summary, headline by default) gets <field>_polarity and
+    <field>_subjectivity. polarity / subjectivity take the first scored field in that
+    order, so an article is rated on its body when one was extracted.
+
+    Returns:
+    pandas.DataFrame: Copy of df with the score columns
+    """
+    df = df.copy()
+    fields = [f for f in (fields or SCORED_FIELDS) if f in df.columns]
+    if df.empty or not fields:
+        return df
+
+    # All fields of all articles go through one scoring job
+    texts = []
+    for field in fields:
+        texts.extend(None if not isinstance(v, str) else v for v in df[field])
+    polarity, subjectivity = score_texts(texts, scorer, cache, workers)
+
+    n = len(df)
+    overall_polarity = np.full(n, np.nan)
+    overall_subjectivity = np.full(n, np.nan)
+    for i, field in enumerate(fields):
+        field_polarity = polarity[i * n:(i + 1) * n]
+        field_subjectivity = subjectivity[i * n:(i + 1) * n]
+        df[f'{field}_polarity'] = field_polarity
+        df[f'{field}_subjectivity'] = field_subjectivity
+
+        unset = np.isnan(overall_polarity) & ~np.isnan(field_polarity)
+        overall_polarity[unset] = field_polarity[unset]
+        overall_subjectivity[unset] = field_subjectivity[unset]
+
+    df['polarity'] = overall_polarity
+    df['subjectivity'] = overall_subjectivity
+    return df
+
+def score_stored_day(date, store=None, scorer=None, workers=None):
+    """Score one day of stored articles and rewrite that day's partition with the score columns"""
+    from article_store import ArticleStore
+
+    store = store or ArticleStore()
+    df = store.read(start_date=date, end_date=date)
+    if df.empty:
+        print(f"No stored articles for {date}")
+        return df
+    df = score_articles(df, scorer=scorer, workers=workers)
+    store.replace_day(date, df)
+    print(f"Scored {len(df)} articles for {date}")
+    return df
+
+if __name__ == "__main__":
+    from datetime import date
+    day = sys.argv[1] if len(sys.argv) > 1 else date.today().isoformat()
+    scored = score_stored_day(day)
+    if not scored.empty:
+        print(scored[['source', 'headline', 'polarity', 'subjectivity']].to_string(index=False))
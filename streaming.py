@@ -0,0 +1,278 @@
+"""Streaming mode: one prediction per new bar from incremental features
+
+Batch runs rebuild every indicator and window from the whole history. Here a
+StreamingPredictor is primed once with recent history and then, for each bar a
+source delivers, advances the IndicatorEngine by one bar, scales that single
+feature row, shifts it into a fixed-size window buffer and runs the compiled
+model on it. The work and memory per bar don't depend on how long the stream
+has been running, and each prediction carries its own latency. Models trained
+with news features get the ticker's daily news count and sentiment for the
+bar's day from the entity index.
+
+Usage: python streaming.py TICKER [replay.csv|replay.parquet] [interval]
+"""
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from entity_index import get_entity_index, NEWS_COLUMNS
+from forecasting import compiled_predict
+from indicators import IndicatorEngine, INDICATOR_COLUMNS, MAX_WINDOW
+from model_registry import ModelRegistry
+from price_store import get_price_store
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# The current day's news aggregates are re-read at most this often, not on every bar
+NEWS_REFRESH_SECONDS = 300
+
+class ReplayBarSource:
+    """Bars replayed from a CSV/Parquet file or a DataFrame of OHLCV rows indexed by timestamp
+
+    speed paces the replay: None replays as fast as possible, 1.0 in real time,
+    60 at sixty times real time.
+    """
+
+    def __init__(self, bars, speed=None):
+        if isinstance(bars, str):
+            if bars.endswith('.parquet'):
+                bars = pd.read_parquet(bars)
+            else:
+                bars = pd.read_csv(bars, index_col=0, parse_dates=True)
+        self.bars = bars
+        self.speed = speed
+
+    def __iter__(self):
+        previous = None
+        for row in self.bars[PRICE_COLUMNS].itertuples():
+            timestamp = row[0]
+            if self.speed and previous is not None:
+                time.sleep(max(0.0, (timestamp - previous).total_seconds() / self.speed))
+            previous = timestamp
+            yield timestamp, dict(zip(PRICE_COLUMNS, row[1:]))
+
+class PollingBarSource:
+    """Completed bars from the price store, polled every poll_seconds
+
+    The newest bar of an intraday download is still forming, so a bar is only
+    emitted once a later one exists.
+    """
+
+    def __init__(self, ticker, interval='1m', poll_seconds=30, store=None, since=None):
+        self.ticker = ticker
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+        self.store = store or get_price_store()
+        self.last_timestamp = since
+
+    def __iter__(self):
+        while True:
+            bars = self.store.get_history(self.ticker, period='1d', interval=self.interval)
+            completed = bars.iloc[:-1]
+            if self.last_timestamp is not None:
+                completed = completed[completed.index > self.last_timestamp]
+            for row in completed[PRICE_COLUMNS].itertuples():
+                self.last_timestamp = row[0]
+                yield row[0], dict(zip(PRICE_COLUMNS, row[1:]))
+            time.sleep(self.poll_seconds)
+
+class LatencyStats:
+    """Per-bar latencies over the last window bars"""
+
+    def __init__(self, window=10000):
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        ms = np.array(self.samples) * 1000
+        return {
+            'bars': len(ms),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)),
+            'max_ms': float(ms.max()),
+        }
+
+class StreamingPredictor:
+    """Incremental features, scaled window and next-bar prediction for one ticker"""
+
+    def __init__(self, model, scaler_X, scaler_y, look_back, feature_columns, predict_fn=None, ticker=None,
+                 entity_index=None):
+        known = set(PRICE_COLUMNS) | set(INDICATOR_COLUMNS) | set(NEWS_COLUMNS)
+        unknown = [c for c in feature_columns if c not in known]
+        if unknown:
+            raise ValueError(f"Cannot compute features incrementally: {unknown}")
+        self.uses_news = any(c in NEWS_COLUMNS for c in feature_columns)
+        if self.uses_news and ticker is None:
+            raise ValueError("A model trained with news features needs the ticker to look its news up")
+        self.ticker = ticker
+        self.entity_index = (entity_index or get_entity_index()) if self.uses_news else None
+        self._news_day = None
+        self._news_checked = 0.0
+        self._news = None
+        self.model = model
+        self.look_back = look_back
+        self.feature_columns = list(feature_columns)
+        self.predict_fn = predict_fn or compiled_predict(model)
+        self.engine = IndicatorEngine()
+
+        # MinMaxScaler.transform is x * scale_ + min_; applying it directly skips sklearn's per-call checks
+        self.x_scale = scaler_X.scale_.astype(np.float32)
+        self.x_min = scaler_X.min_.astype(np.float32)
+        self.y_scale = float(scaler_y.scale_[0])
+        self.y_min = float(scaler_y.min_[0])
+
+        # Rows are appended until the buffer is full, then the last look_back - 1 rows move to the
+        # front, so the current window is always one contiguous slice of a fixed-size buffer
+        self._buffer = np.zeros((2 * look_back, len(self.feature_columns)), dtype=np.float32)
+        self._end = 0
+        self.latency = LatencyStats()
+
+    @classmethod
+    def from_registry(cls, ticker, registry=None, interval=None):
+        """Predictor for the latest registered model of a ticker"""
+        entry = (registry or ModelRegistry()).load(ticker)
+        trained_on = entry.get('interval', '1d')
+        if interval is not None and interval != trained_on:
+            print(f"Warning: {ticker} model {entry['version']} was trained on {trained_on} bars, "
+                  f"streaming {interval} bars")
+        return cls(entry['model'], entry['scaler_X'], entry['scaler_y'], entry['look_back'],
+                   entry['feature_columns'], ticker=ticker)
+
+    def _rows(self, bars, indicators, news=None):
+        """Feature rows in training column order from price, indicator and news arrays"""
+        columns = []
+        for name in self.feature_columns:
+            if name in PRICE_COLUMNS:
+                source = bars
+            elif name in INDICATOR_COLUMNS:
+                source = indicators
+            else:
+                source = news
+            columns.append(np.asarray(source[name], dtype=np.float32).reshape(-1))
+        return np.stack(columns, axis=1)
+
+    def _news_values(self, timestamp):
+        """News count and sentiment of the ticker on the bar's day, as daily_features() builds them for training"""
+        day = pd.Timestamp(timestamp).strftime('%Y-%m-%d') if timestamp is not None else time.strftime('%Y-%m-%d')
+        now = time.monotonic()
+        if day != self._news_day or now - self._news_checked >= NEWS_REFRESH_SECONDS:
+            aggregates = self.entity_index.daily_aggregates([self.ticker], day, day)
+            self._news = {name: float(aggregates[name].iloc[0]) if not aggregates.empty else 0.0
+                          for name in NEWS_COLUMNS}
+            self._news_day = day
+            self._news_checked = now
+        return self._news
+
+    def _push(self, row):
+        if self._end == len(self._buffer):
+            keep = self.look_back - 1
+            self._buffer[:keep] = self._buffer[self._end - keep:self._end]
+            self._end = keep
+        self._buffer[self._end] = row
+        self._end += 1
+
+    def warm_up(self, history):
+        """Prime the indicators and the window from an OHLCV DataFrame of recent bars"""
+        history = history.ffill()
+        bars = {name: history[name].to_numpy(dtype=float) if name in history.columns else np.zeros(len(history))
+                for name in PRICE_COLUMNS}
+        indicators = self.engine.fit(bars['Close'], bars['High'], bars['Low'], bars['Volume'])
+        news = None
+        if self.uses_news:
+            with_news = self.entity_index.daily_features(history, self.ticker)
+            news = {name: with_news[name].to_numpy(dtype=float) for name in NEWS_COLUMNS}
+        rows = self._rows(bars, {name: values[:, 0] for name, values in indicators.items()}, news)
+
+        tail = rows[-self.look_back:]
+        if len(tail) < self.look_back or np.isnan(tail).any():
+            raise ValueError(f"Need at least {MAX_WINDOW + self.look_back} bars of history to warm up, "
+                             f"got {len(history)}")
+        self._end = 0
+        for row in tail * self.x_scale + self.x_min:
+            self._push(row)
+
+        # Trace the compiled model now so the first streamed bar doesn't pay for it
+        self.predict_fn(self._buffer[None, self._end - self.look_back:self._end])
+        return self
+
+    def update(self, bar, timestamp=None):
+        """Add one bar (dict with Open/High/Low/Close/Volume) and return the predicted next close
+
+        timestamp picks the day whose news a news model sees (default: today).
+        """
+        start = time.perf_counter()
+        indicators = self.engine.update(bar['Close'], bar.get('High'), bar.get('Low'), bar.get('Volume', 0.0))
+        news = self._news_values(timestamp) if self.uses_news else None
+        row = self._rows(bar, indicators, news)[0] * self.x_scale + self.x_min
+        self._push(row)
+
+        window = self._buffer[self._end - self.look_back:self._end]
+        scaled = float(np.asarray(self.predict_fn(window[None]))[0, 0])
+        prediction = (scaled - self.y_min) / self.y_scale
+        seconds = time.perf_counter() - start
+        self.latency.add(seconds)
+        return prediction, seconds
+
+    def run(self, source, limit=None):
+        """Yield a prediction record for every bar from source"""
+        for count, (timestamp, bar) in enumerate(source, 1):
+            prediction, seconds = self.update(bar, timestamp)
+            yield {
+                'timestamp': timestamp,
+                'close': float(bar['Close']),
+                'prediction': prediction,
+                'latency_ms': seconds * 1000,
+            }
+            if limit is not None and count >= limit:
+                break
+
+def stream(ticker, source=None, interval='1m', history_period='5d', registry=None, limit=None):
+    """
+    Stream predictions for a ticker with its latest registered model
+
+    Parameters:
+    ticker (str): Stock ticker symbol
+    source: Iterable of (timestamp, bar dict); default polls the price store for new completed bars
+    interval (str): Bar interval of the stream
+    history_period (str): History used to warm up the indicators and window
+    registry (ModelRegistry): Registry to load the model from (default: models/)
+    limit (int): Stop after this many bars
+
+    Returns:
+    dict: Latency summary (p50/p95/p99/max per bar, in milliseconds)
+    """
+    predictor = StreamingPredictor.from_registry(ticker, registry, interval)
+    if isinstance(source, ReplayBarSource):
+        # A replay warms up on its own first bars and streams the rest
+        warm = MAX_WINDOW + predictor.look_back
+        predictor.warm_up(source.bars.iloc[:warm])
+        source = ReplayBarSource(source.bars.iloc[warm:], source.speed)
+    else:
+        history = get_price_store().get_history(ticker, period=history_period, interval=interval)
+        predictor.warm_up(history.iloc[:-1])
+        source = source or PollingBarSource(ticker, interval, since=history.index[-2])
+
+    for record in predictor.run(source, limit):
+        print(f"{record['timestamp']}: close {record['close']:.2f} -> next {record['prediction']:.2f} "
+              f"({record['latency_ms']:.2f} ms)")
+
+    summary = predictor.latency.summary()
+    if summary:
+        print(f"Latency over {summary['bars']} bars: p50 {summary['p50_ms']:.2f} ms, "
+              f"p95 {summary['p95_ms']:.2f} ms, max {summary['max_ms']:.2f} ms")
+    return summary
+
+if __name__ == "__main__":
+    ticker = sys.argv[1] if len(sys.argv) > 1 else 'NVDA'
+    replay = sys.argv[2] if len(sys.argv) > 2 and os.path.exists(sys.argv[2]) else None
+    interval = sys.argv[3] if len(sys.argv) > 3 else '1m'
+    stream(ticker, ReplayBarSource(replay) if replay else None, interval=interval)
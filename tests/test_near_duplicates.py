@@ -0,0 +1,37 @@
+"""Near-duplicate clustering on hand-labelled headline pairs (tests/near_duplicate_pairs.json)"""
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from near_duplicates import NearDuplicateIndex
+
+with open(os.path.join(os.path.dirname(__file__), 'near_duplicate_pairs.json')) as f:
+    PAIRS = json.load(f)
+
+def clustered_together(tmp_path, first, second):
+    index = NearDuplicateIndex(str(tmp_path / 'near_duplicates.sqlite'))
+    try:
+        df = pd.DataFrame([dict(first, link='https://one.example/a'), dict(second, link='https://two.example/b')])
+        assigned = index.assign(df)
+    finally:
+        index.close()
+    return assigned['cluster_id'].nunique() == 1
+
+@pytest.mark.parametrize('first, second', PAIRS['duplicates'], ids=lambda a: a['headline'][:40])
+def test_reworded_story_collapses(tmp_path, first, second):
+    assert clustered_together(tmp_path, first, second)
+
+@pytest.mark.parametrize('first, second', PAIRS['distinct'], ids=lambda a: a['headline'][:40])
+def test_distinct_stories_stay_apart(tmp_path, first, second):
+    assert not clustered_together(tmp_path, first, second)
+
+def test_reworded_headline_matches_copy_without_summary(tmp_path):
+    full = {'headline': "Nvidia shares jump after record data center revenue",
+            'summary': "Nvidia reported record data center revenue of $30.8 billion for the quarter."}
+    bare = {'headline': "Nvidia stock jumps after record data-center revenue"}
+    assert clustered_together(tmp_path, full, bare)
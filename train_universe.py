@@ -0,0 +1,243 @@
+"""Batch retraining of stock_prediction_pipeline over a ticker universe
+
+Every ticker is trained in a worker process whose TensorFlow (and OpenMP/BLAS)
+thread pools are capped at threads_per_worker, so workers x threads matches the
+cores instead of every process oversubscribing all of them. Each finished
+ticker is appended to a checkpoint file for the run, and rerunning the same run
+skips it. Metrics from evaluate_model() end up in one summary table.
+
+A worker process that dies (killed for memory, a segfault in native code)
+breaks the whole pool. The pool is then rebuilt; the tickers that may have
+been running are retrained one at a time to find the one that crashed, which
+gets a failed row, and the rest continue in parallel.
+
+Usage: python train_universe.py NVDA AAPL MSFT
+       python train_universe.py --file tickers.txt --workers 8 --threads 1
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+# numpy/pandas/tensorflow are imported lazily so spawned workers can set their
+# thread limits before any of them start a thread pool
+RUNS_DIR = os.path.join('models', 'runs')
+
+def _init_worker(threads):
+    """Cap the thread pools of this worker process; runs before the first task"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[var] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+    # No display in batch mode
+    import matplotlib
+    matplotlib.use('Agg')
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+def _train_one(ticker, options):
+    """Train, evaluate and register one ticker; returns a JSON-serializable checkpoint record"""
+    import tensorflow as tf
+    from model_registry import ModelRegistry
+    from prediction import stock_prediction_pipeline
+
+    options = dict(options)
+    registry = ModelRegistry(options.pop('registry_root', 'models'))
+    start = time.perf_counter()
+    try:
+        # The pipeline reports progress with print(); a universe run only wants one line per ticker
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = stock_prediction_pipeline(ticker, registry=registry, plot=False, verbose=0, **options)
+        record = {
+            'ticker': ticker,
+            'status': 'ok',
+            'version': result['model_version'],
+            'points': len(result['data']),
+            'last_price': float(result['last_price']),
+        }
+        record.update({metric: float(value) for metric, value in result['metrics'].items()})
+    except Exception as e:
+        record = {'ticker': ticker, 'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+    finally:
+        # Free the graph before the next ticker lands on this worker
+        tf.keras.backend.clear_session()
+    record['seconds'] = round(time.perf_counter() - start, 1)
+    return record
+
+def _failed_record(ticker, error):
+    return {'ticker': ticker, 'status': 'failed', 'error': error, 'seconds': 0.0}
+
+def load_checkpoint(path):
+    """Latest checkpoint record per ticker from a run's JSON-lines file"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that ticker simply trains again
+                continue
+            records[record['ticker']] = record
+    return records
+
+def summary_table(records):
+    """One row per ticker with status, model version, metrics and training time"""
+    import pandas as pd
+
+    table = pd.DataFrame(list(records.values()))
+    if table.empty:
+        return table
+    leading = [col for col in ['ticker', 'status', 'version'] if col in table.columns]
+    table = table[leading + [col for col in table.columns if col not in leading]]
+    return table.sort_values('ticker').reset_index(drop=True)
+
+def train_universe(tickers, workers=None, threads_per_worker=1, run_id=None, runs_dir=RUNS_DIR,
+                   retry_failed=True, **options):
+    """
+    Train a model for every ticker in parallel, resuming an interrupted run
+
+    Parameters:
+    tickers (list): Ticker symbols
+    workers (int): Worker processes (default: CPU count // threads_per_worker)
+    threads_per_worker (int): TensorFlow intra-op threads per worker
+    run_id (str): Name of the run; tickers already checkpointed under it are skipped (default: today's date)
+    runs_dir (str): Directory for checkpoints and summary tables
+    retry_failed (bool): Train tickers again that failed earlier in the run
+    **options: Passed to stock_prediction_pipeline (period, interval, look_back, forecast_days, epochs, registry_root)
+
+    Returns:
+    pandas.DataFrame: Summary table of the whole run, also written to <runs_dir>/<run_id>_summary.csv
+    """
+    run_id = run_id or date.today().isoformat()
+    os.makedirs(runs_dir, exist_ok=True)
+    checkpoint_path = os.path.join(runs_dir, f"{run_id}.jsonl")
+    summary_path = os.path.join(runs_dir, f"{run_id}_summary.csv")
+
+    records = load_checkpoint(checkpoint_path)
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    pending = [
+        t for t in tickers
+        if t not in records or (retry_failed and records[t]['status'] != 'ok')
+    ]
+    print(f"Run {run_id}: {len(tickers) - len(pending)} of {len(tickers)} tickers already done, "
+          f"training {len(pending)}")
+
+    if pending:
+        workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        workers = min(workers, len(pending))
+        print(f"Using {workers} workers x {threads_per_worker} threads")
+
+        started = time.perf_counter()
+        done = 0
+        with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            def finish(record):
+                nonlocal done
+                done += 1
+                records[record['ticker']] = record
+                checkpoint.write(json.dumps(record) + '\n')
+                checkpoint.flush()
+
+                if record['status'] == 'ok':
+                    status = f"{record['version']} RMSE {record['RMSE']:.4f}"
+                else:
+                    status = f"failed ({record['error']})"
+                print(f"[{done}/{len(pending)}] {record['ticker']}: {status} in {record['seconds']}s")
+
+            queue = list(pending)
+            # Tickers at the front of the queue to train one per pool after a crash
+            isolate = 0
+            while queue:
+                batch = queue[:isolate] if isolate else queue
+                pool_workers = 1 if isolate else workers
+                crashed = _run_pool(batch, pool_workers, threads_per_worker, options, finish)
+                # Keep the order: crashed tickers stay in front of the ones not submitted yet
+                queue = [t for t in queue if t in crashed or t not in batch]
+                if not crashed:
+                    isolate = 0
+                elif pool_workers == 1:
+                    # One worker runs its queue in order, so the first crashed ticker killed it
+                    finish(_failed_record(crashed[0], "worker process died"))
+                    queue.remove(crashed[0])
+                    isolate = 0
+                else:
+                    # The culprit was among the tickers running or prefetched when the pool broke
+                    isolate = min(len(crashed), pool_workers + 1)
+                    print(f"A worker process died; retraining {isolate} tickers one at a time to find the cause")
+        print(f"Trained {len(pending)} tickers in {time.perf_counter() - started:.0f}s")
+
+    table = summary_table({t: records[t] for t in tickers if t in records})
+    table.to_csv(summary_path, index=False)
+    failed = int((table['status'] != 'ok').sum()) if not table.empty else 0
+    print(f"Summary written to {summary_path} ({failed} failed)")
+    return table
+
+def _run_pool(tickers, workers, threads_per_worker, options, finish):
+    """Train tickers in one process pool, calling finish(record) for each result
+
+    Returns the tickers, in submission order, that never finished because a worker died.
+    """
+    # spawn, not fork: a forked child would inherit the parent's TensorFlow/BLAS thread state
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=_init_worker, initargs=(threads_per_worker,))
+    crashed = set()
+    try:
+        futures = {pool.submit(_train_one, ticker, options): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                record = future.result()
+            except BrokenProcessPool:
+                crashed.add(ticker)
+                continue
+            except Exception as e:
+                record = _failed_record(ticker, f"{type(e).__name__}: {e}")
+            finish(record)
+    finally:
+        # On Ctrl-C, drop queued tickers; finished ones are already checkpointed
+        pool.shutdown(wait=True, cancel_futures=True)
+    return [t for t in tickers if t in crashed]
+
+def read_tickers(path):
+    """Ticker symbols from a file, one per line or comma separated, '#' starts a comment"""
+    tickers = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            tickers.extend(t for t in line.replace(',', ' ').split())
+    return tickers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train LSTM models for a list of tickers")
+    parser.add_argument('tickers', nargs='*')
+    parser.add_argument('--file', help="File with ticker symbols")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int, default=1, help="TensorFlow threads per worker")
+    parser.add_argument('--run-id')
+    parser.add_argument('--period', default='2y')
+    parser.add_argument('--look-back', type=int, default=60)
+    parser.add_argument('--epochs', type=int, default=50)
+    args = parser.parse_args()
+
+    tickers = args.tickers + (read_tickers(args.file) if args.file else [])
+    if not tickers:
+        parser.error("no tickers given")
+
+    table = train_universe(tickers, workers=args.workers, threads_per_worker=args.threads,
+                           run_id=args.run_id, period=args.period, look_back=args.look_back,
+                           epochs=args.epochs)
+    if not table.empty:
+        print(table.to_string(index=False))